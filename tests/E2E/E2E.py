@@ -13,21 +13,94 @@ Kolejność wykonywania:
 3. Note API (testy notatek osobistych, zarządzania plikami 1:N i udostępniania N:M)
 4. Course API (testy kursów, ról, moderacji, opuszczania kursu - uwzględniając N:M dla notes/tests)
 5. Quiz API (testy quizów - uwzględniając udostępnianie testów N:M)
+
+Tryby (--mode):
+- e2e  : domyślny, pełna sekwencja kroków opisana wyżej
+- load : N wątków roboczych wykonuje przepływy z LOAD_FLOWS przez --duration sekund,
+         zamiast linii per krok konsola pokazuje odświeżany dashboard (LiveDashboard)
+- soak : jak load, ale godzinami (przepływy NOTE/COURSE); co --soak-bucket sekund kubełek metryk
+         trafia do SoakMetrics.jsonl/.csv, na końcu trendy opóźnień i RSS harnessu (SoakSummary.json)
+- seed : buduje duży zbiór danych przez API (użytkownicy, kursy, zaproszenia, notatki z plikami,
+         testy z pytaniami) wg rozkładów --seed-*, ID i tokeny trafiają do SeedManifest.json
+- pagination : pełne skany stronicowanych list (notatki, notatki/członkowie kursu, kursy) dla danych
+         z --manifest w kilku rozmiarach strony; czas per głębokość strony, duplikaty i luki
+- dashboard : siatka parametrów /me/dashboard (limit, page, frazy wyszukiwania) dla użytkowników
+         z --manifest o różnym wolumenie danych; czas i rozmiar odpowiedzi per kombinacja
+- dashboard-widgets : koszt krańcowy każdego widżetu include= (sam widżet vs include=none oraz
+         leave-one-out vs pełny dashboard), warianty przeplatane losowo przez --widget-repeat rund
+- auth : login vs POST /api/refresh, narzut guardu auth:api (ważny / brak / sfałszowany token),
+         blacklista po logout i refresh, równoległy łańcuchowy refresh wielu tokenów
+- uploads : siatka rozmiar pliku x liczba plików w żądaniu x typ (png/jpg/pdf/xlsx) dla tworzenia
+         notatki i dodawania pliku; MB/s, czas przetwarzania po stronie serwera i progi odrzuceń
+- ranges : pobieranie pliku notatki nagłówkiem Range (pierwszy bajt, środek, sufiks, multi-range,
+         416) z weryfikacją 206/Content-Range/treści oraz pobranie wznawiane kawałkami vs pełne
+- compression : listy z --manifest (notatki, dashboard, członkowie kursu) z Accept-Encoding
+         identity/gzip/deflate/br; czas oraz rozmiar na łączu i po dekompresji per kodowanie
+- payload : offline, bez API — analiza Endpoints.jsonl z przebiegu e2e (--from-run): rozmiary body
+         per trasa, najcięższe pola, powtarzane obiekty, wzrost z licznością kolekcji; na żywo
+         w dowolnym trybie z --analyze-payloads
+- races : te same żądania wysłane jednocześnie z wielu wątków (--race-burst) na limitach (20 pytań,
+         4 odpowiedzi, blokada po 3 odrzuceniach) i operacjach idempotentnych (share/unshare);
+         ile żądań prześlizgnęło się przez limit i ile kosztuje oczekiwanie na blokady
+- contention : członkowie jednego kursu równolegle udostępniają notatki, zmieniają role (owner),
+         listują notatki kursu i opuszczają go (z ponownym dołączeniem) przy rosnącej liczbie wątków;
+         przepustowość, skalowanie i wzrost p95 per operacja
+- sweep : konta z Resources.jsonl (dziennik kont każdego przebiegu) i SeedManifest.json z --sweep-from
+         są logowane, ich notatki/testy/kursy wyliczane i usuwane równolegle razem z profilem;
+         raport odzyskanych wierszy i bajtów plików (Sweep.json)
+- scenario : jednorazowy przebieg scenariuszy deklaratywnych z --scenarios (JSON/YAML: żądania, capture
+         do zmiennych, asercje, wagi, think time) krok po kroku (ScenarioRun.json); te same scenariusze,
+         skompilowane przy starcie, są przepływami scn:<nazwa> trybów load/soak
+- traffic-model : logi dostępowe (nginx combined / JSON) mapowane na trasy z routes/api.php; udziały i tempo
+         tras, rozkład think time, kształt sesji i przejścia między trasami trafiają do TrafficModel.json,
+         który load/soak z --traffic-model odtwarzają syntetycznymi użytkownikami (przepływ "model")
+- replay : konkretne okno logu (--replay-from/--replay-to) odtwarzane w oryginalnych odstępach ÷ --speedup
+         na syntetycznych użytkownikach; ID z logu mapowane na fixtures tworzone przed startem zegara,
+         opóźnienia per trasa porównane z czasami z logu i spóźnienie startu żądań (Replay.json)
+
+Wznawianie e2e: z --checkpoint stan TestContext (tokeny, ID, emaile, answer_ids) i rejestr zasobów trafiają
+po każdym kroku do Checkpoints.jsonl; --resume-from <krok> / --rerun-failed odtwarzają stan sprzed kroku
+i kontynuują sekwencję od niego (bez powtarzania rejestracji, uploadów i zaproszeń).
+
+Wybór kroków e2e: --only <wzorce> / --tag <moduły/tagi> / --skip <wzorce> uruchamiają podzbiór sekwencji;
+kroki przygotowujące (rejestracje, logowania, kursy, zaproszenia), których wymaga podzbiór, są dociągane
+automatycznie — wg wymagań zadeklarowanych przy każdym kroku na liście kroków.
+
+Narzut harnessu: --profile uruchamia każdy krok pod cProfile i dzieli czas na czekanie na I/O, kod harnessu
+(maskowanie, pretty_json, nagłówki, druk) i biblioteki; pstats per krok, scalony Profile.pstats i stosy
+Profile.collapsed (flamegraph.pl / speedscope) trafiają do <wyniki>/profile.
 """
 
 from __future__ import annotations
 
 import argparse
+import base64
+import contextlib
+import cProfile
+import fnmatch
+import gzip
+import hashlib
 import io
+import itertools
 import json
+import math
+import mmap
 import os
+import pstats
 import random
 import re
+import shutil
 import string
 import sys
+import tempfile
+import threading
 import time
-from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, Tuple
+import zipfile
+from collections import deque
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 import html # Import do escape'owania HTML
 import webbrowser # Import do otwierania raportu
 
@@ -42,6 +115,16 @@ try:
 except ImportError: # Poprawka: Użyj ImportError
     PIL_AVAILABLE = False
 
+try:
+    import yaml # Opcjonalnie: scenariusze .yaml/.yml (--scenarios)
+except ImportError:
+    yaml = None
+
+try:
+    import resource # Tylko Unix: fallback pomiaru RSS w trybie soak
+except ImportError:
+    resource = None
+
 # ───────────────────────── UI (Zbiorczo) ─────────────────────────
 ICON_OK    = "✅"
 ICON_FAIL  = "❌"
@@ -68,6 +151,8 @@ ICON_LEAVE = "🚶‍♂️" # Nowa ikona dla opuszczania kursu
 BOX = "─" * 92
 MAX_BODY_LOG = 12000
 SAVE_BODY_LIMIT = 10 * 1024 * 1024 # 10 MB limit zapisu surowej odpowiedzi
+DOWNLOAD_CHUNK = 256 * 1024          # Blok czytania pobrań strumieniowych
+DOWNLOAD_PREFIX_LIMIT = 64 * 1024    # Przy pobraniu strumieniowym raport dostaje tylko prefiks body
 
 # ───────────────────────── Helpers: UI & Masking ─────────────────────────
 
@@ -175,6 +260,138 @@ def gen_avatar_bytes() -> bytes:
     """Generuje domyślny obrazek PNG dla awatara."""
     return _create_dummy_image(220, 220, (40, 48, 60, 255), (100, 190, 255, 255))
 
+_GENERATED_NOTE: List[Any] = [] # Leniwie generowany PNG notatki (raz na proces)
+
+def _generated_note_source() -> "UploadSource":
+    if not _GENERATED_NOTE:
+        _GENERATED_NOTE.append(UploadSource.from_bytes(gen_png_bytes(), "generated_note.png", "image/png"))
+    return _GENERATED_NOTE[0]
+
+# ───────────────────────── Helpers: Upload (mmap / strumień multipart) ─────────────────────────
+
+class UploadSource:
+    """Treść pliku do uploadu: mmap pliku z dysku (bez kopii w pamięci) albo bufor bytes.
+
+    Jedna instancja na plik jest współdzielona przez wszystkie żądania i wątki (tylko odczyt)."""
+
+    def __init__(self, name: str, mime: str, data: Any, path: Optional[str] = None):
+        self.name = name
+        self.mime = mime
+        self.path = path
+        self._data = data # mmap.mmap lub bytes
+        self.view = memoryview(data)
+        self._sha256: Optional[str] = None
+
+    @classmethod
+    def from_path(cls, path: str, mime: str) -> "UploadSource":
+        f = open(path, "rb") # Uchwyt zostaje otwarty razem z mapowaniem na czas życia procesu
+        try:
+            data: Any = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: # Pustego pliku nie da się zmapować
+            data = f.read()
+        return cls(os.path.basename(path), mime, data, path)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str, mime: str) -> "UploadSource":
+        return cls(name, mime, data)
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def read_bytes(self) -> bytes:
+        """Pełna kopia treści — tylko tam, gdzie naprawdę potrzebne są bytes (np. porównanie z pobranym plikiem)."""
+        return bytes(self.view)
+
+    def sha256(self) -> str:
+        """SHA-256 treści (liczony blokami z mapowania, raz na źródło)."""
+        if self._sha256 is None:
+            h = hashlib.sha256()
+            for i in range(0, len(self.view), DOWNLOAD_CHUNK):
+                h.update(self.view[i:i + DOWNLOAD_CHUNK])
+            self._sha256 = h.hexdigest()
+        return self._sha256
+
+# Typy plików notatek przyjmowane przez API (files.*: mimes:pdf,xlsx,jpg,jpeg,png)
+NOTE_MIME_MAP = {"png": "image/png", "jpg": "image/jpeg", "jpeg": "image/jpeg", "pdf": "application/pdf",
+                 "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+
+_UPLOAD_SOURCES: Dict[str, UploadSource] = {}
+_UPLOAD_SOURCES_LOCK = threading.Lock()
+
+def upload_source(path: str, mime: str = "application/octet-stream") -> UploadSource:
+    """Zwraca współdzielone UploadSource dla pliku (plik jest otwierany i mapowany tylko raz)."""
+    key = os.path.abspath(path)
+    with _UPLOAD_SOURCES_LOCK:
+        src = _UPLOAD_SOURCES.get(key)
+        if src is None:
+            src = _UPLOAD_SOURCES[key] = UploadSource.from_path(key, mime)
+        return src
+
+def multipart_parts(files: Any) -> List[Tuple[str, str, Any, str]]:
+    """Normalizuje files (dict lub lista tupli jak w requests) do [(pole, nazwa, treść, content-type)]."""
+    items = files.items() if isinstance(files, dict) else files
+    return [(field, spec[0], spec[1], spec[2] if len(spec) > 2 else "application/octet-stream") for field, spec in items]
+
+class MultipartStream:
+    """Ciało multipart/form-data czytane kawałkami (read(n)) z długością znaną z góry.
+
+    requests/http.client wysyłają je blokami z Content-Length (bez chunked), więc nginx/PHP widzą
+    zwykły upload, a harness nie buduje w pamięci kopii całego pliku."""
+
+    CHUNK = 1024 * 1024
+
+    def __init__(self, fields: Optional[Dict[str, Any]], parts: List[Tuple[str, str, Any, str]]):
+        self.boundary = f"----NoteSyncE2E{os.urandom(12).hex()}"
+        b = self.boundary
+        segments: List[Any] = []
+        for key, value in (fields or {}).items():
+            for item in (value if isinstance(value, (list, tuple)) else [value]):
+                segments.append(f'--{b}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{item}\r\n'.encode("utf-8"))
+        for field_name, filename, content, ctype in parts:
+            safe_name = str(filename).replace('"', "%22")
+            segments.append(f'--{b}\r\nContent-Disposition: form-data; name="{field_name}"; filename="{safe_name}"\r\n'
+                            f"Content-Type: {ctype}\r\n\r\n".encode("utf-8"))
+            segments.append(content.view if isinstance(content, UploadSource) else memoryview(content))
+            segments.append(b"\r\n")
+        segments.append(f"--{b}--\r\n".encode("utf-8"))
+        self._segments = segments
+        self._total = sum(len(s) for s in segments)
+        self._idx = 0
+        self._pos = 0
+        self.file_bytes = sum(len(p[2]) for p in parts)
+        self.started_at: Optional[float] = None  # perf_counter() pierwszego read()
+        self.finished_at: Optional[float] = None # perf_counter() oddania ostatniego bajtu (do bufora gniazda)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self) -> int:
+        return self._total
+
+    def read(self, n: int = -1) -> bytes:
+        if self.started_at is None: self.started_at = time.perf_counter()
+        remaining = self._total if n is None or n < 0 else n
+        out: List[bytes] = []
+        while remaining > 0 and self._idx < len(self._segments):
+            seg = self._segments[self._idx]
+            chunk = seg[self._pos:self._pos + remaining]
+            out.append(bytes(chunk))
+            self._pos += len(chunk)
+            remaining -= len(chunk)
+            if self._pos >= len(seg):
+                self._idx += 1
+                self._pos = 0
+        if self._idx >= len(self._segments) and self.finished_at is None:
+            self.finished_at = time.perf_counter()
+        return b"".join(out)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(self.CHUNK)
+            if not chunk: return
+            yield chunk
+
 # ───────────────────────── CLI ─────────────────────────
 
 def default_avatar_path() -> str:
@@ -186,7 +403,7 @@ def default_avatar_path() -> str:
 def parse_args() -> argparse.Namespace:
     """Parsuje argumenty wiersza poleceń."""
     p = argparse.ArgumentParser(description="NoteSync Zintegrowany Test E2E po refaktoryzacji N:M")
-    p.add_argument("--base-url", required=True, help="Base URL of the API, e.g., http://localhost:8000")
+    p.add_argument("--base-url", default=None, help="Base URL of the API, e.g., http://localhost:8000 (required except in payload and traffic-model modes)")
     p.add_argument("--me-prefix", default="me", help="API prefix for authenticated user routes, e.g., /api/<prefix>")
     p.add_argument("--timeout", type=int, default=30, help="Request timeout in seconds") # Zwiększono domyślny timeout
     # Poprawka ścieżki domyślnej notatki dla większej elastyczności
@@ -195,7 +412,124 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--avatar", default=default_avatar_path(), help=f"Path to the sample avatar file (default: {default_avatar_path()})")
     # --html-report jest teraz ignorowany, raport generowany zawsze
     p.add_argument("--html-report", action="store_true", help="(Ignored) HTML report is always generated")
-    return p.parse_args()
+    # --- Tryb obciążeniowy ---
+    p.add_argument("--no-token-cache", action="store_true", help="Always POST /api/login instead of reusing cached JWTs per actor")
+    p.add_argument("--http-cache", action="store_true", help="Client-side HTTP cache: revalidate GETs with ETag/Last-Modified, honor "
+                                                          "Cache-Control and report 304 rates, bytes saved and routes without validators")
+    p.add_argument("--analyze-payloads", action="store_true", help="Profile JSON responses per route (sizes, heaviest fields, repeated objects, growth)")
+    p.add_argument("--mode", choices=["e2e", "load", "soak", "seed", "pagination", "dashboard", "dashboard-widgets", "auth", "uploads", "ranges", "compression", "payload", "races", "contention", "sweep", "scenario", "traffic-model", "replay"], default="e2e",
+                   help="Run mode: full E2E sequence, load run, long soak run, bulk data seeding, pagination scan, "
+                        "dashboard sweep, per-widget dashboard cost, JWT lifecycle, note upload, Range download or response compression benchmark, offline payload analysis, concurrency races on limits, shared-course contention, sweeping accounts left by earlier runs, a single pass over declarative scenarios, building a traffic model from access logs, or replaying an access log (default: e2e)")
+    p.add_argument("--workers", type=int, default=4, help="Number of concurrent workers in load/soak/seed/sweep/replay mode")
+    p.add_argument("--duration", type=float, default=60.0, help="Load/soak run duration in seconds (e.g. 14400 for a 4h soak)")
+    p.add_argument("--flows", default=None, help=f"Comma-separated load flows (available: {', '.join(LOAD_FLOWS)}; "
+                                                 f"default load: {','.join(DEFAULT_LOAD_FLOWS)}; soak: {','.join(DEFAULT_SOAK_FLOWS)})")
+    p.add_argument("--scenarios", default=None, help="Comma-separated scenario files/directories (.json; .yaml/.yml with PyYAML), "
+                                                     "compiled at startup into load/soak flows scn:<name> (used by default when --flows is not given)")
+    p.add_argument("--traffic-model", default=None, help=f"Load/soak: {MODEL_FILE} from --mode traffic-model; adds the 'model' flow "
+                                                         "(synthetic users replaying measured route mix, sessions and think times; default flow when --flows is not given)")
+    p.add_argument("--think-scale", type=float, default=1.0, help="Model flow: multiply think times from the log (0 = no think time)")
+    p.add_argument("--model-max-session", type=int, default=100, help="Model flow: cap on requests per synthetic session")
+    p.add_argument("--dashboard-interval", type=float, default=2.0, help="Live dashboard refresh interval in seconds")
+    p.add_argument("--no-dashboard", action="store_true", help="Disable the live dashboard (load mode prints only the final summary)")
+    # --- Tryb soak ---
+    p.add_argument("--soak-bucket", type=float, default=60.0, help="Soak metrics bucket length in seconds")
+    p.add_argument("--tracemalloc", action="store_true", help="Soak: also trace the harness Python heap with tracemalloc (adds overhead)")
+    p.add_argument("--max-latency-slope", type=float, default=None, help="Soak: fail if p99 latency grows faster than this (ms per hour)")
+    p.add_argument("--max-rss-slope", type=float, default=None, help="Soak: fail if harness RSS grows faster than this (MB per hour)")
+    # --- Tryb seed (rozkłady: 'N', 'lo-hi' lub 'lo-hi:pareto') ---
+    p.add_argument("--seed-users", type=int, default=50, help="Seed: number of users to register")
+    p.add_argument("--seed-courses", default="0-3", help="Seed: courses owned per user")
+    p.add_argument("--seed-members", default="0-15:pareto", help="Seed: invited members per course")
+    p.add_argument("--seed-pending", type=float, default=0.1, help="Seed: fraction of invitations left pending")
+    p.add_argument("--seed-notes", default="2-60:pareto", help="Seed: notes per user")
+    p.add_argument("--seed-note-files", default="0-2", help="Seed: extra files per note (each note starts with one)")
+    p.add_argument("--seed-tests", default="0-3", help="Seed: tests per user")
+    p.add_argument("--seed-questions", default="1-20", help="Seed: questions per test (API max 20)")
+    p.add_argument("--seed-answers", default="2-4", help="Seed: answers per question (API max 4)")
+    p.add_argument("--seed-share", type=float, default=0.3, help="Seed: fraction of notes/tests shared into one of the owner's courses")
+    p.add_argument("--seed-random", type=int, default=1337, help="Seed: RNG seed for a reproducible data plan")
+    p.add_argument("--seed-manifest", default=None, help="Seed: manifest output path (default: <results dir>/SeedManifest.json)")
+    # --- Benchmarki na danych z seeda ---
+    p.add_argument("--manifest", default=None, help="SeedManifest.json produced by --mode seed (input for benchmark modes)")
+    p.add_argument("--page-sizes", default="10,50,100", help="Pagination: comma-separated page sizes to walk")
+    p.add_argument("--scan-users", type=int, default=2, help="Pagination: number of users with most notes to scan")
+    p.add_argument("--scan-courses", type=int, default=2, help="Pagination: number of largest courses to scan")
+    p.add_argument("--scan-repeat", type=int, default=3, help="Pagination: full walks per collection and page size (median per page)")
+    p.add_argument("--scan-max-pages", type=int, default=1000, help="Pagination: safety cap on pages per walk")
+    p.add_argument("--dash-users", type=int, default=4, help="Dashboard: users picked across the data-volume range")
+    p.add_argument("--dash-limits", default="1,10,25,50", help="Dashboard: comma-separated limit values (API max 50)")
+    p.add_argument("--dash-pages", default="1,5,20", help="Dashboard: comma-separated page values")
+    p.add_argument("--dash-queries", default=",Seed,note 1,zzz-no-match", help="Dashboard: search strings for activities_q/courses_q (empty = no filter)")
+    p.add_argument("--dash-repeat", type=int, default=5, help="Dashboard: requests per combination")
+    p.add_argument("--widget-repeat", type=int, default=30, help="Dashboard widgets: interleaved rounds over all include= variants")
+    # --- Tryb auth ---
+    p.add_argument("--auth-samples", type=int, default=30, help="Auth: login/refresh and auth-guard samples")
+    p.add_argument("--auth-users", type=int, default=8, help="Auth: tokens refreshed concurrently in the refresh storm")
+    p.add_argument("--auth-chain", type=int, default=20, help="Auth: chained refreshes per token in the refresh storm")
+    # --- Tryb uploads ---
+    p.add_argument("--upload-sizes", default="16K,256K,1M,5M,10M,11M,50M,200M", help="Uploads: comma-separated file sizes (K/M/G suffixes)")
+    p.add_argument("--upload-counts", default="1,2,5", help="Uploads: files per POST /me/notes request")
+    p.add_argument("--upload-types", default="png,jpg,pdf,xlsx", help=f"Uploads: file types to generate ({', '.join(NOTE_MIME_MAP)})")
+    p.add_argument("--upload-repeat", type=int, default=3, help="Uploads: requests per combination")
+    p.add_argument("--upload-max-body", default="1G", help="Uploads: skip combinations whose total file bytes exceed this")
+    p.add_argument("--upload-keep-going", action="store_true", help="Uploads: keep sweeping larger sizes after a size fails in every attempt")
+    # --- Tryb ranges ---
+    p.add_argument("--range-file", default=None, help="Ranges: file to upload and download in ranges (default: generated PDF of --range-size)")
+    p.add_argument("--range-size", default="8M", help="Ranges: size of the generated PDF (API limit 10M)")
+    p.add_argument("--range-chunk", default="1M", help="Ranges: chunk size for ranged and resumable downloads")
+    p.add_argument("--range-repeat", type=int, default=5, help="Ranges: repetitions per case")
+    # --- Tryb compression ---
+    p.add_argument("--encodings", default="identity,gzip,deflate,br", help="Compression: Accept-Encoding values to compare")
+    p.add_argument("--compression-repeat", type=int, default=20, help="Compression: interleaved rounds over all routes and encodings")
+    # --- Tryb payload (offline) ---
+    p.add_argument("--from-run", default=None, help="Payload: results directory (or its Endpoints.jsonl) of a recorded e2e run")
+    # --- Tryb races ---
+    p.add_argument("--race-scenarios", default=",".join(RACE_SCENARIOS), help=f"Races: comma-separated scenarios ({', '.join(RACE_SCENARIOS)})")
+    p.add_argument("--race-burst", type=int, default=16, help="Races: simultaneous requests per burst")
+    p.add_argument("--race-rounds", type=int, default=3, help="Races: rounds per scenario, each on fresh resources")
+    p.add_argument("--race-headroom", type=int, default=2, help="Races: free question slots left below the limit of 20 before the burst")
+    # --- Tryb contention ---
+    p.add_argument("--contention-levels", default="1,2,4,8,16", help="Contention: comma-separated numbers of concurrent workers")
+    p.add_argument("--contention-members", type=int, default=16, help="Contention: course members (at least the highest level)")
+    p.add_argument("--contention-duration", type=float, default=20.0, help="Contention: seconds per concurrency level")
+    p.add_argument("--contention-mix", default="share=3,role=1,notes=4,leave=1", help=f"Contention: operation weights ({', '.join(CONTENTION_OPS)})")
+    # --- Sprzątanie ---
+    p.add_argument("--keep-resources", action="store_true", help="Do not delete users/notes/courses/tests left by the run (seed mode always keeps them); "
+                                                                 "accounts stay listed in Resources.jsonl for --mode sweep")
+    p.add_argument("--teardown-workers", type=int, default=8, help="Concurrent workers deleting leftover resources at the end of the run")
+    # --- Tryb sweep ---
+    p.add_argument("--sweep-from", default=os.path.join("tests", "results"), help="Sweep: comma-separated results directories or files (Resources.jsonl, SeedManifest.json), searched recursively")
+    p.add_argument("--sweep-any", action="store_true", help="Sweep: also delete accounts whose email does not match the rnd_email() pattern")
+    p.add_argument("--sweep-dry-run", action="store_true", help="Sweep: only count what would be deleted")
+    p.add_argument("--sweep-no-storage", action="store_true", help="Sweep: skip HEAD requests measuring note file sizes")
+    # --- Model ruchu z logów ---
+    p.add_argument("--access-log", default=None, help="Traffic-model/replay: comma-separated access logs (nginx combined with optional $request_time, or JSON lines; .gz allowed)")
+    p.add_argument("--routes-file", default=default_routes_file(), help="Traffic-model/replay: Laravel routes file used to map paths to route templates")
+    p.add_argument("--session-gap", type=float, default=1800.0, help="Traffic-model: idle seconds that end a client session")
+    p.add_argument("--speedup", type=float, default=1.0, help="Replay: time compression of the log timeline (2 = twice as fast; 0 = as fast as possible)")
+    p.add_argument("--replay-from", default=None, help="Replay: start of the window to replay (epoch or ISO 8601)")
+    p.add_argument("--replay-to", default=None, help="Replay: end of the window to replay (epoch or ISO 8601)")
+    p.add_argument("--replay-users", type=int, default=50, help="Replay: maximum number of synthetic users; log clients are spread over them")
+    # --- Checkpointy e2e ---
+    p.add_argument("--checkpoint", action="store_true", help="E2E: snapshot TestContext after every step to Checkpoints.jsonl "
+                                                             "(a run with failures keeps its resources so it can be resumed)")
+    p.add_argument("--resume-from", default=None, help="E2E: restore the checkpoint before this step (number or name) and continue from it")
+    p.add_argument("--rerun-failed", action="store_true", help="E2E: restore the checkpoint before the first failed step and continue from it")
+    p.add_argument("--resume-run", default=None, help="E2E: results directory to resume (default: latest with Checkpoints.jsonl)")
+    # --- Wybór kroków e2e ---
+    p.add_argument("--only", default="", help="E2E: comma-separated step name patterns (substring or glob, also method names) to run")
+    p.add_argument("--skip", default="", help="E2E: comma-separated step name patterns or tags to leave out")
+    p.add_argument("--tag", default="", help="E2E: comma-separated tags/modules to run (user, setup, note, course, quiz, "
+                                             + ", ".join(t for t, _ in STEP_TAG_RULES) + ")")
+    p.add_argument("--no-prerequisites", action="store_true", help="E2E: do not pull in setup steps needed by --only/--tag selections")
+    p.add_argument("--profile", action="store_true", help="E2E: run every step under cProfile; per-step pstats, harness vs I/O time split "
+                                                          "and a collapsed-stack file for flame graphs in <results>/profile")
+    p.add_argument("--profile-sample-ms", type=float, default=2.0, help="E2E profile: stack sampling interval for Profile.collapsed (0 disables sampling)")
+    args = p.parse_args()
+    if not args.base_url and args.mode not in ("payload", "traffic-model"):
+        p.error("--base-url is required")
+    return args
 
 # ───────────────────────── Struktury Danych ─────────────────────────
 
@@ -213,9 +547,32 @@ class EndpointLog:
     resp_body_pretty: Optional[str] = None # Sformatowane ciało odpowiedzi (lub info o binarnym)
     resp_bytes: Optional[bytes] = None     # Surowe bajty odpowiedzi (obcięte do limitu)
     resp_content_type: Optional[str] = None # Content-Type odpowiedzi
+    resp_wire_bytes: Optional[int] = None     # Body na łączu (po Content-Encoding, przed dekompresją)
+    resp_decoded_bytes: Optional[int] = None  # Body po dekompresji (None: kodowanie nieobsługiwane przez klienta)
+    resp_content_encoding: str = ""           # Content-Encoding odpowiedzi ('' = identity)
     duration_ms: float = 0.0 # Czas wykonania żądania w ms
     notes: List[str] = field(default_factory=list) # Dodatkowe uwagi (np. brakujące nagłówki security)
 
+@dataclass
+class DownloadStats:
+    """Wynik pobrania strumieniowego (body nie jest trzymane w pamięci, tylko liczone i haszowane)."""
+    bytes: int = 0
+    sha256: str = ""
+    ttfb_ms: float = 0.0        # Do odebrania nagłówków odpowiedzi
+    first_byte_ms: float = 0.0  # Do pierwszego bloku body
+    total_ms: float = 0.0
+
+    @property
+    def mbps(self) -> float:
+        body_ms = self.total_ms - self.ttfb_ms
+        return self.bytes / (body_ms / 1000.0) / 1e6 if body_ms > 0 else 0.0
+
+    def matches(self, expected: Any) -> bool:
+        """Porównuje z wysłanym plikiem (UploadSource lub bytes) po rozmiarze i SHA-256."""
+        if isinstance(expected, UploadSource):
+            return self.bytes == len(expected) and self.sha256 == expected.sha256()
+        return self.bytes == len(expected) and self.sha256 == hashlib.sha256(expected).hexdigest()
+
 @dataclass
 class TestRecord:
     """Przechowuje wynik pojedynczego kroku testowego."""
@@ -238,9 +595,16 @@ class TestContext:
     timeout: int             # Timeout żądań w sekundach
     started_at: float = field(default_factory=time.time) # Czas startu testów
     note_file_path: str = "" # Ścieżka do pliku notatki
-    avatar_bytes: Optional[bytes] = None # Bajty pliku awatara
+    avatar_source: Optional[UploadSource] = None # Treść awatara (mmap pliku lub wygenerowany PNG), współdzielona
     endpoints: List[EndpointLog] = field(default_factory=list) # Logi wszystkich wywołań API
     output_dir: str = ""     # Katalog wyjściowy dla raportów
+    # Tryb load: wspólny agregat metryk i wyłączenie pełnego logowania EndpointLog
+    stats: Optional["LiveStats"] = None # Metryki na żywo (None w trybie e2e)
+    record_endpoints: bool = True # False = nie zapisuj EndpointLog (pamięć/CPU przy dużym RPS)
+    tokens: Optional["TokenCache"] = None # Cache JWT per aktor (None = każde logowanie to POST /api/login)
+    http_cache: Optional["HttpCache"] = None # Cache HTTP klienta (--http-cache), wspólny dla wątków
+    payloads: Optional["PayloadAnalyzer"] = None # Analiza body JSON per trasa (--analyze-payloads)
+    resources: Optional["ResourceRegistry"] = None # Encje utworzone przez przebieg (do teardown), wspólne dla wątków
     # USUNIĘTO: transcripts_dir nie jest już potrzebny
     # transcripts_dir: str = ""
 
@@ -297,6 +661,11 @@ def me(ctx: TestContext, path: str) -> str:
     prefix = ctx.me_prefix.strip('/')
     return f"{ctx.base_url.rstrip('/')}/api/{prefix}/{path.lstrip('/')}"
 
+def avatar_file(ctx: TestContext, stem: str) -> Tuple[str, UploadSource, str]:
+    """Krotka pliku multipart z awatarem kontekstu: (nazwa z rozszerzeniem źródła, treść, mime)."""
+    src = ctx.avatar_source or UploadSource.from_bytes(gen_avatar_bytes(), "avatar.png", "image/png")
+    return f"{stem}{os.path.splitext(src.name)[1] or '.png'}", src, src.mime
+
 def auth_headers(token: Optional[str]) -> Dict[str, str]:
     """Zwraca słownik nagłówków z Authorization: Bearer (jeśli token podany)."""
     h = {"Accept": "application/json"} # Zawsze oczekujemy JSONa
@@ -332,6 +701,8 @@ def security_header_notes(resp: requests.Response) -> List[str]:
 
 def log_exchange(ctx: TestContext, el: EndpointLog, resp: Optional[requests.Response]):
     """Loguje szczegóły żądania i odpowiedzi do kontekstu (bez zapisywania plików transkrypcji)."""
+    if not ctx.record_endpoints:
+        return # Tryb load: bez kopiowania body, maskowania i pretty_json
     if resp is not None:
         ct = resp.headers.get("Content-Type", "")
         el.resp_status = resp.status_code
@@ -372,11 +743,26 @@ def http_request(ctx: TestContext, title: str, method: str, url: str,
                  headers: Dict[str,str],
                  json_body: Optional[Dict[str, Any]] = None,
                  data: Optional[Dict[str, Any]] = None,
-                 files: Optional[Any] = None) -> requests.Response: # MODYFIKACJA: files: Optional[Any]
-    """Wykonuje żądanie HTTP, loguje je i zwraca obiekt Response."""
+                 files: Optional[Any] = None, # MODYFIKACJA: files: Optional[Any]
+                 download: Optional[DownloadStats] = None) -> requests.Response:
+    """Wykonuje żądanie HTTP, loguje je i zwraca obiekt Response.
+
+    Z `download` body jest czytane strumieniowo (stream=True) do haszowania; resp.content zawiera potem
+    tylko prefiks DOWNLOAD_PREFIX_LIMIT bajtów."""
     method = method.upper()
     # Przygotuj nagłówki (dodaj domyślne, zmaskuj)
     req_headers = {"Accept": "application/json", **(headers or {})}
+    cached: Optional[HttpCacheEntry] = None
+    use_cache = ctx.http_cache is not None and method == "GET" and not any(k.lower().startswith("if-") or k.lower() == "range" for k in req_headers)
+    if use_cache:
+        cached, cond = ctx.http_cache.lookup(url, req_headers)
+        req_headers.update(cond)
+    # Pliki z UploadSource (mmap) wysyłamy strumieniowo zamiast przez files= (requests skleja całe body w pamięci)
+    stream: Optional[MultipartStream] = data if isinstance(data, MultipartStream) else None # Gotowy strumień (benchmarki)
+    if files and any(isinstance(p[2], UploadSource) for p in multipart_parts(files)):
+        stream = MultipartStream(data, multipart_parts(files))
+    if stream is not None:
+        req_headers["Content-Type"] = stream.content_type
     req_headers_log = mask_headers_sensitive(req_headers.copy())
 
     # Przygotuj ciało żądania do logowania (zmaskowane)
@@ -409,15 +795,26 @@ def http_request(ctx: TestContext, title: str, method: str, url: str,
              req_body_log = {"fields": mask_json_sensitive(data or {}), "files": "<unknown_format>"}
         req_is_json = False # To nie jest czysty JSON
         # --- KONIEC MODYFIKACJI ---
+    elif stream is not None:
+        req_body_log = {"multipart_stream": {"bytes": len(stream), "file_bytes": stream.file_bytes}}
     elif data:
         # Dla zwykłego form-data
         req_body_log = mask_json_sensitive(data)
         req_is_json = False
 
     t0 = time.time()
+    t_perf = time.perf_counter()
     resp: Optional[requests.Response] = None
     el = EndpointLog(title=title, method=method, url=url, req_headers=req_headers_log,
                      req_body=req_body_log, req_is_json=req_is_json)
+    if cached is not None: # Świeży wpis (max-age): żądanie nie wychodzi do sieci
+        resp = HttpCache.cached_response(cached, url, download)
+        el.duration_ms = 0.0
+        el.notes.append(f"HTTP cache: fresh hit, no request sent ({cached.body_bytes} bytes saved)")
+        log_exchange(ctx, el, resp)
+        return resp
+    if ctx.stats is not None:
+        ctx.stats.request_started()
 
     try:
         resp = ctx.ses.request(
@@ -425,17 +822,34 @@ def http_request(ctx: TestContext, title: str, method: str, url: str,
             url=url,
             headers=req_headers,
             json=json_body, # requests samo ustawi Content-Type: application/json
-            data=data,     # Dla form-data lub multipart fields
-            files=files,   # Dla multipart files (obsłuży dict i listę tupli)
-            timeout=ctx.timeout
+            data=stream if stream is not None else data, # Dla form-data, multipart fields lub strumienia multipart
+            files=None if stream is not None else files,  # Dla multipart files (obsłuży dict i listę tupli)
+            timeout=ctx.timeout,
+            stream=download is not None,
         )
-        el.duration_ms = (time.time() - t0) * 1000.0
+        if download is not None:
+            consume_download(resp, download, t_perf)
+            el.notes.append(f"Streamed download: {download.bytes} bytes, sha256 {download.sha256[:16]}…, TTFB {download.ttfb_ms:.1f} ms, "
+                            f"{download.mbps:.2f} MB/s (report keeps the first {DOWNLOAD_PREFIX_LIMIT} bytes)")
+        el.duration_ms = (time.time() - t0) * 1000.0 # Przed profilowaniem payloadu — parsowanie JSON nie wlicza się w latencję
+        el.resp_wire_bytes, el.resp_decoded_bytes, el.resp_content_encoding = body_sizes(resp, download)
+        if (ctx.payloads is not None and download is None and resp.status_code == 200
+                and "application/json" in resp.headers.get("Content-Type", "").lower()):
+            try:
+                ctx.payloads.add(route_key(method, url), resp.json(), el.resp_wire_bytes)
+            except ValueError:
+                pass
     except requests.exceptions.RequestException as e:
         el.duration_ms = (time.time() - t0) * 1000.0
         el.notes.append(f"HTTP Request Error: {e}")
         print(c(f"\nHTTP Request Error ({method} {url}): {e}", Fore.RED))
         # Logujemy błąd, ale nie przerywamy testu tutaj - asercje zdecydują
     finally:
+        if ctx.stats is not None:
+            ctx.stats.request_finished(route_key(method, url), el.duration_ms,
+                                       resp.status_code if resp is not None else 599)
+        if ctx.resources is not None and resp is not None:
+            ctx.resources.observe(method, url, req_headers, json_body, resp)
         # Zawsze loguj wymianę, nawet jeśli był błąd sieciowy (resp będzie None)
         log_exchange(ctx, el, resp)
 
@@ -446,10 +860,61 @@ def http_request(ctx: TestContext, title: str, method: str, url: str,
         resp.reason = "Network Error"
         resp._content = b""
         # Nie rzucamy wyjątku tutaj, aby test mógł sprawdzić status 599
+    elif use_cache:
+        resp, note = ctx.http_cache.observe(url, req_headers, resp, download)
+        if note: el.notes.append(note)
+    elif ctx.http_cache is not None and method != "GET" and resp.status_code < 400:
+        ctx.http_cache.invalidate(url)
 
     return resp
 
+# Kodowania, które klient potrafi zdekompresować (br/zstd tylko z opcjonalnymi pakietami brotli/zstandard)
+CLIENT_DECODABLE_ENCODINGS = {"", "identity"} | {e.strip() for e in requests.utils.DEFAULT_ACCEPT_ENCODING.split(",")}
+
+def body_sizes(resp: requests.Response, download: Optional[DownloadStats] = None) -> Tuple[Optional[int], Optional[int], str]:
+    """(bajty body na łączu, bajty po dekompresji, Content-Encoding) dla przeczytanej już odpowiedzi."""
+    enc = resp.headers.get("Content-Encoding", "").strip().lower()
+    wire = None
+    try:
+        wire = resp.raw.tell() if resp.raw is not None else None # urllib3: bajty odczytane z gniazda, przed dekompresją
+    except Exception:
+        pass
+    if wire is None and resp.headers.get("Content-Length", "").isdigit():
+        wire = int(resp.headers["Content-Length"])
+    decoded = download.bytes if download is not None else len(resp.content or b"")
+    return wire, (decoded if enc in CLIENT_DECODABLE_ENCODINGS else None), enc
+
+def fmt_body_sizes(wire: Optional[int], decoded: Optional[int], enc: str) -> str:
+    if wire is None and decoded is None: return ""
+    kb = lambda n: "?" if n is None else (f"{n} B" if n < 1024 else f"{n / 1024:.1f} KB")
+    return kb(decoded) if not enc or enc == "identity" else f"{kb(wire)} {enc} / {kb(decoded)}"
+
+def consume_download(resp: requests.Response, stats: DownloadStats, t_start: float):
+    """Czyta body blokami DOWNLOAD_CHUNK: SHA-256, liczba bajtów, czasy; w resp zostaje tylko prefiks."""
+    h = hashlib.sha256()
+    prefix = bytearray()
+    stats.ttfb_ms = resp.elapsed.total_seconds() * 1000.0
+    try:
+        for chunk in resp.iter_content(DOWNLOAD_CHUNK):
+            if not stats.bytes:
+                stats.first_byte_ms = (time.perf_counter() - t_start) * 1000.0
+            h.update(chunk)
+            stats.bytes += len(chunk)
+            if len(prefix) < DOWNLOAD_PREFIX_LIMIT:
+                prefix += chunk[:DOWNLOAD_PREFIX_LIMIT - len(prefix)]
+    finally:
+        stats.total_ms = (time.perf_counter() - t_start) * 1000.0
+        stats.sha256 = h.hexdigest()
+        resp._content = bytes(prefix) # resp.content / log_exchange widzą tylko prefiks
+        resp._content_consumed = True
+        resp.close()
+
 # Uproszczone funkcje pomocnicze używające http_request
+def http_download(ctx: TestContext, title: str, url: str, headers: Dict[str, str]) -> Tuple[requests.Response, DownloadStats]:
+    """GET pliku ze strumieniowym haszowaniem body; zwraca (odpowiedź z prefiksem body, statystyki)."""
+    stats = DownloadStats()
+    return http_request(ctx, title, "GET", url, headers=headers, download=stats), stats
+
 def http_get(ctx: TestContext, title: str, url: str, headers: Dict[str, str]) -> requests.Response:
     return http_request(ctx, title, "GET", url, headers=headers)
 
@@ -511,6 +976,622 @@ def write_text(path: str, text: Optional[str]):
     except Exception as e:
         print(c(f" Error writing text to {os.path.basename(path)}: {e}", Fore.RED))
 
+def write_json(path: str, obj: Any):
+    """Zapisuje obiekt jako JSON (UTF-8); dataclasses i inne obiekty przez vars()/str()."""
+    def _default(o: Any) -> Any:
+        return vars(o) if hasattr(o, "__dict__") else str(o)
+    write_text(path, json.dumps(obj, ensure_ascii=False, indent=2, default=_default))
+
+# ───────────────────────── Tokeny JWT (cache) ─────────────────────────
+
+def jwt_exp(token: Optional[str]) -> Optional[float]:
+    """Odczytuje claim 'exp' z JWT bez weryfikacji podpisu (tylko do planowania odświeżenia)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp is not None else None
+    except Exception:
+        return None
+
+class TokenCache:
+    """Thread-safe cache JWT per aktor (email): ważny token zastępuje kolejny POST /api/login (bcrypt).
+
+    Token, któremu zostało mniej niż `refresh_margin_s` do 'exp', jest odświeżany przez POST /api/refresh
+    (stary trafia na blacklistę); gdy odświeżenie się nie uda — zwykły login."""
+
+    def __init__(self, refresh_margin_s: float = 120.0):
+        self.lock = threading.Lock()
+        self.refresh_margin_s = refresh_margin_s
+        self.tokens: Dict[str, str] = {}
+        self.hits = 0
+        self.logins = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def store(self, email: str, token: Optional[str], only_if_missing: bool = False):
+        if not email or not token: return
+        with self.lock:
+            if only_if_missing and email in self.tokens: return
+            self.tokens[email] = token
+
+    def forget(self, email: str):
+        with self.lock:
+            self.tokens.pop(email, None)
+
+    def peek(self, ctx: TestContext, email: str) -> Optional[str]:
+        """Zwraca ważny token z cache (odświeżając go przed wygaśnięciem) albo None."""
+        with self.lock:
+            token = self.tokens.get(email)
+        if not token: return None
+        exp, now = jwt_exp(token), time.time()
+        if exp is None or exp - now > self.refresh_margin_s:
+            with self.lock: self.hits += 1
+            return token
+        if exp > now:
+            r = http_post_json(ctx, "AUTH: Refresh token (cache)", build(ctx, "/api/refresh"), {}, auth_headers(token))
+            new_token = must_json(r).get("token") if r.status_code == 200 else None
+            with self.lock:
+                if new_token:
+                    self.refreshes += 1
+                    self.tokens[email] = new_token
+                    return new_token
+                self.refresh_failures += 1
+        self.forget(email)
+        return None
+
+    def token_for(self, ctx: TestContext, email: str, pwd: str, title: str = "AUTH: Login (cache miss)") -> str:
+        """Token aktora z cache; przy braku lub wygaśnięciu loguje się i zapamiętuje nowy."""
+        token = self.peek(ctx, email)
+        if token: return token
+        r = http_post_json(ctx, title, build(ctx, "/api/login"), {"email": email, "password": pwd}, {"Accept": "application/json"})
+        assert r.status_code == 200, f"{title} failed: {r.status_code} {trim(r.text)}"
+        token = must_json(r).get("token")
+        assert token, f"Token not found for {email} in {title}"
+        with self.lock: self.logins += 1
+        self.store(email, token)
+        return token
+
+    def counters(self) -> Dict[str, int]:
+        with self.lock:
+            return {"hits": self.hits, "logins": self.logins, "refreshes": self.refreshes, "refresh_failures": self.refresh_failures}
+
+def refresh_actor_tokens(ctx: TestContext):
+    """Przed kolejnym przebiegiem (load/soak) podmienia tokeny aktorów na ważne — przebiegi dłuższe niż TTL JWT."""
+    if ctx.tokens is None: return
+    if ctx.emailOwner and ctx.pwdOwner:
+        ctx.tokenOwner = ctx.tokens.token_for(ctx, ctx.emailOwner, ctx.pwdOwner)
+    if ctx.emailB and ctx.pwdB:
+        ctx.tokenB = ctx.tokens.token_for(ctx, ctx.emailB, ctx.pwdB)
+
+# ───────────────────────── Cache HTTP klienta (żądania warunkowe) ─────────────────────────
+
+HTTP_CACHE_MAX_BODY = 1024 * 1024 # Większe odpowiedzi JSON nie trafiają do cache (pobrania strumieniowe trzymają tylko prefiks)
+
+def cache_control(headers: Any) -> Dict[str, Optional[str]]:
+    """Parsuje Cache-Control do {dyrektywa: wartość lub None}."""
+    out: Dict[str, Optional[str]] = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        k, _, v = part.strip().partition("=")
+        if k: out[k.lower()] = v.strip('"') or None
+    return out
+
+@dataclass
+class HttpCacheEntry:
+    status: int
+    headers: Dict[str, str]
+    content: bytes             # Body albo (pobranie strumieniowe) jego prefiks
+    body_bytes: int            # Pełny rozmiar body (bajty oszczędzone przy 304 / świeżym trafieniu)
+    sha256: str                # Dla pobrań strumieniowych (DownloadStats przy odpowiedzi z cache)
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+    max_age: Optional[float]   # None = każde użycie wymaga rewalidacji
+
+class HttpCache:
+    """Prywatny cache HTTP jak w kliencie mobilnym: ETag / Last-Modified / Cache-Control.
+
+    Świeże wpisy (max-age, bez no-cache) są zwracane bez żądania, pozostałe rewalidowane przez
+    If-None-Match / If-Modified-Since. 304 zamieniane jest na zapamiętaną odpowiedź 200, więc kroki
+    testów widzą zwykły wynik. Klucz: (URL, nagłówek Authorization) — odpowiedzi są per użytkownik."""
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], HttpCacheEntry] = {}
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _route(self, url: str) -> Dict[str, Any]:
+        return self._routes.setdefault(route_key("GET", url), {
+            "requests": 0, "fresh_hits": 0, "conditional": 0, "not_modified": 0, "bytes_transferred": 0,
+            "bytes_saved": 0, "with_validators": 0, "no_validators": 0, "no_store": 0, "cache_control": ""})
+
+    def lookup(self, url: str, headers: Dict[str, str]) -> Tuple[Optional[HttpCacheEntry], Dict[str, str]]:
+        """Zwraca (świeży wpis do podania bez żądania, nagłówki warunkowe do dołożenia)."""
+        key = (url, headers.get("Authorization", ""))
+        with self._lock:
+            st = self._route(url)
+            st["requests"] += 1
+            e = self._entries.get(key)
+            if e is None: return None, {}
+            if e.max_age is not None and time.time() - e.stored_at < e.max_age:
+                st["fresh_hits"] += 1
+                st["bytes_saved"] += e.body_bytes
+                return e, {}
+            st["conditional"] += 1
+        cond = {}
+        if e.etag: cond["If-None-Match"] = e.etag
+        if e.last_modified: cond["If-Modified-Since"] = e.last_modified
+        return None, cond
+
+    def invalidate(self, url: str):
+        """Po udanej modyfikacji (POST/PUT/PATCH/DELETE) usuwa wpisy URL-a i jego podzasobów."""
+        base = url.split("?")[0]
+        with self._lock:
+            for key in [k for k in self._entries if k[0].split("?")[0] == base or k[0].startswith(base + "/")]:
+                del self._entries[key]
+
+    def observe(self, url: str, headers: Dict[str, str], resp: requests.Response,
+                download: Optional[DownloadStats]) -> Tuple[requests.Response, Optional[str]]:
+        """Przetwarza odpowiedź GET; zwraca (odpowiedź dla wywołującego, notatkę do logu lub None)."""
+        key = (url, headers.get("Authorization", ""))
+        cc = cache_control(resp.headers)
+        max_age = None if "no-cache" in cc or "max-age" not in cc else float(cc["max-age"] or 0)
+        with self._lock:
+            st = self._route(url)
+            if resp.headers.get("Cache-Control"): st["cache_control"] = resp.headers["Cache-Control"]
+            e = self._entries.get(key)
+            if resp.status_code == 304 and e is not None:
+                st["not_modified"] += 1
+                st["bytes_saved"] += e.body_bytes
+                e.stored_at, e.max_age = time.time(), max_age if max_age is not None else e.max_age
+                return self.cached_response(e, url, download), f"HTTP cache: 304 Not Modified, served {e.body_bytes} cached bytes"
+            if resp.status_code != 200:
+                self._entries.pop(key, None)
+                return resp, None
+            size = download.bytes if download is not None else len(resp.content or b"")
+            st["bytes_transferred"] += size
+            if "no-store" in cc:
+                st["no_store"] += 1
+                self._entries.pop(key, None)
+                return resp, None
+            etag, lm = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+            st["with_validators" if etag or lm else "no_validators"] += 1
+            if not (etag or lm or max_age) or (download is None and size > HTTP_CACHE_MAX_BODY):
+                self._entries.pop(key, None)
+                return resp, None
+            self._entries[key] = HttpCacheEntry(status=200, headers=dict(resp.headers), content=resp.content or b"", body_bytes=size,
+                                                sha256=download.sha256 if download is not None else "", etag=etag,
+                                                last_modified=lm, stored_at=time.time(), max_age=max_age)
+        return resp, None
+
+    @staticmethod
+    def cached_response(e: HttpCacheEntry, url: str, download: Optional[DownloadStats]) -> requests.Response:
+        r = requests.Response()
+        r.status_code = e.status
+        r.reason = "OK (cache)"
+        r.url = url
+        r.headers = requests.structures.CaseInsensitiveDict(e.headers)
+        r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+        r._content = e.content
+        if download is not None:
+            download.bytes, download.sha256 = e.body_bytes, e.sha256
+        return r
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {k: dict(v) for k, v in self._routes.items()}
+        tot = {k: sum(r[k] for r in routes.values()) for k in ("requests", "fresh_hits", "conditional", "not_modified", "bytes_transferred", "bytes_saved")}
+        tot["not_modified_rate"] = tot["not_modified"] / tot["conditional"] if tot["conditional"] else 0.0
+        # Kandydaci: odpowiedzi 200 bez no-store, ale bez ETag/Last-Modified — klient nie ma czym rewalidować
+        missing = sorted(k for k, r in routes.items() if r["no_validators"] and not r["with_validators"])
+        return {"totals": tot, "routes": routes, "cacheable_without_validators": missing}
+
+def report_http_cache(ctx: TestContext):
+    """Drukuje statystyki cache HTTP (304, bajty oszczędzone) i zapisuje HttpCache.json."""
+    snap = ctx.http_cache.snapshot()
+    rows = [[k, r["requests"], r["fresh_hits"], r["conditional"], r["not_modified"],
+             f"{r['not_modified'] / r['conditional'] * 100:.0f}%" if r["conditional"] else "-",
+             f"{r['bytes_saved'] / 1024:.1f}", f"{r['bytes_transferred'] / 1024:.1f}",
+             "yes" if r["with_validators"] else ("no" if r["no_validators"] else "-"), trim(r["cache_control"], 40)]
+            for k, r in sorted(snap["routes"].items(), key=lambda kv: -kv[1]["requests"])]
+    print(c(f"\n{BOX}\n{ICON_INFO} HTTP CACHE (conditional requests)\n{BOX}", Fore.YELLOW))
+    print(tabulate(rows, headers=["Route", "GETs", "Fresh", "Cond.", "304", "304 rate", "KB saved", "KB recv", "Validators", "Cache-Control"],
+                   tablefmt="grid"))
+    tot = snap["totals"]
+    print(f" {ICON_DOWN} 304: {tot['not_modified']}/{tot['conditional']} conditional ({tot['not_modified_rate'] * 100:.1f}%), "
+          f"fresh hits {tot['fresh_hits']}, saved {tot['bytes_saved'] / 1024:.1f} KB of "
+          f"{(tot['bytes_saved'] + tot['bytes_transferred']) / 1024:.1f} KB")
+    if snap["cacheable_without_validators"]:
+        print(c(f" {ICON_INFO} Cacheable GET routes without ETag/Last-Modified: {len(snap['cacheable_without_validators'])}", Fore.YELLOW))
+        for k in snap["cacheable_without_validators"][:15]:
+            print(c(f"    {k}", Fore.YELLOW))
+    write_json(os.path.join(ctx.output_dir, "HttpCache.json"), snap)
+    print(c(f"📄 Zapisano statystyki cache: {os.path.join(ctx.output_dir, 'HttpCache.json')}", Fore.CYAN))
+
+# ───────────────────────── Rejestr zasobów i sprzątanie ─────────────────────────
+
+# Kolejność usuwania odwrotna do zależności: pliki notatek i pytania znikają z notatką/testem (eventy modeli
+# usuwają też pliki z dysku), kursy po swoich udostępnieniach, konta na końcu (kaskada w DB nie usuwa plików)
+TEARDOWN_TIERS = (("test", "note"), ("course",), ("user",))
+RESOURCE_JOURNAL = "Resources.jsonl" # Dziennik kont przebiegu (email, hasło) — wejście trybu sweep po awarii
+
+def bearer_of(headers: Optional[Dict[str, str]]) -> Optional[str]:
+    v = next((v for k, v in (headers or {}).items() if k.lower() == "authorization"), "")
+    return v[7:] if v.startswith("Bearer ") else None
+
+class ResourceRegistry:
+    """Encje utworzone przez harness (z właścicielem), wypełniane w http_request; wspólne dla wątków.
+
+    Usunięcie przez API (także przez zwykłe kroki cleanup) wypisuje encję z rejestru, więc teardown() usuwa
+    tylko to, co zostało — również po błędzie krytycznym lub Ctrl-C. Konta są od razu dopisywane do dziennika
+    (journal), żeby tryb sweep mógł je znaleźć nawet po przerwanym procesie."""
+    def __init__(self, me_prefix: str, journal: Optional[str] = None):
+        self._lock = threading.Lock()
+        self.journal = journal
+        self.items: Dict[Tuple[str, Any], Dict[str, Any]] = {} # (kind, id) -> {kind, id, owner, token, created_at}
+        self.creds: Dict[str, str] = {}                          # email -> hasło (z rejestracji/logowania)
+        self.token_owner: Dict[str, str] = {}                    # JWT -> email
+        p = re.escape(me_prefix.strip("/"))
+        self._create_re = re.compile(rf"^/api/{p}/(notes|courses|tests)/?$")
+        self._delete_re = re.compile(rf"^/api/{p}/(notes|courses|tests)/(\d+)/?$")
+        self._profile_re = re.compile(rf"^/api/{p}/profile/?$")
+
+    def observe(self, method: str, url: str, headers: Dict[str, str], json_body: Any, resp: requests.Response):
+        path, status = urlsplit(url).path, resp.status_code
+        token = bearer_of(headers)
+        body = json_body if isinstance(json_body, dict) else {}
+        if status >= 300 and not (method == "DELETE" and status == 404):
+            return
+        with self._lock:
+            owner = self.token_owner.get(token or "")
+            if method == "POST" and path.endswith("/api/users/register") and body.get("email"):
+                self.creds[body["email"]] = body.get("password", "")
+                self._journal(body["email"])
+                self.items[("user", body["email"])] = {"kind": "user", "id": body["email"], "owner": body["email"],
+                                                       "token": None, "created_at": time.time()}
+            elif method == "POST" and path.endswith("/api/login") and body.get("email"):
+                new = self._json(resp).get("token")
+                self.creds.setdefault(body["email"], body.get("password", ""))
+                if new: self.token_owner[new] = body["email"]
+            elif method == "POST" and path.endswith("/api/refresh") and owner:
+                new = self._json(resp).get("token")
+                if new: self.token_owner[new] = owner
+            elif self._profile_re.match(path) and owner:
+                if method == "DELETE": # Wiersze właściciela usuwa kaskada w DB
+                    for key in [k for k, r in self.items.items() if r["owner"] == owner or k == ("user", owner)]:
+                        self.items.pop(key)
+                elif body.get("password"):
+                    self.creds[owner] = body["password"]
+                    self._journal(owner)
+                elif body.get("email") and body["email"] != owner:
+                    self._rename(owner, body["email"])
+                    self._journal(body["email"], renamed_from=owner)
+            elif method == "POST" and self._create_re.match(path):
+                kind = self._create_re.match(path).group(1)[:-1]
+                data = self._json(resp)
+                rid = (data.get(kind) if isinstance(data.get(kind), dict) else data).get("id")
+                if rid:
+                    self.items[(kind, int(rid))] = {"kind": kind, "id": int(rid), "owner": owner, "token": token, "created_at": time.time()}
+            elif method == "DELETE" and self._delete_re.match(path):
+                m = self._delete_re.match(path)
+                self.items.pop((m.group(1)[:-1], int(m.group(2))), None)
+
+    def add(self, kind: str, rid: Any, owner: str):
+        with self._lock:
+            self.items[(kind, rid)] = {"kind": kind, "id": rid, "owner": owner, "token": None, "created_at": time.time()}
+
+    def _journal(self, email: str, **extra: Any):
+        if not self.journal: return
+        with open(self.journal, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"email": email, "password": self.creds.get(email, ""), **extra}) + "\n")
+
+    def _rename(self, old: str, new: str):
+        self.creds[new] = self.creds.pop(old, "")
+        for tok, e in list(self.token_owner.items()):
+            if e == old: self.token_owner[tok] = new
+        for rec in self.items.values():
+            if rec["owner"] == old: rec["owner"] = new
+        if ("user", old) in self.items:
+            rec = self.items.pop(("user", old)); rec["id"] = new
+            self.items[("user", new)] = rec
+
+    @staticmethod
+    def _json(resp: requests.Response) -> Dict[str, Any]:
+        try:
+            data = resp.json()
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def pending(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(r) for r in self.items.values()]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"items": [dict(r) for r in self.items.values()], "creds": dict(self.creds), "token_owner": dict(self.token_owner)}
+
+    def restore(self, snap: Dict[str, Any]):
+        """Przejmuje encje przebiegu wznawianego z checkpointu (teardown tego uruchomienia obejmie też je)."""
+        with self._lock:
+            self.creds.update(snap.get("creds", {}))
+            self.token_owner.update(snap.get("token_owner", {}))
+            for r in snap.get("items", []):
+                self.items[(r["kind"], r["id"])] = r
+
+    def counts(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        for r in self.pending():
+            out[r["kind"]] = out.get(r["kind"], 0) + 1
+        return out
+
+def teardown_resources(ctx: TestContext, workers: int = 8) -> Dict[str, Any]:
+    """Usuwa pozostałe encje z ctx.resources warstwami (TEARDOWN_TIERS), w każdej warstwie pulą wątków.
+
+    Token właściciela: świeży login (hasło z rejestru; tokeny mogły zostać unieważnione), inaczej zapisany JWT."""
+    reg = ctx.resources
+    tokens: Dict[str, Optional[str]] = {}
+    lock = threading.Lock()
+    summary: Dict[str, Any] = {"deleted": {}, "gone": {}, "failed": [], "started_at": time.time()}
+
+    def _token(c_: TestContext, rec: Dict[str, Any]) -> Optional[str]:
+        email = rec["owner"]
+        with lock:
+            if email in tokens: return tokens[email] or rec["token"]
+            pwd = reg.creds.get(email or "")
+        tok = None
+        if email and pwd:
+            r = http_post_json(c_, "TEARDOWN: Login owner", build(c_, "/api/login"), {"email": email, "password": pwd}, {"Accept": "application/json"})
+            if r.status_code == 200:
+                tok = ResourceRegistry._json(r).get("token")
+        with lock:
+            tokens[email] = tok
+        return tok or rec["token"]
+
+    def _delete(c_: TestContext, rec: Dict[str, Any]):
+        url = me(c_, "/profile") if rec["kind"] == "user" else me(c_, f"/{rec['kind']}s/{rec['id']}")
+        token = _token(c_, rec)
+        r = http_delete(c_, f"TEARDOWN: Delete {rec['kind']}", url, auth_headers(token)) if token else None
+        with lock:
+            if r is not None and r.status_code in (200, 204):
+                summary["deleted"][rec["kind"]] = summary["deleted"].get(rec["kind"], 0) + 1
+            elif r is not None and r.status_code == 404:
+                summary["gone"][rec["kind"]] = summary["gone"].get(rec["kind"], 0) + 1
+            else:
+                summary["failed"].append({**rec, "status": r.status_code if r is not None else None})
+
+    for tier in TEARDOWN_TIERS:
+        queue: Deque[Dict[str, Any]] = deque(r for r in reg.pending() if r["kind"] in tier)
+        if not queue: continue
+
+        def _work():
+            c_ = fork_context(ctx)
+            c_.record_endpoints = False
+            while True:
+                with lock:
+                    if not queue: return
+                    rec = queue.popleft()
+                try:
+                    _delete(c_, rec)
+                except Exception as e:
+                    with lock: summary["failed"].append({**rec, "status": None, "error": f"{type(e).__name__}: {e}"})
+
+        threads = [threading.Thread(target=_work, name=f"teardown-{n}", daemon=True) for n in range(max(1, min(workers, len(queue))))]
+        for th in threads: th.start()
+        for th in threads:
+            while th.is_alive(): th.join(timeout=0.5)
+    summary["duration_s"] = time.time() - summary.pop("started_at")
+    return summary
+
+def report_teardown(ctx: TestContext, workers: int):
+    """Sprząta encje z rejestru i zapisuje Teardown.json (pozostałości z nieudanym usunięciem trafiają do 'failed')."""
+    if not ctx.resources.pending():
+        return
+    print(c(f"\n{ICON_TRASH} Teardown: {ctx.resources.counts()} left by the run, {workers} workers", Fore.WHITE))
+    summary = teardown_resources(ctx, workers)
+    print(f" {ICON_OK} deleted {summary['deleted']}, already gone {summary['gone']}, failed {len(summary['failed'])} in {summary['duration_s']:.1f}s")
+    for f in summary["failed"][:10]:
+        print(c(f"  {ICON_FAIL} {f['kind']} {f['id']} (owner {f['owner']}): status {f['status']}", Fore.RED))
+    write_json(os.path.join(ctx.output_dir, "Teardown.json"), summary)
+    print(c(f"📄 Zapisano raport sprzątania: {os.path.join(ctx.output_dir, 'Teardown.json')}", Fore.CYAN))
+
+# ───────────────────────── Metryki na żywo (tryb load) ─────────────────────────
+
+ROUTE_NUM_RE = re.compile(r"/\d+(?=/|$)")
+ROUTE_INVITE_RE = re.compile(r"/invitations/[^/]+/")
+
+def route_key(method: str, url: str) -> str:
+    """Zamienia URL na szablon trasy (np. 'GET /api/me/notes/{id}') do agregacji metryk."""
+    path = urlsplit(url).path or "/"
+    path = ROUTE_NUM_RE.sub("/{id}", path)
+    path = ROUTE_INVITE_RE.sub("/invitations/{token}/", path)
+    return f"{method.upper()} {path}"
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentyl metodą nearest-rank (values nie muszą być posortowane)."""
+    if not values: return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[k]
+
+def is_error_status(status: Optional[int]) -> bool:
+    """Błąd z punktu widzenia obciążenia: brak odpowiedzi (599) lub 5xx. 4xx to zwykle oczekiwane asercje."""
+    return status is None or status >= 500
+
+@dataclass
+class WorkerHealth:
+    """Stan pojedynczego wątku roboczego w trybie load."""
+    name: str
+    state: str = "starting"  # starting / running / failed / stopped
+    iterations: int = 0      # Ukończone przebiegi przepływów
+    failures: int = 0        # Przebiegi zakończone wyjątkiem/asercją
+    last_error: Optional[str] = None
+    last_seen: float = field(default_factory=time.time)
+
+class LiveStats:
+    """Thread-safe agregat metryk żądań: liczniki, in-flight i kroczące okna czasów per trasa."""
+
+    def __init__(self, window: int = 2000, rate_window_s: float = 10.0):
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.window = window               # Ile ostatnich czasów trzymamy per trasa (p50/p99)
+        self.rate_window_s = rate_window_s # Okno dla bieżącego req/s
+        self.total = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.route_ms: Dict[str, Deque[float]] = {}
+        self.route_counts: Dict[str, List[int]] = {} # route -> [count, errors]
+        self.recent: Deque[float] = deque()          # Znaczniki czasu zakończonych żądań
+        self.workers: Dict[str, WorkerHealth] = {}
+        # Kubełek czasowy (tryb soak): wszystkie czasy od ostatniego drain_bucket(); zbierany tylko z podpiętym SoakSampler
+        self.bucketing = False
+        self.bucket_ms: Dict[str, List[float]] = {}
+        self.bucket_errors = 0
+        self.bucket_started = self.started_at
+
+    def request_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def request_finished(self, route: str, duration_ms: float, status: Optional[int]):
+        now = time.time()
+        err = is_error_status(status)
+        with self.lock:
+            self.in_flight -= 1
+            self.total += 1
+            if err: self.errors += 1
+            window = self.route_ms.get(route)
+            if window is None:
+                window = self.route_ms[route] = deque(maxlen=self.window)
+                self.route_counts[route] = [0, 0]
+            window.append(duration_ms)
+            counts = self.route_counts[route]
+            counts[0] += 1
+            if err: counts[1] += 1
+            if self.bucketing: # Bez samplera nikt nie opróżnia kubełka — lista rosłaby bez końca
+                self.bucket_ms.setdefault(route, []).append(duration_ms)
+                if err: self.bucket_errors += 1
+            self.recent.append(now)
+            cutoff = now - self.rate_window_s
+            while self.recent and self.recent[0] < cutoff:
+                self.recent.popleft()
+
+    def drain_bucket(self) -> Tuple[float, float, Dict[str, List[float]], int]:
+        """Zwraca (start, koniec, czasy per trasa, błędy) bieżącego kubełka i zaczyna nowy."""
+        now = time.time()
+        with self.lock:
+            out = (self.bucket_started, now, self.bucket_ms, self.bucket_errors)
+            self.bucket_ms, self.bucket_errors, self.bucket_started = {}, 0, now
+        return out
+
+    def worker(self, name: str) -> WorkerHealth:
+        """Rejestruje (lub zwraca) stan wątku roboczego."""
+        with self.lock:
+            return self.workers.setdefault(name, WorkerHealth(name=name))
+
+    def worker_update(self, name: str, state: Optional[str] = None, ok: Optional[bool] = None, error: Optional[str] = None):
+        with self.lock:
+            w = self.workers.setdefault(name, WorkerHealth(name=name))
+            if state: w.state = state
+            if ok is True: w.iterations += 1
+            if ok is False:
+                w.failures += 1
+                w.last_error = error
+            w.last_seen = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Zwraca spójną kopię metryk (liczenie percentyli poza lockiem)."""
+        now = time.time()
+        with self.lock:
+            routes = {r: (list(ms), list(self.route_counts[r])) for r, ms in self.route_ms.items()}
+            recent = [t for t in self.recent if t >= now - self.rate_window_s]
+            workers = [WorkerHealth(**vars(w)) for w in self.workers.values()]
+            total, errors, in_flight = self.total, self.errors, self.in_flight
+        elapsed = max(now - self.started_at, 1e-6)
+        rate_span = min(self.rate_window_s, elapsed)
+        return {
+            "elapsed_s": elapsed,
+            "total": total,
+            "errors": errors,
+            "error_rate": (errors / total) if total else 0.0,
+            "in_flight": in_flight,
+            "rps_overall": total / elapsed,
+            "rps_current": len(recent) / rate_span if rate_span > 0 else 0.0,
+            "routes": {
+                r: {"count": cnt[0], "errors": cnt[1],
+                    "p50_ms": percentile(ms, 50), "p99_ms": percentile(ms, 99)}
+                for r, (ms, cnt) in routes.items()
+            },
+            "workers": workers,
+        }
+
+@contextlib.contextmanager
+def muted_console():
+    """Przekierowuje stdout do os.devnull (printy kroków i kolorowanie per żądanie kosztują CPU).
+
+    Zwraca oryginalny strumień, na który pisze LiveDashboard i podsumowanie."""
+    real = sys.stdout
+    with open(os.devnull, "w", encoding="utf-8") as sink:
+        sys.stdout = sink
+        try:
+            yield real
+        finally:
+            sys.stdout = real
+
+class LiveDashboard:
+    """Wątek odświeżający widok terminala co `interval` sekund na podstawie LiveStats.snapshot()."""
+
+    def __init__(self, stats: LiveStats, stream: Any, interval: float = 2.0, title: str = "LOAD"):
+        self.stats = stats
+        self.stream = stream
+        self.interval = max(0.2, interval)
+        self.title = title
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="live-dashboard", daemon=True)
+        self._tty = bool(getattr(stream, "isatty", lambda: False)())
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.interval + 1.0)
+        self._draw() # Ostatni stan
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._draw()
+
+    def _draw(self):
+        text = self.render(self.stats.snapshot())
+        try:
+            # Na TTY czyścimy ekran (ANSI), w logach/CI dopisujemy kolejne bloki
+            self.stream.write(("\x1b[H\x1b[2J" if self._tty else "") + text + "\n")
+            self.stream.flush()
+        except Exception:
+            pass # Dashboard nie może przerwać przebiegu
+
+    def render(self, snap: Dict[str, Any]) -> str:
+        """Buduje tekst dashboardu (bez kolorów colorama, tylko tabulate)."""
+        head = (f"{ICON_CLOCK} {self.title} {snap['elapsed_s']:.0f}s | req {snap['total']} | "
+                f"req/s {snap['rps_current']:.1f} (avg {snap['rps_overall']:.1f}) | "
+                f"in-flight {snap['in_flight']} | errors {snap['errors']} ({snap['error_rate'] * 100:.2f}%)")
+        rows = [[r, v["count"], v["errors"], f"{v['p50_ms']:.1f}", f"{v['p99_ms']:.1f}"]
+                for r, v in sorted(snap["routes"].items(), key=lambda kv: -kv[1]["count"])]
+        routes_tbl = tabulate(rows, headers=["Route", "Count", "Err", "p50 ms", "p99 ms"], tablefmt="simple") if rows else "(no requests yet)"
+        workers = snap["workers"]
+        by_state: Dict[str, int] = {}
+        for w in workers:
+            by_state[w.state] = by_state.get(w.state, 0) + 1
+        now = time.time()
+        stale = [w for w in workers if w.state == "running" and now - w.last_seen > max(30.0, self.interval * 10)]
+        health = " ".join(f"{k}={v}" for k, v in sorted(by_state.items())) or "-"
+        lines = [head, BOX, routes_tbl, BOX, f"{ICON_USER} workers: {health} | stale: {len(stale)}"]
+        failing = sorted((w for w in workers if w.last_error), key=lambda w: -w.last_seen)[:5]
+        for w in failing:
+            lines.append(f"  {w.name}: it={w.iterations} fail={w.failures} last: {trim(w.last_error or '', 110)}")
+        return "\n".join(lines)
+
 # ───────────────────────── Główny Runner ─────────────────────────
 
 class E2ETester:
@@ -518,9 +1599,13 @@ class E2ETester:
         self.ctx = ctx
         self.results: List[TestRecord] = []
         self.steps: List[Tuple[str, Callable[[], Dict[str, Any]]]] = [] # Zostanie wypełnione w run()
+        self.step_requires: Dict[int, List[str]] = {} # Krok (1-based) -> metody wymaganych kroków (z listy w run())
+        self.checkpoint_path: Optional[str] = None # Checkpoints.jsonl bieżącego przebiegu (--checkpoint)
+        self.selection: Optional[Dict[str, Any]] = None # Filtry --only/--skip/--tag (None = wszystkie kroki)
+        self.profiler: Optional[StepProfiler] = None # --profile: cProfile wokół każdego _exec
 
-    def run(self):
-        """Definiuje i wykonuje wszystkie kroki testowe."""
+    def run(self, resume: Optional[Dict[str, Any]] = None):
+        """Definiuje i wykonuje wszystkie kroki testowe; z `resume` zaczyna od kroku odtworzonego z checkpointu."""
         # MODYFIKACJA: Usunięto ustawienie transcripts_dir
         # self.ctx.transcripts_dir = os.path.join(self.ctx.output_dir, "transcripts")
 
@@ -528,21 +1613,21 @@ class E2ETester:
         self.steps = [
             # === 1. User API ===
             ("USER: Rejestracja (A)", self.t_user_register_A),
-            ("USER: Login (A)", self.t_user_login_A),
+            ("USER: Login (A)", self.t_user_login_A, [self.t_user_register_A]),
             ("USER: Profil bez autoryzacji", self.t_user_profile_unauth),
-            ("USER: Profil z autoryzacją", self.t_user_profile_auth),
+            ("USER: Profil z autoryzacją", self.t_user_profile_auth, [self.t_user_login_A]),
             ("USER: Rejestracja (B) do konfliktu", self.t_user_register_B),
-            ("USER: PATCH name (JSON)", self.t_user_patch_name_json),
-            ("USER: PATCH email — konflikt (JSON)", self.t_user_patch_email_conflict_json),
-            ("USER: PATCH email — poprawny (JSON)", self.t_user_patch_email_ok_json),
-            ("USER: PATCH password (JSON) + weryfikacja", self.t_user_patch_password_json),
-            ("USER: Avatar — brak pliku", self.t_user_avatar_missing),
-            ("USER: Avatar — upload", self.t_user_avatar_upload),
-            ("USER: Avatar — download", self.t_user_avatar_download),
-            ("USER: Logout", self.t_user_logout),
-            ("USER: Re-login (A) przed DELETE", self.t_user_relogin_A),
-            ("USER: DELETE profile (A)", self.t_user_delete_profile),
-            ("USER: Login po DELETE (A) -> fail", self.t_user_login_after_delete_should_fail),
+            ("USER: PATCH name (JSON)", self.t_user_patch_name_json, [self.t_user_login_A]),
+            ("USER: PATCH email — konflikt (JSON)", self.t_user_patch_email_conflict_json, [self.t_user_login_A, self.t_user_register_B]),
+            ("USER: PATCH email — poprawny (JSON)", self.t_user_patch_email_ok_json, [self.t_user_login_A]),
+            ("USER: PATCH password (JSON) + weryfikacja", self.t_user_patch_password_json, [self.t_user_patch_email_ok_json]),
+            ("USER: Avatar — brak pliku", self.t_user_avatar_missing, [self.t_user_patch_password_json]),
+            ("USER: Avatar — upload", self.t_user_avatar_upload, [self.t_user_patch_password_json]),
+            ("USER: Avatar — download", self.t_user_avatar_download, [self.t_user_avatar_upload]),
+            ("USER: Logout", self.t_user_logout, [self.t_user_patch_password_json]),
+            ("USER: Re-login (A) przed DELETE", self.t_user_relogin_A, [self.t_user_patch_password_json]),
+            ("USER: DELETE profile (A)", self.t_user_delete_profile, [self.t_user_relogin_A]),
+            ("USER: Login po DELETE (A) -> fail", self.t_user_login_after_delete_should_fail, [self.t_user_delete_profile]),
 
             # === 2. Setup Głównych Aktorów ===
             ("SETUP: Rejestracja Owner (A)", self.t_setup_register_OwnerA),
@@ -552,219 +1637,278 @@ class E2ETester:
             ("SETUP: Rejestracja Moderator (E)", self.t_setup_register_ModeratorE),
 
             # === 3. Note API (Uwzględnia 1:N Pliki i N:M Kursy) ===
-            ("NOTE: Login (Owner A)", self.t_note_login_A),
-            ("NOTE: Index (initial empty)", self.t_note_index_initial),
-            ("NOTE: Store: missing files[] → 400/422", self.t_note_store_missing_file),
-            ("NOTE: Store: invalid mime (files[]) → 400/422", self.t_note_store_invalid_mime),
-            ("NOTE: Store: ok (multipart files[]) Note A", self.t_note_store_ok), # Tworzy note_id_A
-            ("NOTE: Index contains created Note A (with files)", self.t_note_index_contains_created),
-            ("NOTE: Login (Member B)", self.t_note_login_B),
-            (f"{ICON_LOCK} NOTE: Show foreign note (B) → 403/404", self.t_note_show_foreign_403), # ZMIANA: Test 'show' zamiast 'download'
-            ("NOTE: Login (Owner A) again", self.t_note_login_A_again),
-            ("NOTE: PATCH title only (Note A)", self.t_note_patch_title_only),
-            ("NOTE: PATCH is_private invalid → 400/422", self.t_note_patch_is_private_invalid),
-            ("NOTE: PATCH description + is_private=false (Note A)", self.t_note_patch_desc_priv_false),
+            ("NOTE: Login (Owner A)", self.t_note_login_A, [self.t_setup_register_OwnerA]),
+            ("NOTE: Index (initial empty)", self.t_note_index_initial, [self.t_note_login_A]),
+            ("NOTE: Store: missing files[] → 400/422", self.t_note_store_missing_file, [self.t_note_login_A]),
+            ("NOTE: Store: invalid mime (files[]) → 400/422", self.t_note_store_invalid_mime, [self.t_note_login_A]),
+            ("NOTE: Store: ok (multipart files[]) Note A", self.t_note_store_ok, [self.t_note_login_A]), # Tworzy note_id_A
+            ("NOTE: Index contains created Note A (with files)", self.t_note_index_contains_created, [self.t_note_store_ok]),
+            ("NOTE: Login (Member B)", self.t_note_login_B, [self.t_setup_register_MemberB]),
+            (f"{ICON_LOCK} NOTE: Show foreign note (B) → 403/404", self.t_note_show_foreign_403, [self.t_note_store_ok, self.t_note_login_B]), # ZMIANA: Test 'show' zamiast 'download'
+            ("NOTE: Login (Owner A) again", self.t_note_login_A_again, [self.t_setup_register_OwnerA]),
+            ("NOTE: PATCH title only (Note A)", self.t_note_patch_title_only, [self.t_note_store_ok, self.t_note_login_A_again]),
+            ("NOTE: PATCH is_private invalid → 400/422", self.t_note_patch_is_private_invalid, [self.t_note_store_ok, self.t_note_login_A_again]),
+            ("NOTE: PATCH description + is_private=false (Note A)", self.t_note_patch_desc_priv_false, [self.t_note_store_ok, self.t_note_login_A_again]),
 
             # --- ZMODYFIKOWANE I NOWE TESTY ZARZĄDZANIA PLIKAMI ---
-            (f"{ICON_IMG} NOTE: Add file: missing 'file' → 400/422", self.t_note_add_file_missing), # ZMIANA: Testuje POST .../files
-            (f"{ICON_IMG} NOTE: Add second file ok (Note A)", self.t_note_add_second_file_ok), # ZMIANA: Testuje POST .../files
-            (f"{ICON_DOWN} NOTE: Download first file (Note A) ok", self.t_note_download_first_file_ok), # ZMIANA: Testuje GET .../files/fileId/download
-            (f"{ICON_TRASH} NOTE: Delete second file (Note A)", self.t_note_delete_second_file), # NOWY TEST
-            (f"{ICON_LIST} NOTE: Verify one file remains", self.t_note_verify_one_file_remains), # NOWY TEST
-            (f"{ICON_TRASH} NOTE: Delete last file (Note A)", self.t_note_delete_last_file), # NOWY TEST
-
-            (f"{ICON_IMG} NOTE: Add file after empty (Note A)", self.t_note_add_file_after_empty), # NOWY TEST
+            (f"{ICON_IMG} NOTE: Add file: missing 'file' → 400/422", self.t_note_add_file_missing, [self.t_note_store_ok, self.t_note_login_A_again]), # ZMIANA: Testuje POST .../files
+            (f"{ICON_IMG} NOTE: Add second file ok (Note A)", self.t_note_add_second_file_ok, [self.t_note_store_ok, self.t_note_login_A_again]), # ZMIANA: Testuje POST .../files
+            (f"{ICON_DOWN} NOTE: Download first file (Note A) ok", self.t_note_download_first_file_ok, [self.t_note_store_ok, self.t_note_login_A_again]), # ZMIANA: Testuje GET .../files/fileId/download
+            (f"{ICON_TRASH} NOTE: Delete second file (Note A)", self.t_note_delete_second_file, [self.t_note_add_second_file_ok]), # NOWY TEST
+            (f"{ICON_LIST} NOTE: Verify one file remains", self.t_note_verify_one_file_remains, [self.t_note_delete_second_file]), # NOWY TEST
+            (f"{ICON_TRASH} NOTE: Delete last file (Note A)", self.t_note_delete_last_file, [self.t_note_delete_second_file]), # NOWY TEST
+
+            (f"{ICON_IMG} NOTE: Add file after empty (Note A)", self.t_note_add_file_after_empty, [self.t_note_delete_last_file]), # NOWY TEST
             # --- KONIEC TESTÓW ZARZĄDZANIA PLIKAMI ---
 
             # Testy udostępniania N:M
-            ("NOTE: Create Course 1 for sharing", self.t_note_create_course1), # Tworzy course_id_1
-            ("NOTE: Share Note A to Course 1", self.t_note_share_to_course1),
-            ("NOTE: Verify Note A shows Course 1", self.t_note_verify_note_shows_course1),
-            ("NOTE: Create Public Course", self.t_note_create_public_course), # Tworzy public_course_id
-            ("NOTE: Share Note A to Public Course", self.t_note_share_to_public_course),
-            ("NOTE: Verify Note A shows both Courses", self.t_note_verify_note_shows_both),
-            ("NOTE: Unshare Note A from Course 1 (User)", self.t_note_unshare_from_course1),
-            ("NOTE: Verify Note A shows only Public Course", self.t_note_verify_note_shows_public_only),
-            ("NOTE: Unshare Note A from Public Course (User)", self.t_note_unshare_from_public_course),
-            ("NOTE: Verify Note A shows no Courses and is private", self.t_note_verify_note_shows_none_private),
-            ("NOTE: Unshare already unshared (idempotent)", self.t_note_unshare_idempotent),
+            ("NOTE: Create Course 1 for sharing", self.t_note_create_course1, [self.t_note_login_A_again]), # Tworzy course_id_1
+            ("NOTE: Share Note A to Course 1", self.t_note_share_to_course1, [self.t_note_store_ok, self.t_note_create_course1]),
+            ("NOTE: Verify Note A shows Course 1", self.t_note_verify_note_shows_course1, [self.t_note_share_to_course1]),
+            ("NOTE: Create Public Course", self.t_note_create_public_course, [self.t_note_login_A_again]), # Tworzy public_course_id
+            ("NOTE: Share Note A to Public Course", self.t_note_share_to_public_course, [self.t_note_store_ok, self.t_note_create_course1, self.t_note_create_public_course]),
+            ("NOTE: Verify Note A shows both Courses", self.t_note_verify_note_shows_both, [self.t_note_share_to_course1, self.t_note_share_to_public_course]),
+            ("NOTE: Unshare Note A from Course 1 (User)", self.t_note_unshare_from_course1, [self.t_note_share_to_course1, self.t_note_share_to_public_course]),
+            ("NOTE: Verify Note A shows only Public Course", self.t_note_verify_note_shows_public_only, [self.t_note_unshare_from_course1]),
+            ("NOTE: Unshare Note A from Public Course (User)", self.t_note_unshare_from_public_course, [self.t_note_unshare_from_course1]),
+            ("NOTE: Verify Note A shows no Courses and is private", self.t_note_verify_note_shows_none_private, [self.t_note_unshare_from_public_course]),
+            ("NOTE: Unshare already unshared (idempotent)", self.t_note_unshare_idempotent, [self.t_note_unshare_from_public_course]),
             # Testy DELETE
-            ("NOTE: DELETE note (Note A)", self.t_note_delete_note), # Usuwa notatkę i kaskadowo pliki
-            ("NOTE: Download file after delete → 404", self.t_note_download_after_delete_404), # ZMIANA: Testuje .../files/fileId/download
-            ("NOTE: Index after delete (not present)", self.t_note_index_after_delete),
+            ("NOTE: DELETE note (Note A)", self.t_note_delete_note, [self.t_note_store_ok, self.t_note_login_A_again]), # Usuwa notatkę i kaskadowo pliki
+            ("NOTE: Download file after delete → 404", self.t_note_download_after_delete_404, [self.t_note_delete_note]), # ZMIANA: Testuje .../files/fileId/download
+            ("NOTE: Index after delete (not present)", self.t_note_index_after_delete, [self.t_note_delete_note]),
 
             # === 4. Course API (Uwzględnia N:M) ===
             ("COURSE: Index no token → 401/403", self.t_course_index_no_token),
-            ("COURSE: Login (Owner A)", self.t_course_login_A),
-            ("COURSE: Verify Course 1 exists", self.t_course_verify_course1_exists), # Używa course_id_1 z Note API
-            ("COURSE: Download avatar none → 404", self.t_course_download_avatar_none_404),
-            ("COURSE: Create course invalid type", self.t_course_create_course_invalid),
-            ("COURSE: Index courses A contains C1", self.t_course_index_courses_A_contains),
-            ("COURSE: Login (Member B)", self.t_course_login_B),
-            ("COURSE: B cannot download A avatar", self.t_course_download_avatar_B_unauth),
-            ("COURSE: B cannot update A course", self.t_course_B_cannot_update_A_course),
-            ("COURSE: B cannot delete A course", self.t_course_B_cannot_delete_A_course),
-            ("COURSE: Invite B to C1", self.t_course_invite_B), # Zaproszenie B do Course 1
-            ("COURSE: B accepts invite to C1", self.t_course_B_accept),
-            ("COURSE: Index courses B contains C1", self.t_course_index_courses_B_contains),
-            ("COURSE: Course users — member view", self.t_course_users_member_view),
-            ("COURSE: Course users — admin all", self.t_course_users_admin_all),
-            ("COURSE: Course users — filter q & role", self.t_course_users_filter_q_role),
-            ("COURSE: A creates note (used in course)", self.t_course_create_note_A), # Tworzy course_note_id_A
-            ("COURSE: B cannot share A note", self.t_course_B_cannot_share_A_note),
-            ("COURSE: A share note invalid course", self.t_course_A_share_note_invalid_course),
-            ("COURSE: A share Note A -> Course 1", self.t_course_share_note_to_course), # Udostępnia course_note_id_A
-            ("COURSE: Notes C1 (verify shared Note A)", self.t_course_verify_note_shared),
-            ("COURSE: Notes C1 (owner & member view)", self.t_course_notes_owner_member),
-            ("COURSE: Notes C1 outsider private (fail)", self.t_course_notes_outsider_private_403),
-            ("COURSE: Remove B from C1", self.t_course_remove_B), # Usuwa B z Course 1
-            ("COURSE: Index B (not contains C1)", self.t_course_index_courses_B_not_contains),
-            ("COURSE: Remove non-member B again (idempotent)", self.t_course_remove_non_member_true),
-            ("COURSE: Remove owner A (fail)", self.t_course_remove_owner_422),
+            ("COURSE: Login (Owner A)", self.t_course_login_A, [self.t_setup_register_OwnerA]),
+            ("COURSE: Verify Course 1 exists", self.t_course_verify_course1_exists, [self.t_note_create_course1, self.t_course_login_A]), # Używa course_id_1 z Note API
+            ("COURSE: Download avatar none → 404", self.t_course_download_avatar_none_404, [self.t_note_create_course1, self.t_course_login_A]),
+            ("COURSE: Create course invalid type", self.t_course_create_course_invalid, [self.t_course_login_A]),
+            ("COURSE: Index courses A contains C1", self.t_course_index_courses_A_contains, [self.t_note_create_course1, self.t_course_login_A]),
+            ("COURSE: Login (Member B)", self.t_course_login_B, [self.t_setup_register_MemberB]),
+            ("COURSE: B cannot download A avatar", self.t_course_download_avatar_B_unauth, [self.t_note_create_course1, self.t_course_login_B]),
+            ("COURSE: B cannot update A course", self.t_course_B_cannot_update_A_course, [self.t_note_create_course1, self.t_course_login_B]),
+            ("COURSE: B cannot delete A course", self.t_course_B_cannot_delete_A_course, [self.t_note_create_course1, self.t_course_login_B]),
+            ("COURSE: Invite B to C1", self.t_course_invite_B, [self.t_setup_register_MemberB, self.t_note_create_course1, self.t_course_login_A]), # Zaproszenie B do Course 1
+            ("COURSE: B accepts invite to C1", self.t_course_B_accept, [self.t_course_login_B, self.t_course_invite_B]),
+            ("COURSE: Index courses B contains C1", self.t_course_index_courses_B_contains, [self.t_course_B_accept]),
+            ("COURSE: Course users — member view", self.t_course_users_member_view, [self.t_course_B_accept]),
+            ("COURSE: Course users — admin all", self.t_course_users_admin_all, [self.t_course_B_accept]),
+            ("COURSE: Course users — filter q & role", self.t_course_users_filter_q_role, [self.t_course_B_accept]),
+            ("COURSE: A creates note (used in course)", self.t_course_create_note_A, [self.t_course_login_A]), # Tworzy course_note_id_A
+            ("COURSE: B cannot share A note", self.t_course_B_cannot_share_A_note, [self.t_course_B_accept, self.t_course_create_note_A]),
+            ("COURSE: A share note invalid course", self.t_course_A_share_note_invalid_course, [self.t_course_create_note_A]),
+            ("COURSE: A share Note A -> Course 1", self.t_course_share_note_to_course, [self.t_note_create_course1, self.t_course_create_note_A]), # Udostępnia course_note_id_A
+            ("COURSE: Notes C1 (verify shared Note A)", self.t_course_verify_note_shared, [self.t_course_share_note_to_course]),
+            ("COURSE: Notes C1 (owner & member view)", self.t_course_notes_owner_member, [self.t_course_B_accept, self.t_course_share_note_to_course]),
+            ("COURSE: Notes C1 outsider private (fail)", self.t_course_notes_outsider_private_403, [self.t_setup_register_OutsiderC, self.t_note_create_course1]),
+            ("COURSE: Remove B from C1", self.t_course_remove_B, [self.t_course_B_accept]), # Usuwa B z Course 1
+            ("COURSE: Index B (not contains C1)", self.t_course_index_courses_B_not_contains, [self.t_course_remove_B]),
+            ("COURSE: Remove non-member B again (idempotent)", self.t_course_remove_non_member_true, [self.t_course_remove_B]),
+            ("COURSE: Remove owner A (fail)", self.t_course_remove_owner_422, [self.t_note_create_course1, self.t_course_login_A]),
             # Role & Moderacja
             ("COURSE: Login (Admin D)", self.t_course_login_D),
             ("COURSE: Invite D (admin) to C1", self.t_course_invite_D_admin),
-            ("COURSE: D accept invite to C1", self.t_course_D_accept),
+            ("COURSE: D accept invite to C1", self.t_course_D_accept, [self.t_course_invite_D_admin]),
             ("COURSE: Login (Moderator E)", self.t_course_login_E),
             ("COURSE: Invite E (moderator) to C1", self.t_course_invite_E_moderator),
-            ("COURSE: E accept invite to C1", self.t_course_E_accept),
-            ("COURSE: D creates note & shares", self.t_course_create_note_D_and_share), # Tworzy course_note_id_D
-            ("COURSE: E creates note & shares", self.t_course_create_note_E_and_share), # Tworzy course_note_id_E
-            ("COURSE: E cannot remove D (fail)", self.t_course_mod_E_cannot_remove_admin_D),
-            ("COURSE: E cannot remove owner A (fail)", self.t_course_mod_E_cannot_remove_owner_A),
-            ("COURSE: Admin D removes moderator E", self.t_course_admin_D_removes_mod_E), # Usuwa E z Course 1
-            ("COURSE: Verify E note NOT in C1 after E removed", self.t_course_verify_E_note_unshared),
-            ("COURSE: E courses after kick (empty)", self.t_course_E_lost_membership),
-            ("COURSE: Owner sets D->admin", self.t_course_owner_sets_D_admin),
-            ("COURSE: Owner demotes D->moderator", self.t_course_owner_demotes_D_to_moderator),
-            ("COURSE: Admin D cannot change self (fail)", self.t_course_admin_cannot_change_admin),
-            ("COURSE: Admin cannot set owner role (fail)", self.t_course_admin_cannot_set_owner_role),
-            ("COURSE: Reinvite E as mod to C1", self.t_course_owner_reinvite_E_as_moderator), # Ponownie zaprasza E
+            ("COURSE: E accept invite to C1", self.t_course_E_accept, [self.t_course_invite_E_moderator]),
+            ("COURSE: D creates note & shares", self.t_course_create_note_D_and_share, [self.t_setup_register_AdminD, self.t_note_create_course1, self.t_course_D_accept]), # Tworzy course_note_id_D
+            ("COURSE: E creates note & shares", self.t_course_create_note_E_and_share, [self.t_setup_register_ModeratorE, self.t_note_create_course1, self.t_course_E_accept]), # Tworzy course_note_id_E
+            ("COURSE: E cannot remove D (fail)", self.t_course_mod_E_cannot_remove_admin_D, [self.t_setup_register_AdminD, self.t_setup_register_ModeratorE, self.t_note_create_course1, self.t_course_D_accept, self.t_course_E_accept]),
+            ("COURSE: E cannot remove owner A (fail)", self.t_course_mod_E_cannot_remove_owner_A, [self.t_setup_register_ModeratorE, self.t_note_create_course1, self.t_course_E_accept]),
+            ("COURSE: Admin D removes moderator E", self.t_course_admin_D_removes_mod_E, [self.t_setup_register_AdminD, self.t_setup_register_ModeratorE, self.t_note_create_course1, self.t_course_D_accept, self.t_course_E_accept]), # Usuwa E z Course 1
+            ("COURSE: Verify E note NOT in C1 after E removed", self.t_course_verify_E_note_unshared, [self.t_course_login_A, self.t_course_create_note_E_and_share, self.t_course_admin_D_removes_mod_E]),
+            ("COURSE: E courses after kick (empty)", self.t_course_E_lost_membership, [self.t_course_admin_D_removes_mod_E]),
+            ("COURSE: Owner sets D->admin", self.t_course_owner_sets_D_admin, [self.t_setup_register_AdminD, self.t_note_create_course1, self.t_course_login_A, self.t_course_D_accept]),
+            ("COURSE: Owner demotes D->moderator", self.t_course_owner_demotes_D_to_moderator, [self.t_setup_register_AdminD, self.t_note_create_course1, self.t_course_login_A, self.t_course_D_accept]),
+            ("COURSE: Admin D cannot change self (fail)", self.t_course_admin_cannot_change_admin, [self.t_setup_register_AdminD, self.t_note_create_course1, self.t_course_login_A, self.t_course_D_accept]),
+            ("COURSE: Admin cannot set owner role (fail)", self.t_course_admin_cannot_set_owner_role, [self.t_setup_register_AdminD, self.t_note_create_course1, self.t_course_D_accept]),
+            ("COURSE: Reinvite E as mod to C1", self.t_course_owner_reinvite_E_as_moderator, [self.t_course_login_A, self.t_course_admin_D_removes_mod_E]), # Ponownie zaprasza E
             ("COURSE: Register F (member)", self.t_course_register_F),
-            ("COURSE: Login F", self.t_course_login_F),
+            ("COURSE: Login F", self.t_course_login_F, [self.t_course_register_F]),
             ("COURSE: Invite F (member) to C1", self.t_course_invite_F_member),
-            ("COURSE: F accept invite to C1", self.t_course_F_accept),
-            ("COURSE: F creates note & shares", self.t_course_create_and_share_note_F), # Tworzy course_note_id_F
-            ("COURSE: Mod E purges F notes from C1", self.t_course_mod_E_purges_F_notes), # Odpina notatki F
-            ("COURSE: Mod E removes F user from C1", self.t_course_mod_E_removes_F_user), # Usuwa F
-            ("COURSE: Reinvite B to C1 & Owner sets B->moderator", self.t_course_owner_reinvite_B_and_set_moderator), # Ponownie B, zmiana roli
-            ("COURSE: Admin D sets B->member", self.t_course_admin_sets_B_member), # D degraduje B
+            ("COURSE: F accept invite to C1", self.t_course_F_accept, [self.t_course_invite_F_member]),
+            ("COURSE: F creates note & shares", self.t_course_create_and_share_note_F, [self.t_note_create_course1, self.t_course_login_F, self.t_course_F_accept]), # Tworzy course_note_id_F
+            ("COURSE: Mod E purges F notes from C1", self.t_course_mod_E_purges_F_notes, [self.t_course_owner_reinvite_E_as_moderator, self.t_course_create_and_share_note_F]), # Odpina notatki F
+            ("COURSE: Mod E removes F user from C1", self.t_course_mod_E_removes_F_user, [self.t_course_owner_reinvite_E_as_moderator, self.t_course_register_F, self.t_course_F_accept]), # Usuwa F
+            ("COURSE: Reinvite B to C1 & Owner sets B->moderator", self.t_course_owner_reinvite_B_and_set_moderator, [self.t_note_create_course1, self.t_course_login_A, self.t_course_login_B]), # Ponownie B, zmiana roli
+            ("COURSE: Admin D sets B->member", self.t_course_admin_sets_B_member, [self.t_setup_register_AdminD, self.t_course_D_accept, self.t_course_owner_reinvite_B_and_set_moderator]), # D degraduje B
 
             # === NOWE TESTY: Opuszczanie Kursu ===
-            (f"{ICON_LEAVE} COURSE: Leave - Unauthenticated → 401/403", self.t_course_leave_unauth),
-            (f"{ICON_LEAVE} COURSE: Leave - Owner A (fail) → 403", self.t_course_leave_owner_fail),
-            (f"{ICON_LEAVE} COURSE: Leave - Outsider C (fail) → 403", self.t_course_leave_outsider_fail),
-            (f"{ICON_LEAVE} COURSE: Leave - Not Found (fail) → 404", self.t_course_leave_not_found_fail),
-            (f"{ICON_LEAVE} COURSE: Leave - Setup C3 + Note B (N:M)", self.t_course_leave_setup_C3_NoteB), # Tworzy C3, Note B i udostępnia
-            (f"{ICON_LEAVE} COURSE: Leave - B leaves C1 (success)", self.t_course_leave_B_from_C1),
-            (f"{ICON_LEAVE} COURSE: Leave - Verify Note B (after C1 leave)", self.t_course_leave_verify_noteB_after_C1),
-            (f"{ICON_LEAVE} COURSE: Leave - B leaves C3 (last course)", self.t_course_leave_B_from_C3),
-            (f"{ICON_LEAVE} COURSE: Leave - Verify Note B (after C3 leave)", self.t_course_leave_verify_noteB_after_C3),
-            (f"{ICON_LEAVE} COURSE: Leave - Idempotent (B leaves C1 again) → 403", self.t_course_leave_B_from_C1_idempotent),
+            (f"{ICON_LEAVE} COURSE: Leave - Unauthenticated → 401/403", self.t_course_leave_unauth, [self.t_note_create_course1]),
+            (f"{ICON_LEAVE} COURSE: Leave - Owner A (fail) → 403", self.t_course_leave_owner_fail, [self.t_note_create_course1, self.t_course_login_A]),
+            (f"{ICON_LEAVE} COURSE: Leave - Outsider C (fail) → 403", self.t_course_leave_outsider_fail, [self.t_setup_register_OutsiderC, self.t_note_create_course1]),
+            (f"{ICON_LEAVE} COURSE: Leave - Not Found (fail) → 404", self.t_course_leave_not_found_fail, [self.t_course_login_B]),
+            (f"{ICON_LEAVE} COURSE: Leave - Setup C3 + Note B (N:M)", self.t_course_leave_setup_C3_NoteB, [self.t_note_create_course1, self.t_course_login_A, self.t_course_login_B]), # Tworzy C3, Note B i udostępnia
+            (f"{ICON_LEAVE} COURSE: Leave - B leaves C1 (success)", self.t_course_leave_B_from_C1, [self.t_course_owner_reinvite_B_and_set_moderator, self.t_course_leave_setup_C3_NoteB]),
+            (f"{ICON_LEAVE} COURSE: Leave - Verify Note B (after C1 leave)", self.t_course_leave_verify_noteB_after_C1, [self.t_course_leave_B_from_C1]),
+            (f"{ICON_LEAVE} COURSE: Leave - B leaves C3 (last course)", self.t_course_leave_B_from_C3, [self.t_course_leave_setup_C3_NoteB]),
+            (f"{ICON_LEAVE} COURSE: Leave - Verify Note B (after C3 leave)", self.t_course_leave_verify_noteB_after_C3, [self.t_course_leave_B_from_C3]),
+            (f"{ICON_LEAVE} COURSE: Leave - Idempotent (B leaves C1 again) → 403", self.t_course_leave_B_from_C1_idempotent, [self.t_course_leave_B_from_C1]),
 
             # === Odrzucenia zaproszeń ===
             ("COURSE: Login (Outsider C)", self.t_course_login_C),
-            ("COURSE: Create course #2 (private)", self.t_course_create_course2_A), # Tworzy course_id_2
-            ("COURSE: Invite C #1 to C2", self.t_course_invite_C_1),
-            ("COURSE: C reject invite 1", self.t_course_reject_C_last),
-            ("COURSE: Invite C #2 to C2", self.t_course_invite_C_2),
-            ("COURSE: C reject invite 2", self.t_course_reject_C_last),
-            ("COURSE: Invite C #3 to C2", self.t_course_invite_C_3),
-            ("COURSE: C reject invite 3", self.t_course_reject_C_last),
-            ("COURSE: Invite C #4 blocked (fail)", self.t_course_invite_C_4_blocked), # Oczekuje błędu 400/422
+            ("COURSE: Create course #2 (private)", self.t_course_create_course2_A, [self.t_course_login_A]), # Tworzy course_id_2
+            ("COURSE: Invite C #1 to C2", self.t_course_invite_C_1, [self.t_setup_register_OutsiderC, self.t_course_create_course2_A]),
+            ("COURSE: C reject invite 1", self.t_course_reject_C_last, [self.t_course_invite_C_1]),
+            ("COURSE: Invite C #2 to C2", self.t_course_invite_C_2, [self.t_course_reject_C_last]),
+            ("COURSE: C reject invite 2", self.t_course_reject_C_last, [self.t_course_invite_C_2]),
+            ("COURSE: Invite C #3 to C2", self.t_course_invite_C_3, [self.t_course_reject_C_last]),
+            ("COURSE: C reject invite 3", self.t_course_reject_C_last, [self.t_course_invite_C_3]),
+            ("COURSE: Invite C #4 blocked (fail)", self.t_course_invite_C_4_blocked, [self.t_course_reject_C_last]), # Oczekuje błędu 400/422
 
             # === Kurs publiczny ===
-            ("COURSE: Verify Public Course exists", self.t_course_verify_public_course_exists),
-            ("COURSE: Public course notes outsider (fail)", self.t_course_notes_outsider_public_403),
-            ("COURSE: Public course users outsider (fail)", self.t_course_users_outsider_public_401),
+            ("COURSE: Verify Public Course exists", self.t_course_verify_public_course_exists, [self.t_note_create_public_course, self.t_course_login_A]),
+            ("COURSE: Public course notes outsider (fail)", self.t_course_notes_outsider_public_403, [self.t_setup_register_OutsiderC, self.t_note_create_public_course]),
+            ("COURSE: Public course users outsider (fail)", self.t_course_users_outsider_public_401, [self.t_setup_register_OutsiderC, self.t_note_create_public_course]),
 
             # === Sprzątanie Kursów ===
-            ("COURSE: Delete course #1", self.t_course_delete_course_A),
-            ("COURSE: Delete course #2", self.t_course_delete_course2_A),
-            ("COURSE: Delete course #3", self.t_course_delete_course3_A), # NOWOŚĆ: Sprzątanie C3
-            ("COURSE: Delete public course", self.t_course_delete_public_course_A),
-            ("COURSE: Delete note B", self.t_course_delete_noteB), # NOWOŚĆ: Sprzątanie Note B
+            ("COURSE: Delete course #1", self.t_course_delete_course_A, [self.t_note_create_course1, self.t_course_login_A]),
+            ("COURSE: Delete course #2", self.t_course_delete_course2_A, [self.t_course_create_course2_A]),
+            ("COURSE: Delete course #3", self.t_course_delete_course3_A, [self.t_course_leave_setup_C3_NoteB]), # NOWOŚĆ: Sprzątanie C3
+            ("COURSE: Delete public course", self.t_course_delete_public_course_A, [self.t_note_create_public_course, self.t_course_login_A]),
+            ("COURSE: Delete note B", self.t_course_delete_noteB, [self.t_course_leave_setup_C3_NoteB]), # NOWOŚĆ: Sprzątanie Note B
 
              # === 5. Quiz API (Uwzględnia N:M dla Testów) ===
-            ("QUIZ: Login (Owner A)", self.t_quiz_login_A),
-            ("QUIZ: Create course for quiz", self.t_quiz_create_course), # Tworzy quiz_course_id
-            ("QUIZ: Index user tests initial (empty)", self.t_quiz_index_user_tests_initial),
-            ("QUIZ: Create PRIVATE test", self.t_quiz_create_private_test), # Tworzy test_private_id
-            ("QUIZ: Index user tests contains private", self.t_quiz_index_user_tests_contains_private),
-            ("QUIZ: Show private test", self.t_quiz_show_private_test),
-            ("QUIZ: Update private test (PUT)", self.t_quiz_update_private_test),
+            ("QUIZ: Login (Owner A)", self.t_quiz_login_A, [self.t_setup_register_OwnerA]),
+            ("QUIZ: Create course for quiz", self.t_quiz_create_course, [self.t_quiz_login_A]), # Tworzy quiz_course_id
+            ("QUIZ: Index user tests initial (empty)", self.t_quiz_index_user_tests_initial, [self.t_quiz_login_A]),
+            ("QUIZ: Create PRIVATE test", self.t_quiz_create_private_test, [self.t_quiz_login_A]), # Tworzy test_private_id
+            ("QUIZ: Index user tests contains private", self.t_quiz_index_user_tests_contains_private, [self.t_quiz_create_private_test]),
+            ("QUIZ: Show private test", self.t_quiz_show_private_test, [self.t_quiz_create_private_test]),
+            ("QUIZ: Update private test (PUT)", self.t_quiz_update_private_test, [self.t_quiz_create_private_test]),
             # Pytania i Odpowiedzi
-            ("QUIZ: Add Q1", self.t_quiz_add_question), # Tworzy question_id
-            ("QUIZ: List questions contains Q1", self.t_quiz_list_questions_contains_q1),
-            ("QUIZ: Update Q1", self.t_quiz_update_question),
-            ("QUIZ: Add A1 invalid first (fail)", self.t_quiz_add_answer_invalid_first),
-            ("QUIZ: Add A1 correct", self.t_quiz_add_answer_correct_first), # Dodaje answer_id
-            ("QUIZ: Add duplicate A1 (fail)", self.t_quiz_add_answer_duplicate),
-            ("QUIZ: Add A2 wrong", self.t_quiz_add_answer_wrong_2), # Dodaje answer_id
-            ("QUIZ: Add A3 wrong", self.t_quiz_add_answer_wrong_3), # Dodaje answer_id
-            ("QUIZ: Add A4 wrong", self.t_quiz_add_answer_wrong_4), # Dodaje answer_id
-            ("QUIZ: Add A5 blocked (limit)", self.t_quiz_add_answer_limit),
-            ("QUIZ: Get answers list", self.t_quiz_get_answers_list),
-            ("QUIZ: Update answer #2 -> correct", self.t_quiz_update_answer),
-            ("QUIZ: Delete answer #3", self.t_quiz_delete_answer),
-            ("QUIZ: Delete Q1", self.t_quiz_delete_question), # Czyści question_id, answer_ids
-            ("QUIZ: Add Qs to reach 20", self.t_quiz_add_questions_to_20),
-            ("QUIZ: Add Q21 blocked (limit)", self.t_quiz_add_21st_question_block),
+            ("QUIZ: Add Q1", self.t_quiz_add_question, [self.t_quiz_create_private_test]), # Tworzy question_id
+            ("QUIZ: List questions contains Q1", self.t_quiz_list_questions_contains_q1, [self.t_quiz_add_question]),
+            ("QUIZ: Update Q1", self.t_quiz_update_question, [self.t_quiz_add_question]),
+            ("QUIZ: Add A1 invalid first (fail)", self.t_quiz_add_answer_invalid_first, [self.t_quiz_add_question]),
+            ("QUIZ: Add A1 correct", self.t_quiz_add_answer_correct_first, [self.t_quiz_add_question]), # Dodaje answer_id
+            ("QUIZ: Add duplicate A1 (fail)", self.t_quiz_add_answer_duplicate, [self.t_quiz_add_answer_correct_first]),
+            ("QUIZ: Add A2 wrong", self.t_quiz_add_answer_wrong_2, [self.t_quiz_add_answer_correct_first]), # Dodaje answer_id
+            ("QUIZ: Add A3 wrong", self.t_quiz_add_answer_wrong_3, [self.t_quiz_add_answer_wrong_2]), # Dodaje answer_id
+            ("QUIZ: Add A4 wrong", self.t_quiz_add_answer_wrong_4, [self.t_quiz_add_answer_wrong_3]), # Dodaje answer_id
+            ("QUIZ: Add A5 blocked (limit)", self.t_quiz_add_answer_limit, [self.t_quiz_add_answer_wrong_4]),
+            ("QUIZ: Get answers list", self.t_quiz_get_answers_list, [self.t_quiz_add_answer_wrong_4]),
+            ("QUIZ: Update answer #2 -> correct", self.t_quiz_update_answer, [self.t_quiz_add_answer_correct_first]),
+            ("QUIZ: Delete answer #3", self.t_quiz_delete_answer, [self.t_quiz_add_answer_correct_first]),
+            ("QUIZ: Delete Q1", self.t_quiz_delete_question, [self.t_quiz_delete_answer]), # Czyści question_id, answer_ids
+            ("QUIZ: Add Qs to reach 20", self.t_quiz_add_questions_to_20, [self.t_quiz_create_private_test]),
+            ("QUIZ: Add Q21 blocked (limit)", self.t_quiz_add_21st_question_block, [self.t_quiz_add_questions_to_20]),
             # Udostępnianie Testu N:M
-            ("QUIZ: Create PUBLIC test for sharing", self.t_quiz_create_public_test), # Tworzy test_public_id
-            ("QUIZ: Share Public Test -> Quiz Course 1", self.t_quiz_share_public_test_to_course), # Udostępnia do quiz_course_id
-            ("QUIZ: Quiz Course 1 tests include shared", self.t_quiz_course_tests_include_shared),
-            ("QUIZ: Create Course 2 for sharing test", self.t_quiz_create_course_2), # Tworzy quiz_course_id_2
-            ("QUIZ: Share Public Test -> Quiz Course 2", self.t_quiz_share_public_test_to_course_2), # Udostępnia do quiz_course_id_2
-            ("QUIZ: Verify Public Test details show both courses", self.t_quiz_verify_test_shows_both_courses),
-            ("QUIZ: Unshare Public Test from Quiz Course 1", self.t_quiz_unshare_from_course1),
-            ("QUIZ: Verify Public Test details show course 2 only", self.t_quiz_verify_test_shows_course2_only),
-            ("QUIZ: Unshare Public Test from Quiz Course 2", self.t_quiz_unshare_from_course2),
-            ("QUIZ: Verify Public Test details show no courses", self.t_quiz_verify_test_shows_no_courses),
+            ("QUIZ: Create PUBLIC test for sharing", self.t_quiz_create_public_test, [self.t_quiz_login_A]), # Tworzy test_public_id
+            ("QUIZ: Share Public Test -> Quiz Course 1", self.t_quiz_share_public_test_to_course, [self.t_quiz_create_course, self.t_quiz_create_public_test]), # Udostępnia do quiz_course_id
+            ("QUIZ: Quiz Course 1 tests include shared", self.t_quiz_course_tests_include_shared, [self.t_quiz_share_public_test_to_course]),
+            ("QUIZ: Create Course 2 for sharing test", self.t_quiz_create_course_2, [self.t_quiz_login_A]), # Tworzy quiz_course_id_2
+            ("QUIZ: Share Public Test -> Quiz Course 2", self.t_quiz_share_public_test_to_course_2, [self.t_quiz_create_course, self.t_quiz_create_public_test, self.t_quiz_create_course_2]), # Udostępnia do quiz_course_id_2
+            ("QUIZ: Verify Public Test details show both courses", self.t_quiz_verify_test_shows_both_courses, [self.t_quiz_share_public_test_to_course, self.t_quiz_share_public_test_to_course_2]),
+            ("QUIZ: Unshare Public Test from Quiz Course 1", self.t_quiz_unshare_from_course1, [self.t_quiz_share_public_test_to_course, self.t_quiz_share_public_test_to_course_2]),
+            ("QUIZ: Verify Public Test details show course 2 only", self.t_quiz_verify_test_shows_course2_only, [self.t_quiz_unshare_from_course1]),
+            ("QUIZ: Unshare Public Test from Quiz Course 2", self.t_quiz_unshare_from_course2, [self.t_quiz_unshare_from_course1]),
+            ("QUIZ: Verify Public Test details show no courses", self.t_quiz_verify_test_shows_no_courses, [self.t_quiz_unshare_from_course2]),
             # Uprawnienia
             ("QUIZ: Register B (for conflict)", self.t_quiz_register_B), # Rejestruje quiz_userB
             ("QUIZ: Login B", self.t_quiz_login_B), # Loguje quiz_userB (quiz_token = B)
-            ("QUIZ: B cannot show A private test (fail)", self.t_quiz_b_cannot_show_a_test),
-            ("QUIZ: B cannot update A test (fail)", self.t_quiz_b_cannot_modify_a_test),
-            ("QUIZ: B cannot add Q to A test (fail)", self.t_quiz_b_cannot_add_q_to_a_test),
-            ("QUIZ: B cannot delete A test (fail)", self.t_quiz_b_cannot_delete_a_test),
+            ("QUIZ: B cannot show A private test (fail)", self.t_quiz_b_cannot_show_a_test, [self.t_quiz_create_private_test, self.t_quiz_login_B]),
+            ("QUIZ: B cannot update A test (fail)", self.t_quiz_b_cannot_modify_a_test, [self.t_quiz_create_private_test, self.t_quiz_login_B]),
+            ("QUIZ: B cannot add Q to A test (fail)", self.t_quiz_b_cannot_add_q_to_a_test, [self.t_quiz_create_private_test, self.t_quiz_login_B]),
+            ("QUIZ: B cannot delete A test (fail)", self.t_quiz_b_cannot_delete_a_test, [self.t_quiz_create_private_test, self.t_quiz_login_B]),
             # Sprzątanie Quiz
-            ("QUIZ: Cleanup login A", self.t_quiz_cleanup_login_A), # Loguje Owner A (quiz_token = A)
-            ("QUIZ: Cleanup delete public test", self.t_quiz_cleanup_delete_public),
-            ("QUIZ: Cleanup delete private test", self.t_quiz_cleanup_delete_private),
-            ("QUIZ: Cleanup delete Quiz Course 1", self.t_quiz_cleanup_delete_course),
-            ("QUIZ: Cleanup delete Quiz Course 2", self.t_quiz_cleanup_delete_course_2),
+            ("QUIZ: Cleanup login A", self.t_quiz_cleanup_login_A, [self.t_setup_register_OwnerA]), # Loguje Owner A (quiz_token = A)
+            ("QUIZ: Cleanup delete public test", self.t_quiz_cleanup_delete_public, [self.t_quiz_create_public_test, self.t_quiz_cleanup_login_A]),
+            ("QUIZ: Cleanup delete private test", self.t_quiz_cleanup_delete_private, [self.t_quiz_create_private_test, self.t_quiz_cleanup_login_A]),
+            ("QUIZ: Cleanup delete Quiz Course 1", self.t_quiz_cleanup_delete_course, [self.t_quiz_create_course, self.t_quiz_cleanup_login_A]),
+            ("QUIZ: Cleanup delete Quiz Course 2", self.t_quiz_cleanup_delete_course_2, [self.t_quiz_create_course_2, self.t_quiz_cleanup_login_A]),
         ]
+        # Opcjonalny trzeci element kroku: kroki, których stan (pola ctx, dane na serwerze) jest wymagany — dla --only/--tag
+        self.step_requires = {i: [r.__name__ for r in s[2]] for i, s in enumerate(self.steps, 1) if len(s) > 2}
+        self.steps = [(s[0], s[1]) for s in self.steps]
 
         total = len(self.steps)
-        print(c(f"\n{ICON_INFO} Rozpoczynanie {total} zintegrowanych testów E2E @ {self.ctx.base_url}\n", Fore.WHITE))
+        start = self._resume(resume) if resume else 1
+        chosen = self._select() if self.selection else set(range(1, total + 1))
+        count = sum(1 for i in chosen if i >= start)
+        print(c(f"\n{ICON_INFO} Rozpoczynanie {count} zintegrowanych testów E2E @ {self.ctx.base_url}\n", Fore.WHITE))
 
-        # Pętla wykonująca testy
+        # Pętla wykonująca testy (numeracja kroków zawsze wg pełnej listy — zgodna z checkpointami)
         for i, (name, fn) in enumerate(self.steps, 1):
-            self._exec(i, total, name, fn)
+            if i < start or i not in chosen: continue
+            if self.profiler:
+                self.profiler.step(i, name, self._exec, i, total, name, fn)
+            else:
+                self._exec(i, total, name, fn)
+            if self.checkpoint_path:
+                write_checkpoint(self.ctx, self.checkpoint_path, i, name, self.results[-1])
+                if not self.results[-1].passed: # Kroki sprzątające usunęłyby encje, do których odwołują się wcześniejsze checkpointy
+                    print(c(f"\n{ICON_FAIL} Step {i}/{total} failed — stopping (--checkpoint); fix and continue with --rerun-failed", Fore.RED))
+                    break
+
+    def _select(self) -> set:
+        """Zbiór kroków z --only/--skip/--tag wraz z dociągniętymi wymaganiami (wypisuje je przed startem)."""
+        sel = self.selection
+        chosen, pulled = select_steps(self.steps, self.step_requires, sel["only"], sel["skip"], sel["tags"], closure=sel["closure"])
+        assert chosen, f"No steps match --only {sel['only']} / --tag {sel['tags']} (minus --skip {sel['skip']})"
+        print(c(f"{ICON_INFO} Selected {len(chosen) - len(pulled)} of {len(self.steps)} steps"
+                f"{f' + {len(pulled)} prerequisite(s)' if pulled else ''}", Fore.CYAN))
+        for i in sorted(pulled):
+            print(c(f"    ↳ [{i}] {self.steps[i - 1][0]}", Fore.CYAN))
+        return chosen
+
+    def _resume(self, resume: Dict[str, Any]) -> int:
+        """Ustala krok startowy (--resume-from / --rerun-failed) i przywraca stan po kroku poprzednim."""
+        names = [n for n, _ in self.steps]
+        points: Dict[int, Dict[str, Any]] = resume["checkpoints"]
+        if resume.get("failed"):
+            failed = sorted(i for i, p in points.items() if not p["passed"])
+            if not failed:
+                print(c(f"{ICON_OK} No failed steps in {resume['run']} — nothing to rerun", Fore.GREEN))
+                return len(names) + 1
+            start = failed[0]
+        else:
+            start = resolve_step(resume["from"], names)
+            assert start, f"Step {resume['from']!r} not found among {len(names)} steps"
+        last = max(points) if points else 0
+        # Późniejsze kroki (np. t_note_delete_note, t_course_delete_course_*) mogły już usunąć encje z zapisanego stanu
+        assert start > last or (start == last and not points[last]["passed"]), \
+            (f"Cannot resume at step {start}: {resume['run']} already executed up to step {last} — "
+             f"resume only right after the last executed step ({last + 1}) or rerun it if it failed")
+        if start > 1:
+            before = [i for i in points if i < start] # Przy --only/--tag poprzedni zapisany krok nie musi być start-1
+            assert before, f"No checkpoint before step {start} in {resume['run']} (run stopped earlier?)"
+            prev = points[max(before)]
+            if prev["name"] != names[prev["step"] - 1]:
+                print(c(f"    Warning: step {prev['step']} was {prev['name']!r}, now {names[prev['step'] - 1]!r} (step list changed)", Fore.YELLOW))
+            for k, v in prev["state"].items():
+                setattr(self.ctx, k, v)
+            if self.ctx.resources is not None and prev.get("resources"):
+                self.ctx.resources.restore(prev["resources"])
+            revived = revive_actor_tokens(self.ctx)
+            if self.checkpoint_path: # Kroki sprzed wznowienia przechodzą do nowego pliku — kolejne wznowienia działają dalej
+                with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+                    for i in sorted(i for i in points if i < start):
+                        f.write(json.dumps(points[i], ensure_ascii=False) + "\n")
+            print(c(f"{ICON_INFO} Resuming at step {start}/{len(names)} ({names[start - 1]}) from {resume['run']}"
+                    f"{f', re-logged {revived} actor(s)' if revived else ''}", Fore.CYAN))
+        return start
 
     # ──────────────────────────────────────────────────────────────────────
     # === Metody pomocnicze ===
     # ──────────────────────────────────────────────────────────────────────
-    def _note_load_upload_bytes(self, path: str) -> Tuple[bytes, str, str]:
-        """Wczytuje plik notatki lub generuje domyślny, zwraca (bytes, mime, name)."""
+    def _note_load_upload_bytes(self, path: str) -> Tuple[UploadSource, str, str]:
+        """Zwraca współdzielone źródło pliku notatki (mmap, mapowane raz) lub domyślny PNG: (treść, mime, name)."""
         if path and os.path.isfile(path):
             try:
                 name = os.path.basename(path)
                 ext = os.path.splitext(path)[1].lower().lstrip(".")
-                mime_map = {"png":"image/png", "jpg":"image/jpeg", "jpeg":"image/jpeg",
-                            "pdf":"application/pdf",
-                            "xlsx":"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
-                mime = mime_map.get(ext, "application/octet-stream") # Domyślny typ binarny
-                with open(path, "rb") as f:
-                    content = f.read()
+                mime = NOTE_MIME_MAP.get(ext, "application/octet-stream") # Domyślny typ binarny
+                content = upload_source(path, mime) # Bez f.read(): duże pliki nie są kopiowane per żądanie
                 print(c(f" (Loaded note file: {name}, {len(content)} bytes, {mime})", Fore.MAGENTA), end="")
                 return content, mime, name
             except Exception as e:
                 print(c(f" (Error loading note file '{path}': {e}, using default)", Fore.RED), end="")
         # Fallback do generowania
         print(c(" (Note file not found or invalid, using generated PNG)", Fore.YELLOW), end="")
-        return gen_png_bytes(), "image/png", "generated_note.png"
+        return _generated_note_source(), "image/png", "generated_note.png"
 
     def _course_get_id_by_email(self, email: str, course_id: int, actor_token: Optional[str]) -> int:
         """Pobiera ID użytkownika w danym kursie na podstawie emaila."""
@@ -987,9 +2131,7 @@ class E2ETester:
         """Wysyła i aktualizuje awatar użytkownika A."""
         assert self.ctx.userA_token, "User A token not available"
         url = me(self.ctx,"/profile/avatar")
-        avatar_bytes = self.ctx.avatar_bytes or gen_avatar_bytes() # Użyj z kontekstu lub wygeneruj
-        assert avatar_bytes, "Avatar bytes not available"
-        files = {"avatar": ("test_avatar.png", avatar_bytes, "image/png")} # Zmieniono nazwę pliku i typ MIME dla spójności z gen_avatar_bytes
+        files = {"avatar": avatar_file(self.ctx, "test_avatar")} # Awatar z kontekstu (typ MIME wg rozszerzenia) lub wygenerowany PNG
         r = http_post_multipart(self.ctx, "USER: Avatar upload", url, data={}, files=files, headers=auth_headers(self.ctx.userA_token))
         assert r.status_code == 200, f"Expected 200, got {r.status_code}. Response: {trim(r.text)}"
         body = must_json(r)
@@ -1002,14 +2144,17 @@ class E2ETester:
         """Pobiera awatar użytkownika A."""
         assert self.ctx.userA_token, "User A token not available"
         url = me(self.ctx,"/profile/avatar")
-        # Używamy http_request bezpośrednio, bo nie oczekujemy JSONa
-        r = http_request(self.ctx, "USER: Avatar download", "GET", url, headers=auth_headers(self.ctx.userA_token))
+        # Pobranie strumieniowe (nie oczekujemy JSONa), body tylko haszowane
+        r, dl = http_download(self.ctx, "USER: Avatar download", url, auth_headers(self.ctx.userA_token))
         assert r.status_code == 200, f"Expected 200, got {r.status_code}."
         ct = r.headers.get("Content-Type","").lower()
         # Sprawdź, czy Content-Type to obrazek
         assert ct.startswith("image/"), f"Expected Content-Type 'image/*', got '{ct}'"
         # Sprawdź, czy odpowiedź ma treść
-        assert r.content, "Avatar download response body is empty"
+        assert dl.bytes, "Avatar download response body is empty"
+        if self.ctx.avatar_source is not None: # Awatar jest zapisywany bez przetwarzania: ten sam plik co w uploadzie
+            assert dl.matches(self.ctx.avatar_source), f"Downloaded avatar differs from upload ({dl.bytes} vs {len(self.ctx.avatar_source)} bytes)"
+        print(c(f" ({dl.bytes} bytes, TTFB {dl.ttfb_ms:.1f} ms, {dl.mbps:.2f} MB/s)", Fore.MAGENTA), end="")
         return {"status": 200, "method":"GET", "url":url}
 
     def t_user_logout(self):
@@ -1081,6 +2226,7 @@ class E2ETester:
         token = body.get("token")
         assert token, f"Token not found for {name_suffix} after login: {trim(body)}"
 
+        if self.ctx.tokens is not None: self.ctx.tokens.store(email, token)
         print(c(f" ({email})", Fore.MAGENTA), end="") # Dodatkowy log emaila w konsoli
         return email, pwd, token
 
@@ -1115,6 +2261,7 @@ class E2ETester:
         body = must_json(r)
         self.ctx.tokenOwner = body.get("token")
         assert self.ctx.tokenOwner
+        if self.ctx.tokens is not None: self.ctx.tokens.store(self.ctx.emailOwner, self.ctx.tokenOwner)
         return {"status": 200, "method":"POST","url":url}
 
     def t_note_index_initial(self):
@@ -1228,6 +2375,7 @@ class E2ETester:
         body = must_json(r)
         self.ctx.tokenB = body.get("token")
         assert self.ctx.tokenB
+        if self.ctx.tokens is not None: self.ctx.tokens.store(self.ctx.emailB, self.ctx.tokenB)
         return {"status": 200, "method":"POST","url":url}
 
     def t_note_show_foreign_403(self):
@@ -1241,8 +2389,8 @@ class E2ETester:
         return {"status": r.status_code, "method":"GET","url":url}
 
     def t_note_login_A_again(self):
-        """Ponownie loguje Ownera A."""
-        return self.t_note_login_A()
+        """Ponownie loguje Ownera A (z TokenCache: ponowne użycie ważnego tokenu)."""
+        return self._login_user("NOTE: Login Owner A", self.ctx.emailOwner, self.ctx.pwdOwner, "tokenOwner")
 
     def t_note_patch_title_only(self):
         """Aktualizuje tylko tytuł notatki A (endpoint 'edit')."""
@@ -1302,9 +2450,7 @@ class E2ETester:
         url = me(self.ctx, f"/notes/{self.ctx.note_id_A}/files")
 
         # Użyj innego pliku (np. wygenerowanego awatara jako drugi plik)
-        data_bytes = self.ctx.avatar_bytes or gen_avatar_bytes()
-        name = "second_file_avatar.png"
-        mime = "image/png"
+        name, data_bytes, mime = avatar_file(self.ctx, "second_file_avatar")
 
         # MODYFIKACJA: Ten endpoint oczekuje klucza 'file', a nie 'files[]'
         files_dict = {"file": (name, data_bytes, mime)}
@@ -1340,10 +2486,13 @@ class E2ETester:
         assert first_file_id, "ID missing from first file object"
 
         url = me(self.ctx, f"/notes/{self.ctx.note_id_A}/files/{first_file_id}/download")
-        r = http_request(self.ctx, "NOTE: Download first file Note A", "GET", url, headers=auth_headers(self.ctx.tokenOwner))
+        r, dl = http_download(self.ctx, "NOTE: Download first file Note A", url, auth_headers(self.ctx.tokenOwner))
         assert r.status_code == 200, f"Expected 200, got {r.status_code}."
-        assert r.content, "Downloaded note file is empty"
+        assert dl.bytes, "Downloaded note file is empty"
         assert r.headers.get("Content-Type") in ("image/png", "application/pdf", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"), "Unexpected Content-Type for first file"
+        expected, _, _ = self._note_load_upload_bytes(self.ctx.note_file_path) # To samo źródło, z którego powstała notatka A
+        assert dl.matches(expected), f"Downloaded file differs from upload ({dl.bytes} vs {len(expected)} bytes, sha256 mismatch)"
+        print(c(f" ({dl.bytes} bytes, TTFB {dl.ttfb_ms:.1f} ms, {dl.mbps:.2f} MB/s)", Fore.MAGENTA), end="")
 
         return {"status": 200, "method":"GET","url":url}
 
@@ -1662,8 +2811,8 @@ class E2ETester:
 
     def t_course_login_A(self):
         """Loguje Ownera A."""
-        # Właściwie już zalogowany z testów Note, ale dla pewności
-        return self.t_note_login_A() # Użyj tej samej funkcji logującej
+        # Właściwie już zalogowany z testów Note, ale dla pewności (z TokenCache bez POST /api/login)
+        return self._login_user("COURSE: Login Owner A", self.ctx.emailOwner, self.ctx.pwdOwner, "tokenOwner")
 
     def t_course_verify_course1_exists(self):
         """Sprawdza, czy kurs 1 (utworzony w Note API) jest na liście kursów Ownera A."""
@@ -1683,7 +2832,7 @@ class E2ETester:
         assert self.ctx.tokenOwner and self.ctx.course_id_1, "Context incomplete"
         # MODYFIKACJA: Endpoint może być /api/courses/{id}/avatar
         url = build(self.ctx, f"/api/courses/{self.ctx.course_id_1}/avatar") # Zmieniono z me() na build()
-        r = http_request(self.ctx, "COURSE: Download avatar (none set)", "GET", url, headers={}) # Publiczny dostęp? Sprawdźmy bez tokenu
+        r, _ = http_download(self.ctx, "COURSE: Download avatar (none set)", url, {}) # Publiczny dostęp? Sprawdźmy bez tokenu
         # API może zwracać domyślny awatar (200) lub 404
         # Test E2E oczekuje 404, jeśli żaden nie został ustawiony i nie ma domyślnego pliku
         assert r.status_code == 404, f"Expected 404 for non-existent avatar (or no default), got {r.status_code}"
@@ -1704,13 +2853,13 @@ class E2ETester:
 
     def t_course_login_B(self):
         """Loguje Membera B."""
-        return self.t_note_login_B() # Użyj tej samej funkcji logującej
+        return self._login_user("COURSE: Login Member B", self.ctx.emailB, self.ctx.pwdB, "tokenB")
 
     def t_course_download_avatar_B_unauth(self):
         """Sprawdza, czy Member B (jeszcze nie w kursie 1) może pobrać awatar kursu 1 (oczekiwany błąd 404 lub 200 z domyślnym)."""
         assert self.ctx.tokenB and self.ctx.course_id_1, "Context incomplete"
         url = build(self.ctx, f"/api/courses/{self.ctx.course_id_1}/avatar") # Publiczny endpoint
-        r = http_request(self.ctx, "COURSE: B download A avatar (public check)", "GET", url, headers={}) # Bez tokenu B
+        r, _ = http_download(self.ctx, "COURSE: B download A avatar (public check)", url, {}) # Bez tokenu B
         # Oczekujemy 404 (jeśli brak avatara i defaulta) lub 200 (jeśli jest default)
         assert r.status_code in (200, 404), f"Expected 200 (default) or 404 (none), got {r.status_code}"
         return {"status": r.status_code, "method":"GET", "url":url}
@@ -2899,9 +4048,16 @@ class E2ETester:
     # === Helpery dla powtarzalnych akcji testowych ===
     # ──────────────────────────────────────────────────────────────────────
 
-    def _login_user(self, title: str, email: str, pwd: str, token_attr: str) -> Dict[str, Any]:
-        """Loguje użytkownika i zapisuje token w ctx pod podanym atrybutem."""
+    def _login_user(self, title: str, email: str, pwd: str, token_attr: str, force: bool = False) -> Dict[str, Any]:
+        """Loguje użytkownika i zapisuje token w ctx pod podanym atrybutem.
+
+        Z TokenCache (domyślnie) ważny token aktora jest używany ponownie; force=True wymusza POST /api/login."""
         url = build(self.ctx, "/api/login")
+        cached = self.ctx.tokens.peek(self.ctx, email) if (self.ctx.tokens is not None and not force) else None
+        if cached:
+            setattr(self.ctx, token_attr, cached)
+            print(c(" (token cache hit)", Fore.MAGENTA), end="")
+            return {"status": 200, "method": "POST", "url": url, "token": cached}
         payload = {"email": email, "password": pwd}
         r = http_post_json(self.ctx, title, url, payload, {"Accept": "application/json"})
         assert r.status_code == 200, f"{title} failed: {r.status_code} {trim(r.text)}"
@@ -2909,6 +4065,7 @@ class E2ETester:
         token = body.get("token")
         assert token, f"Token not found for {email} in {title}"
         setattr(self.ctx, token_attr, token) # Zapisz token w kontekście
+        if self.ctx.tokens is not None: self.ctx.tokens.store(email, token)
         # Zwracamy token, może być przydatny
         return {"status": 200, "method":"POST", "url":url, "token": token}
 
@@ -3024,6 +4181,18 @@ class E2ETester:
         assert r.status_code == 200, f"'{title}' failed: {r.status_code} {trim(r.text)}"
         return {"status": 200, "method":"POST", "url":url}
 
+    def _create_course(self, title: str, owner_token: Optional[str], course_title: str, course_type: str = "private") -> int:
+        """Tworzy kurs (/me/courses) i zwraca jego ID."""
+        assert owner_token, f"Owner token missing for '{title}'"
+        url = me(self.ctx, "/courses")
+        payload = {"title": course_title, "description": "Auto-created course", "type": course_type}
+        r = http_post_json(self.ctx, title, url, payload, auth_headers(owner_token))
+        assert r.status_code in (200, 201), f"'{title}' failed: Status {r.status_code}. Response: {trim(r.text)}"
+        body = must_json(r); course_data = body.get("course", body)
+        course_id = course_data.get("id")
+        assert course_id, f"Course ID not found in '{title}' response: {trim(course_data)}"
+        return int(course_id)
+
     def _add_answer(self, title: str, answer_text: str, is_correct: bool) -> Dict[str, Any]:
         """Dodaje odpowiedź do bieżącego pytania w bieżącym teście Quizu."""
         assert self.ctx.quiz_token and self.ctx.test_private_id and self.ctx.question_id, f"Context incomplete for '{title}'"
@@ -3151,11 +4320,3447 @@ class E2ETester:
         print(f" {ICON_LIST} Total tests run:     {c(str(len(self.results)), Fore.WHITE)}")
         print(f" {ICON_OK} Passed:            {c(str(passed_count), Fore.GREEN)}")
         print(f" {ICON_FAIL} Failed:            {c(str(failed_count), Fore.RED if failed_count > 0 else Fore.WHITE)}")
+        if self.ctx.tokens is not None:
+            tc = self.ctx.tokens.counters()
+            print(f" {ICON_LOCK} Token cache:       hits {tc['hits']}, logins {tc['logins']}, refreshes {tc['refreshes']}")
         print(c(BOX, Fore.YELLOW))
 
         # USUNIĘTO: Komunikaty końcowe i sys.exit
 
 
+# ──────────────────────────────────────────────────────────────────────
+# === Tryb obciążeniowy (load) ===
+# ──────────────────────────────────────────────────────────────────────
+
+# ───────────────────────── Checkpointy przebiegu e2e (wznawianie) ─────────────────────────
+
+CHECKPOINT_FILE = "Checkpoints.jsonl" # Linia per krok: stan TestContext i rejestru zasobów PO kroku
+# Pola infrastruktury, których nie zapisujemy (konfiguracja bieżącego uruchomienia, sesja, metryki, logi)
+CHECKPOINT_SKIP = {"base_url", "me_prefix", "ses", "timeout", "started_at", "note_file_path", "avatar_source", "endpoints",
+                   "output_dir", "stats", "record_endpoints", "tokens", "http_cache", "payloads", "resources"}
+# (atrybut tokenu, emaila, hasła) aktorów — do ponownego logowania, gdy JWT z checkpointu wygasł
+ACTOR_SLOTS = [("userA_token", "userA_email", "userA_pwd")] + [(f"token{a}", f"email{a}", f"pwd{a}") for a in ("Owner", "B", "C", "D", "E", "F")]
+
+def context_state(ctx: TestContext) -> Dict[str, Any]:
+    return {f.name: list(v) if isinstance(v := getattr(ctx, f.name), list) else v
+            for f in fields(TestContext) if f.name not in CHECKPOINT_SKIP}
+
+def write_checkpoint(ctx: TestContext, path: str, idx: int, name: str, rec: TestRecord):
+    line = {"step": idx, "name": name, "passed": rec.passed, "error": rec.error, "state": context_state(ctx),
+            "resources": ctx.resources.snapshot() if ctx.resources is not None else None}
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+def find_checkpoint_run(path: Optional[str]) -> Optional[str]:
+    """Katalog przebiegu z Checkpoints.jsonl: podany albo najnowszy w tests/results."""
+    if path:
+        return path if os.path.isfile(os.path.join(path, CHECKPOINT_FILE)) else None
+    base = os.path.join(os.getcwd(), "tests", "results")
+    runs = [os.path.join(base, d) for d in os.listdir(base)] if os.path.isdir(base) else []
+    runs = [d for d in runs if os.path.isfile(os.path.join(d, CHECKPOINT_FILE))]
+    return max(runs, key=os.path.getmtime) if runs else None
+
+def load_checkpoints(run_dir: str) -> Dict[int, Dict[str, Any]]:
+    with open(os.path.join(run_dir, CHECKPOINT_FILE), "r", encoding="utf-8") as f:
+        return {rec["step"]: rec for rec in map(json.loads, f)}
+
+def resolve_step(spec: str, names: List[str]) -> Optional[int]:
+    """Numer kroku (1-based) z numeru albo nazwy (dokładnej, potem fragmentu bez rozróżniania wielkości liter)."""
+    if spec.isdigit():
+        return int(spec) if 1 <= int(spec) <= len(names) else None
+    for i, n in enumerate(names, 1):
+        if n == spec: return i
+    return next((i for i, n in enumerate(names, 1) if spec.lower() in n.lower()), None)
+
+def revive_actor_tokens(ctx: TestContext, margin_s: float = 60.0) -> int:
+    """Po przywróceniu stanu loguje ponownie aktorów, których JWT wygasa; tokeny unieważnione celowo zostają."""
+    revived = 0
+    for tok_attr, email_attr, pwd_attr in ACTOR_SLOTS:
+        token, email, pwd = getattr(ctx, tok_attr), getattr(ctx, email_attr), getattr(ctx, pwd_attr)
+        exp = jwt_exp(token)
+        if not (token and email and pwd and exp is not None and exp - time.time() < margin_s): continue
+        r = http_post_json(ctx, "RESUME: Re-login actor", build(ctx, "/api/login"), {"email": email, "password": pwd}, {"Accept": "application/json"})
+        new = must_json(r).get("token") if r.status_code == 200 else None
+        if not new: continue
+        if ctx.quiz_token == token: ctx.quiz_token = new
+        setattr(ctx, tok_attr, new)
+        if ctx.tokens is not None: ctx.tokens.store(email, new)
+        revived += 1
+    return revived
+
+# ───────────────────────── Wybór kroków (--only / --skip / --tag) ─────────────────────────
+
+# Tagi przekrojowe nadawane po nazwie kroku (moduł — USER/SETUP/NOTE/COURSE/QUIZ — jest tagiem zawsze)
+STEP_TAG_RULES = [
+    ("auth", r"login|logout|token|unauth|401"),
+    ("files", r"file|avatar|download"),
+    ("share", r"share"),
+    ("invite", r"invite|accept|reject"),
+    ("roles", r"role|admin|moderator|->|remove|purge"),
+    ("leave", r"leave"),
+    ("limits", r"limit|block|reach 20|21st"),
+    ("forbidden", r"cannot|forbid|403|outsider|foreign"),
+    ("cleanup", r"cleanup|delete"),
+]
+def step_module(name: str) -> str:
+    label = name.lstrip(" " + "".join(ch for ch in name if not ch.isascii()))
+    return label.split(":", 1)[0].strip().lower() if ":" in label else ""
+
+def step_tags(name: str) -> set:
+    tags = {step_module(name)} - {""}
+    return tags | {tag for tag, rx in STEP_TAG_RULES if re.search(rx, name, re.I)}
+
+def _step_matches(name: str, method: str, pattern: str) -> bool:
+    """Wzorzec glob (`*`, `?`) albo fragment nazwy kroku/metody; bez rozróżniania wielkości liter."""
+    pattern = pattern.lower()
+    targets = (name.lower(), method.lower())
+    if any(ch in pattern for ch in "*?["):
+        return any(fnmatch.fnmatch(t, pattern) or fnmatch.fnmatch(t, f"*{pattern}") for t in targets)
+    return any(pattern in t for t in targets)
+
+def select_steps(steps: List[Tuple[str, Callable]], requires: Dict[int, List[str]], only: List[str], skip: List[str],
+                 tags: List[str], closure: bool = True) -> Tuple[set, set]:
+    """Indeksy (1-based) wybranych kroków i dociągniętych wymagań, rekurencyjnie. `requires` (krok -> metody kroków
+    zadeklarowanych na liście) wskazuje najbliższe wcześniejsze wystąpienie metody. --skip nie usuwa wymagań."""
+    methods = [fn.__name__ for _, fn in steps]
+    tags_l = {t.lower() for t in tags}
+    chosen = set()
+    for i, (name, _) in enumerate(steps, 1):
+        picked = not (only or tags) \
+            or any(_step_matches(name, methods[i - 1], p) for p in only) \
+            or bool(step_tags(name) & tags_l)
+        if picked and not any(_step_matches(name, methods[i - 1], p) or p.lower() in step_tags(name) for p in skip):
+            chosen.add(i)
+    if not closure:
+        return chosen, set()
+    def last_before(i: int, pred: Callable[[int], bool]) -> Optional[int]:
+        return next((j for j in range(i - 1, 0, -1) if pred(j)), None)
+    needed, queue = set(chosen), sorted(chosen)
+    while queue:
+        i = queue.pop()
+        for j in [last_before(i, lambda j, m=m: methods[j - 1] == m) for m in requires.get(i, [])]:
+            if j and j not in needed:
+                needed.add(j); queue.append(j)
+    return needed, needed - chosen
+
+# ───────────────────────── Profilowanie narzutu harnessu (--profile) ─────────────────────────
+
+# Wbudowane funkcje, w których wątek czeka (sieć, DNS, sleep, blokady) — czas po stronie serwera/sieci, nie harnessu
+PROFILE_BLOCKING_RE = re.compile(r"_socket\.|_ssl\.|select\.|getaddrinfo|time\.sleep|_thread\.lock")
+# Znane koszty harnessu liczone włącznie z wywołaniami (kolorowanie = c(), druk = builtins.print)
+PROFILE_HOTSPOTS = ("mask_json_sensitive", "pretty_json", "security_header_notes", "log_exchange", "body_sizes", "c")
+HARNESS_FILE = os.path.abspath(__file__)
+
+class StepProfiler:
+    """cProfile wokół każdego _exec: pstats per krok, podział czasu na czekanie (I/O), kod harnessu i biblioteki.
+
+    Opcjonalny próbkownik (sys._current_frames co `sample_ms`) zbiera pełne stosy wątku e2e do pliku collapsed
+    (format flamegraph.pl / speedscope); cProfile zna tylko krawędzie caller->callee, nie całe stosy."""
+
+    def __init__(self, out_dir: str, sample_ms: float = 2.0):
+        self.dir = os.path.join(out_dir, "profile")
+        os.makedirs(self.dir, exist_ok=True)
+        self.sample_ms = sample_ms
+        self.steps: List[Dict[str, Any]] = []
+        self.stacks: Dict[str, int] = {}
+        self.functions: Dict[str, List[float]] = {} # "plik:linia(funkcja)" -> [czas własny, wywołania] w kodzie harnessu
+        self._label: Optional[str] = None
+        self._tid = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True) if sample_ms > 0 else None
+        if self._sampler: self._sampler.start()
+
+    def step(self, idx: int, name: str, fn: Callable[..., Any], *args: Any) -> Any:
+        prof = cProfile.Profile()
+        self._label = f"[{idx:03d}] {name}".replace(";", ",")
+        wall0, cpu0 = time.perf_counter(), time.process_time()
+        prof.enable()
+        try:
+            return fn(*args)
+        finally:
+            prof.disable()
+            wall, cpu = (time.perf_counter() - wall0) * 1000.0, (time.process_time() - cpu0) * 1000.0
+            self._label = None
+            path = os.path.join(self.dir, f"step-{idx:03d}.pstats")
+            prof.dump_stats(path)
+            self.steps.append({"step": idx, "name": name, "wall_ms": round(wall, 2), "cpu_ms": round(cpu, 2),
+                               "pstats": os.path.relpath(path, os.path.dirname(self.dir)), **self._attribute(prof)})
+
+    def _attribute(self, prof: cProfile.Profile) -> Dict[str, Any]:
+        """Czas własny (tt) funkcji: blokujące wbudowane -> blocked, E2E.py -> harness, reszta -> libraries."""
+        st = pstats.Stats(prof).stats # type: ignore[attr-defined]
+        blocked = harness = libs = 0.0
+        hot: Dict[str, float] = {}
+        for (file, line, func), (cc, nc, tt, ct, _callers) in st.items():
+            if file == "~" and PROFILE_BLOCKING_RE.search(func):
+                blocked += tt
+            elif os.path.abspath(file) == HARNESS_FILE:
+                harness += tt
+                acc = self.functions.setdefault(f"{os.path.basename(file)}:{line}({func})", [0.0, 0])
+                acc[0] += tt; acc[1] += nc
+            else:
+                libs += tt
+            if (os.path.abspath(file) == HARNESS_FILE and func in PROFILE_HOTSPOTS) or (file == "~" and func == "<built-in method builtins.print>"):
+                key = "print" if file == "~" else func
+                hot[key] = hot.get(key, 0.0) + ct * 1000.0
+        return {"blocked_ms": round(blocked * 1000.0, 2), "harness_ms": round(harness * 1000.0, 2), "libraries_ms": round(libs * 1000.0, 2),
+                "hotspots_ms": {k: round(v, 2) for k, v in sorted(hot.items(), key=lambda kv: -kv[1])}}
+
+    def _sample_loop(self):
+        interval = self.sample_ms / 1000.0
+        while not self._stop.wait(interval):
+            label = self._label
+            frame = sys._current_frames().get(self._tid) if label else None
+            if frame is None: continue
+            names: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ","))
+                frame = frame.f_back
+            key = ";".join([label, *reversed(names)])
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def report(self):
+        """Tabela narzutu per krok, ProfileSummary.json, scalone pstats (Profile.pstats) i stosy (Profile.collapsed)."""
+        if self._sampler:
+            self._stop.set(); self._sampler.join(timeout=1.0)
+        if not self.steps: return
+        tot = {k: sum(s[k] for s in self.steps) for k in ("wall_ms", "cpu_ms", "blocked_ms", "harness_ms", "libraries_ms")}
+        overhead = tot["wall_ms"] - tot["blocked_ms"]
+        print(c(f"\n{BOX}\n{ICON_CLOCK} HARNESS OVERHEAD (cProfile, {len(self.steps)} steps)\n{BOX}", Fore.YELLOW))
+        worst = sorted(self.steps, key=lambda s: -(s["wall_ms"] - s["blocked_ms"]))[:15]
+        rows = [[s["step"], trim(s["name"], 48), f"{s['wall_ms']:.1f}", f"{s['blocked_ms']:.1f}", f"{s['harness_ms']:.1f}", f"{s['libraries_ms']:.1f}",
+                 f"{(s['wall_ms'] - s['blocked_ms']) / s['wall_ms'] * 100 if s['wall_ms'] else 0:.0f}%",
+                 ", ".join(f"{k} {v:.1f}" for k, v in list(s["hotspots_ms"].items())[:2])]
+                for s in worst]
+        print(tabulate(rows, headers=["#", "Step", "Wall ms", "Blocked ms", "Harness ms", "Libs ms", "Overhead", "Top hotspots (incl. ms)"], tablefmt="grid"))
+        hot: Dict[str, float] = {}
+        for s in self.steps:
+            for k, v in s["hotspots_ms"].items(): hot[k] = hot.get(k, 0.0) + v
+        top_fn = sorted(self.functions.items(), key=lambda kv: -kv[1][0])[:15]
+        print(f" {ICON_CLOCK} Wall {tot['wall_ms']:.0f} ms: blocked on I/O {tot['blocked_ms']:.0f} ms, "
+              f"in-process {overhead:.0f} ms ({overhead / tot['wall_ms'] * 100 if tot['wall_ms'] else 0:.1f}%: "
+              f"harness {tot['harness_ms']:.0f}, libraries {tot['libraries_ms']:.0f}); CPU {tot['cpu_ms']:.0f} ms")
+        print(f" {ICON_INFO} Hotspots (inclusive): {', '.join(f'{k} {v:.0f} ms' for k, v in sorted(hot.items(), key=lambda kv: -kv[1]))}")
+        print(c("    cProfile inflates in-process time; compare Wall with an unprofiled run before drawing conclusions", Fore.YELLOW))
+        print(c(BOX, Fore.YELLOW))
+        merged = pstats.Stats(*(os.path.join(os.path.dirname(self.dir), s["pstats"]) for s in self.steps))
+        merged.dump_stats(os.path.join(self.dir, "Profile.pstats"))
+        with open(os.path.join(self.dir, "Profile.collapsed"), "w", encoding="utf-8") as f:
+            for stack, n in sorted(self.stacks.items()):
+                f.write(f"{stack} {n}\n")
+        summary = {"totals": {**{k: round(v, 1) for k, v in tot.items()}, "in_process_ms": round(overhead, 1)},
+                   "hotspots_ms": {k: round(v, 1) for k, v in sorted(hot.items(), key=lambda kv: -kv[1])},
+                   "harness_functions": [{"function": k, "self_ms": round(v[0] * 1000.0, 2), "calls": v[1]} for k, v in top_fn],
+                   "sample_ms": self.sample_ms, "samples": sum(self.stacks.values()), "steps": self.steps}
+        write_json(os.path.join(self.dir, "ProfileSummary.json"), summary)
+        print(c(f"📄 Zapisano profil: {self.dir} (ProfileSummary.json, Profile.pstats, Profile.collapsed, step-NNN.pstats)", Fore.CYAN))
+
+def fork_context(ctx: TestContext) -> TestContext:
+    """Tworzy kontekst dla wątku roboczego: wspólna konfiguracja i metryki, osobna sesja i stan aktorów."""
+    ses = requests.Session() # requests.Session nie jest bezpieczna wątkowo — każdy wątek ma własną
+    ses.headers.update(ctx.ses.headers)
+    return TestContext(
+        base_url=ctx.base_url,
+        me_prefix=ctx.me_prefix,
+        ses=ses,
+        timeout=ctx.timeout,
+        note_file_path=ctx.note_file_path,
+        avatar_source=ctx.avatar_source,
+        output_dir=ctx.output_dir,
+        stats=ctx.stats,
+        record_endpoints=ctx.record_endpoints,
+        tokens=ctx.tokens,
+        http_cache=ctx.http_cache,
+        payloads=ctx.payloads,
+        resources=ctx.resources,
+    )
+
+# Przepływy: funkcje (tester) -> None wykonujące jeden przebieg na aktorze tester.ctx.tokenOwner
+def flow_browse(t: E2ETester):
+    """Odczyty typowe dla otwarcia aplikacji: profil, notatki, kursy, dashboard."""
+    h = auth_headers(t.ctx.tokenOwner)
+    for title, url in (("LOAD: Profile", me(t.ctx, "/profile")),
+                       ("LOAD: Notes index", me(t.ctx, "/notes?top=10&skip=0")),
+                       ("LOAD: Courses index", me(t.ctx, "/courses")),
+                       ("LOAD: Dashboard", me(t.ctx, "/dashboard"))):
+        r = http_get(t.ctx, title, url, h)
+        assert r.status_code == 200, f"{title}: expected 200, got {r.status_code}"
+
+def flow_note_crud(t: E2ETester):
+    """Cykl życia notatki: create (multipart) -> show -> PATCH title -> delete."""
+    h = auth_headers(t.ctx.tokenOwner)
+    note_id = t._create_note("LOAD: Create note", t.ctx.tokenOwner, "Load note")
+    url = me(t.ctx, f"/notes/{note_id}")
+    try:
+        r = http_get(t.ctx, "LOAD: Show note", url, h)
+        assert r.status_code == 200, f"Show note: expected 200, got {r.status_code}"
+        r = http_patch_json(t.ctx, "LOAD: Rename note", url, {"title": "Load note (renamed)"}, h)
+        assert r.status_code == 200, f"Rename note: expected 200, got {r.status_code}"
+    finally:
+        r = http_delete(t.ctx, "LOAD: Delete note", url, h)
+        assert r.status_code in (200, 204), f"Delete note: expected 200/204, got {r.status_code}"
+
+def _ensure_partner(t: E2ETester):
+    """Rejestruje (raz na wątek) drugiego aktora w ctx.emailB/tokenB — dla przepływów członkostwa."""
+    if not t.ctx.tokenB:
+        t.ctx.emailB, t.ctx.pwdB, t.ctx.tokenB = t._setup_register_and_login("LoadPartner", "loadpartner")
+
+def flow_note_share(t: E2ETester):
+    """Blok NOTE N:M: kurs -> notatka -> share -> lista notatek kursu -> unshare (prywatna) -> sprzątanie."""
+    tok = t.ctx.tokenOwner
+    h = auth_headers(tok)
+    course_id = t._create_course("LOAD: Create course (share)", tok, "Soak share course")
+    note_id = None
+    try:
+        note_id = t._create_note("LOAD: Create note (share)", tok, "Soak shared note")
+        t._share_note("LOAD: Share note", tok, note_id, course_id)
+        r = http_get(t.ctx, "LOAD: Course notes", build(t.ctx, f"/api/courses/{course_id}/notes"), h)
+        assert r.status_code == 200, f"Course notes: expected 200, got {r.status_code}"
+        r = http_delete(t.ctx, "LOAD: Unshare note", me(t.ctx, f"/notes/{note_id}/share/{course_id}"), h)
+        assert r.status_code == 200, f"Unshare: expected 200, got {r.status_code}"
+        note_data = must_json(r).get("note", {})
+        assert note_data.get("is_private") in (True, 1), "Note should become private after last unshare"
+    finally:
+        if note_id:
+            http_delete(t.ctx, "LOAD: Delete note (share)", me(t.ctx, f"/notes/{note_id}"), h)
+        t._delete_course("LOAD: Delete course (share)", tok, course_id)
+
+def flow_note_files(t: E2ETester):
+    """Pliki notatki 1:N: create -> dodaj plik -> pobierz -> usuń plik -> usuń notatkę (wzrost storage)."""
+    tok = t.ctx.tokenOwner
+    h = auth_headers(tok)
+    note_id = t._create_note("LOAD: Create note (files)", tok, "Soak files note")
+    try:
+        name, src, mime = avatar_file(t.ctx, "soak_file")
+        r = http_post_multipart(t.ctx, "LOAD: Add file", me(t.ctx, f"/notes/{note_id}/files"), data={},
+                                files={"file": (name, src, mime)}, headers=h)
+        assert r.status_code in (200, 201), f"Add file: expected 200/201, got {r.status_code}"
+        file_id = must_json(r).get("file", {}).get("id")
+        assert file_id, "Added file ID missing"
+        r, dl = http_download(t.ctx, "LOAD: Download file", me(t.ctx, f"/notes/{note_id}/files/{file_id}/download"), h)
+        assert r.status_code == 200, f"Download: expected 200, got {r.status_code}"
+        assert dl.matches(src), f"Download: content differs from upload ({dl.bytes} vs {len(src)} bytes)"
+        r = http_delete(t.ctx, "LOAD: Delete file", me(t.ctx, f"/notes/{note_id}/files/{file_id}"), h)
+        assert r.status_code in (200, 204), f"Delete file: expected 200/204, got {r.status_code}"
+    finally:
+        http_delete(t.ctx, "LOAD: Delete note (files)", me(t.ctx, f"/notes/{note_id}"), h)
+
+def flow_course_membership(t: E2ETester):
+    """Blok COURSE: zaproszenie -> akceptacja -> lista członków -> notatka partnera w kursie -> leave -> usunięcie kursu."""
+    _ensure_partner(t)
+    tok, tok_b = t.ctx.tokenOwner, t.ctx.tokenB
+    course_id = t._create_course("LOAD: Create course (members)", tok, "Soak membership course")
+    partner_note = None
+    try:
+        t._invite_user("LOAD: Invite partner", tok, t.ctx.emailB, "member", course_id)
+        t._accept_invite("LOAD: Partner accepts", tok_b, course_id)
+        r = http_get(t.ctx, "LOAD: Course users", build(t.ctx, f"/api/courses/{course_id}/users"), auth_headers(tok))
+        assert r.status_code == 200, f"Course users: expected 200, got {r.status_code}"
+        partner_note = t._create_note("LOAD: Partner creates note", tok_b, "Soak partner note")
+        t._share_note("LOAD: Partner shares note", tok_b, partner_note, course_id)
+        r = http_get(t.ctx, "LOAD: Course notes (owner)", build(t.ctx, f"/api/courses/{course_id}/notes"), auth_headers(tok))
+        assert r.status_code == 200, f"Course notes: expected 200, got {r.status_code}"
+        r = http_delete(t.ctx, "LOAD: Partner leaves", build(t.ctx, f"/api/courses/{course_id}/leave"), auth_headers(tok_b))
+        assert r.status_code == 200, f"Leave: expected 200, got {r.status_code}"
+    finally:
+        if partner_note:
+            http_delete(t.ctx, "LOAD: Delete partner note", me(t.ctx, f"/notes/{partner_note}"), auth_headers(tok_b))
+        t._delete_course("LOAD: Delete course (members)", tok, course_id)
+
+LOAD_FLOWS: Dict[str, Callable[[E2ETester], None]] = {
+    "browse": flow_browse,
+    "note_crud": flow_note_crud,
+    "note_share": flow_note_share,
+    "note_files": flow_note_files,
+    "course_membership": flow_course_membership,
+}
+DEFAULT_LOAD_FLOWS = ["browse", "note_crud"]
+DEFAULT_SOAK_FLOWS = ["note_share", "note_files", "course_membership", "browse"]
+
+# ───────────────────────── Scenariusze deklaratywne (JSON/YAML → plan kroków) ─────────────────────────
+
+LOAD_FLOW_WEIGHTS: Dict[str, float] = {} # Waga losowania przepływu w LoadRunner (domyślnie 1)
+SCENARIO_EXTS = (".json", ".yaml", ".yml")
+SCENARIO_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+    ">": lambda a, b: a > b, ">=": lambda a, b: a >= b, "<": lambda a, b: a < b, "<=": lambda a, b: a <= b,
+    "in": lambda a, b: a in b, "contains": lambda a, b: b in a,
+    "len": lambda a, b: len(a) == b, "len>=": lambda a, b: len(a) >= b,
+    "exists": lambda a, b: (a is not None) == bool(b),
+}
+_MISSING = object()
+
+def _compile_template(value: Any) -> Tuple[Callable[[Dict[str, Any]], Any], set]:
+    """Zwraca (render(vars), użyte zmienne). "{x}" jako cały string zachowuje typ wartości (np. int ID)."""
+    if isinstance(value, dict):
+        parts = [(k, *_compile_template(v)) for k, v in value.items()]
+        return (lambda vs: {k: fn(vs) for k, fn, _ in parts}), set().union(*(u for _, _, u in parts))
+    if isinstance(value, list):
+        parts = [_compile_template(v) for v in value]
+        return (lambda vs: [fn(vs) for fn, _ in parts]), set().union(*(u for _, u in parts))
+    if not isinstance(value, str) or "{" not in value:
+        return (lambda vs: value), set()
+    chunks = [(lit, fld) for lit, fld, _, _ in string.Formatter().parse(value)]
+    used = {fld for _, fld in chunks if fld}
+    if len(chunks) == 1 and not chunks[0][0] and chunks[0][1]:
+        key = chunks[0][1]
+        return (lambda vs: vs[key]), used
+    return (lambda vs: "".join(lit + (str(vs[fld]) if fld else "") for lit, fld in chunks)), used
+
+def _compile_path(spec: str) -> Tuple[Any, ...]:
+    """"note.files.0.id" -> ("note", "files", 0, "id")."""
+    return tuple(int(p) if p.isdigit() else p for p in spec.split(".") if p)
+
+def _dig(body: Any, path: Tuple[Any, ...]) -> Any:
+    for key in path:
+        try:
+            body = body[key]
+        except (KeyError, IndexError, TypeError):
+            return _MISSING
+    return body
+
+@dataclass
+class ScenarioStep:
+    name: str
+    method: str
+    url: Callable[[Dict[str, Any]], str]
+    auth: str # owner | partner | none
+    expect: Optional[Tuple[int, ...]] # None = dowolny 2xx
+    json_body: Optional[Callable[[Dict[str, Any]], Any]] = None
+    form: Optional[Callable[[Dict[str, Any]], Any]] = None
+    files: List[Tuple[str, UploadSource]] = field(default_factory=list)
+    captures: List[Tuple[str, Tuple[Any, ...]]] = field(default_factory=list)
+    asserts: List[Tuple[str, Tuple[Any, ...], str, Callable[[Dict[str, Any]], Any]]] = field(default_factory=list)
+    think_ms: Tuple[float, float] = (0.0, 0.0)
+    always: bool = False # Krok sprzątający: wykonywany także po błędzie wcześniejszego kroku
+    needs: set = field(default_factory=set)
+
+class ScenarioPlan:
+    """Skompilowany scenariusz: wywoływany jak przepływ z LOAD_FLOWS (plan(tester)), żądania idą przez http_request."""
+
+    def __init__(self, name: str, source: str, weight: float, steps: List[ScenarioStep], variables: Dict[str, Any]):
+        self.name, self.source, self.weight, self.steps, self.variables = name, source, weight, steps, variables
+        self.uses_partner = any(s.auth == "partner" for s in steps)
+
+    def __call__(self, t: E2ETester, trace: Optional[List[Dict[str, Any]]] = None):
+        if self.uses_partner:
+            _ensure_partner(t)
+        vs = {**self.variables, "api": "/api", "me": f"/api/{t.ctx.me_prefix.strip('/')}",
+              "email": t.ctx.emailOwner, "partner_email": t.ctx.emailB, "rnd": random.randrange(1 << 30)}
+        failure: Optional[AssertionError] = None
+        for step in self.steps:
+            if failure is not None and not step.always: continue
+            if not step.needs <= vs.keys(): continue # Sprzątanie zasobu, którego nie udało się utworzyć
+            t0 = time.time()
+            try:
+                status = self._run_step(t, step, vs)
+                if trace is not None: trace.append({"step": step.name, "status": status, "ms": (time.time() - t0) * 1000.0, "ok": True})
+            except AssertionError as e:
+                if trace is not None: trace.append({"step": step.name, "ms": (time.time() - t0) * 1000.0, "ok": False, "error": str(e)})
+                failure = failure or e
+                continue
+            lo, hi = step.think_ms
+            if hi > 0: time.sleep(random.uniform(lo, hi) / 1000.0)
+        if failure is not None:
+            raise failure
+
+    def _run_step(self, t: E2ETester, step: ScenarioStep, vs: Dict[str, Any]) -> int:
+        title = f"SCN {self.name}: {step.name}"
+        token = {"owner": t.ctx.tokenOwner, "partner": t.ctx.tokenB}.get(step.auth)
+        files = [(fld, (src.name, src, src.mime)) for fld, src in step.files] or None
+        r = http_request(t.ctx, title, step.method, build(t.ctx, step.url(vs)), auth_headers(token),
+                         json_body=step.json_body(vs) if step.json_body else None,
+                         data=step.form(vs) if step.form else None, files=files)
+        ok = r.status_code in step.expect if step.expect else 200 <= r.status_code < 300
+        assert ok, f"{step.name}: expected {list(step.expect) if step.expect else '2xx'}, got {r.status_code} {trim(r.text)}"
+        if step.captures or step.asserts:
+            body = must_json(r)
+            for var, path in step.captures:
+                val = _dig(body, path)
+                assert val is not _MISSING, f"{step.name}: capture {var!r} — no {'.'.join(map(str, path))} in response"
+                vs[var] = val
+            for label, path, op, expected in step.asserts:
+                val, exp = _dig(body, path), expected(vs)
+                assert val is not _MISSING or op == "exists", f"{step.name}: no {label} in response"
+                try:
+                    passed = SCENARIO_OPS[op](None if val is _MISSING else val, exp)
+                except TypeError:
+                    passed = False
+                assert passed, f"{step.name}: {label} {op} {exp!r} failed (got {trim(val)})"
+        return r.status_code
+
+def _think_range(spec: Any, where: str) -> Tuple[float, float]:
+    if spec is None: return (0.0, 0.0)
+    if isinstance(spec, (int, float)): return (float(spec), float(spec))
+    if isinstance(spec, list) and len(spec) == 2 and spec[0] <= spec[1]: return (float(spec[0]), float(spec[1]))
+    raise ValueError(f"{where}: think_ms must be a number or [min, max]")
+
+def _scenario_file_source(ctx: TestContext, spec: str, base_dir: str) -> UploadSource:
+    """Źródło pliku kroku: "note" (--note-file lub PNG generowany), "avatar" albo ścieżka względem pliku scenariusza."""
+    if spec == "avatar":
+        return avatar_file(ctx, "avatar")[1]
+    if spec == "note":
+        path = ctx.note_file_path
+        if path and os.path.isfile(path):
+            return upload_source(path, NOTE_MIME_MAP.get(os.path.splitext(path)[1].lower().lstrip("."), "application/octet-stream"))
+        return _generated_note_source()
+    path = spec if os.path.isabs(spec) else os.path.join(base_dir, spec)
+    if not os.path.isfile(path):
+        raise ValueError(f"file {spec!r} not found ({path})")
+    return upload_source(path, NOTE_MIME_MAP.get(os.path.splitext(path)[1].lower().lstrip("."), "application/octet-stream"))
+
+def compile_scenario(ctx: TestContext, doc: Dict[str, Any], source: str) -> ScenarioPlan:
+    """Waliduje i kompiluje scenariusz raz, przy starcie: szablony, ścieżki capture/assert i pliki są gotowe przed
+    pierwszym żądaniem; odwołanie do zmiennej, której nic wcześniej nie ustawia, jest błędem kompilacji."""
+    name = str(doc.get("name") or os.path.splitext(os.path.basename(source))[0])
+    where = f"{source} [{name}]"
+    variables = dict(doc.get("vars") or {})
+    known = set(variables) | {"api", "me", "email", "partner_email", "rnd"}
+    default_think = _think_range(doc.get("think_ms"), where)
+    steps: List[ScenarioStep] = []
+    raw_steps = doc.get("steps")
+    if not isinstance(raw_steps, list) or not raw_steps:
+        raise ValueError(f"{where}: 'steps' must be a non-empty list")
+    for n, raw in enumerate(raw_steps, 1):
+        sname = str(raw.get("name") or f"step {n}")
+        swhere = f"{where} step {n} ({sname})"
+        unknown_keys = set(raw) - {"name", "method", "path", "auth", "json", "form", "files", "expect", "capture", "assert", "think_ms", "always"}
+        if unknown_keys:
+            raise ValueError(f"{swhere}: unknown keys {sorted(unknown_keys)}")
+        if "path" not in raw:
+            raise ValueError(f"{swhere}: 'path' is required")
+        if raw.get("json") is not None and (raw.get("form") is not None or raw.get("files")):
+            raise ValueError(f"{swhere}: 'json' cannot be combined with 'form'/'files'")
+        auth = raw.get("auth", "owner")
+        if auth not in ("owner", "partner", "none"):
+            raise ValueError(f"{swhere}: auth must be owner, partner or none")
+        url, needs = _compile_template(raw["path"])
+        json_body = form = None
+        if raw.get("json") is not None:
+            json_body, used = _compile_template(raw["json"]); needs |= used
+        if raw.get("form") is not None:
+            form, used = _compile_template(raw["form"]); needs |= used
+        try:
+            files = [(fld, _scenario_file_source(ctx, str(spec), os.path.dirname(source))) for fld, spec in (raw.get("files") or {}).items()]
+        except ValueError as e:
+            raise ValueError(f"{swhere}: {e}")
+        asserts = []
+        for a in raw.get("assert") or []:
+            if not (isinstance(a, list) and len(a) == 3 and a[1] in SCENARIO_OPS):
+                raise ValueError(f"{swhere}: assert must be [path, op, value] with op in {', '.join(SCENARIO_OPS)}")
+            expected, used = _compile_template(a[2]); needs |= used
+            asserts.append((a[0], _compile_path(a[0]), a[1], expected))
+        expect = raw.get("expect")
+        expect = (expect,) if isinstance(expect, int) else tuple(expect) if expect else None
+        missing = needs - known
+        if missing:
+            raise ValueError(f"{swhere}: undefined variable(s) {sorted(missing)} (not in vars and not captured by an earlier step)")
+        captures = [(var, _compile_path(path)) for var, path in (raw.get("capture") or {}).items()]
+        known |= {var for var, _ in captures}
+        steps.append(ScenarioStep(name=sname, method=str(raw.get("method", "GET")).upper(), url=url, auth=auth, expect=expect,
+                                  json_body=json_body, form=form, files=files, captures=captures, asserts=asserts,
+                                  think_ms=_think_range(raw["think_ms"], swhere) if "think_ms" in raw else default_think,
+                                  always=bool(raw.get("always")), needs=needs))
+    return ScenarioPlan(name, source, float(doc.get("weight", 1)), steps, variables)
+
+def _read_scenario_docs(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            data = json.load(f)
+        elif yaml is None:
+            raise ValueError(f"{path}: PyYAML is not installed (pip install pyyaml) — use .json scenarios")
+        else:
+            data = list(yaml.safe_load_all(f))
+    docs = data if isinstance(data, list) else [data]
+    return [d for doc in docs if doc for d in (doc if isinstance(doc, list) else [doc])]
+
+def load_scenarios(ctx: TestContext, spec: str) -> List[ScenarioPlan]:
+    """Kompiluje scenariusze z listy plików/katalogów (po przecinku); plik może zawierać jeden scenariusz lub listę."""
+    paths: List[str] = []
+    for item in _csv_list(spec):
+        if os.path.isdir(item):
+            paths += sorted(os.path.join(item, f) for f in os.listdir(item) if f.endswith(SCENARIO_EXTS))
+        elif item:
+            paths.append(item)
+    plans = []
+    for path in paths:
+        try:
+            docs = _read_scenario_docs(path)
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(f"{path}: {e}")
+        plans += [compile_scenario(ctx, doc, path) for doc in docs]
+    names = [p.name for p in plans]
+    dup = sorted({n for n in names if names.count(n) > 1})
+    if dup:
+        raise ValueError(f"Duplicate scenario names: {', '.join(dup)}")
+    return plans
+
+def register_scenarios(plans: List[ScenarioPlan]) -> List[str]:
+    """Dodaje plany do LOAD_FLOWS jako "scn:<nazwa>" z wagą; zwraca nazwy przepływów."""
+    for p in plans:
+        LOAD_FLOWS[f"scn:{p.name}"] = p
+        LOAD_FLOW_WEIGHTS[f"scn:{p.name}"] = p.weight
+    return [f"scn:{p.name}" for p in plans]
+
+def run_scenario_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb scenario: każdy skompilowany scenariusz raz, krok po kroku (walidacja pliku przed obciążeniem)."""
+    plans = [LOAD_FLOWS[f] for f in args.scenario_flows]
+    if not plans:
+        print(c(f"{ICON_FAIL} No scenarios — pass --scenarios <files or directories>", Fore.RED))
+        return 2
+    t = E2ETester(ctx)
+    ctx.emailOwner, ctx.pwdOwner, ctx.tokenOwner = t._setup_register_and_login("Scenario", "scenario")
+    report, failed = [], 0
+    for plan in plans:
+        print(c(f"\n{ICON_INFO} Scenario {plan.name} ({len(plan.steps)} steps, weight {plan.weight:g}) — {plan.source}", Fore.WHITE))
+        trace: List[Dict[str, Any]] = []
+        error = None
+        try:
+            plan(t, trace)
+        except AssertionError as e:
+            error = str(e); failed += 1
+        for s in trace:
+            mark = c(f"{ICON_OK} PASS", Fore.GREEN) if s["ok"] else c(f"{ICON_FAIL} FAIL — {s['error']}", Fore.RED)
+            print(f"    {s['step']:<40} {s['ms']:8.1f} ms  {mark}")
+        report.append({"scenario": plan.name, "source": plan.source, "passed": error is None, "error": error, "steps": trace})
+    path = os.path.join(ctx.output_dir, "ScenarioRun.json")
+    write_json(path, {"scenarios": report})
+    print(c(f"\n📄 Zapisano przebieg scenariuszy: {path}", Fore.CYAN))
+    return 1 if failed else 0
+
+# ───────────────────────── Model ruchu z logów dostępowych ─────────────────────────
+
+ROUTE_DEF_RE = re.compile(r"Route::(get|post|put|patch|delete|match)\(\s*(?:\[([^\]]*)\]\s*,\s*)?'([^']*)'")
+ROUTE_PREFIX_RE = re.compile(r"Route::prefix\('([^']*)'\)")
+ROUTE_PARAM_RE = re.compile(r"\\\{(\w+)\\\}")
+# nginx "combined" z opcjonalnym $request_time (sekundy) na końcu, np. ... "curl/8.0" 0.042 lub rt=0.042
+NGINX_LOG_RE = re.compile(r'^(?P<ip>\S+) \S+ (?P<user>\S+) \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<uri>\S+)[^"]*" '
+                          r'(?P<status>\d{3}) \S+(?: "[^"]*" "(?P<ua>[^"]*)")?(?P<rest>.*)$')
+LOG_RT_RE = re.compile(r"(?:^|\s)(?:rt=|request_time=)?(\d+\.\d+)(?=\s|$)")
+MODEL_QUANTILES = [q * 5 for q in range(21)] # p0, p5, ..., p100 — dystrybuanty do losowania odwrotną metodą
+MODEL_POOL_CAP = 5 # Nadmiarowe zasoby z akcji "create" ponad limit są usuwane (notatki, kursy, testy, pytania)
+MODEL_FILE = "TrafficModel.json"
+
+def default_routes_file() -> str:
+    here = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "routes", "api.php")
+    return "routes/api.php" if os.path.isfile("routes/api.php") else os.path.normpath(here)
+
+class RouteTable:
+    """Szablony tras z routes/api.php (grupy prefix('me') rozwinięte) dopasowywane do ścieżek z logów.
+
+    Prefiks --me-prefix jest sprowadzany do 'me' (w szablonach i ścieżkach), więc klucze tras są stałe."""
+
+    def __init__(self, path: str, me_prefix: str = "me"):
+        self.me_prefix = me_prefix.strip("/") or "me"
+        self.routes: List[Tuple[str, str, Any]] = []
+        stack: List[str] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for raw in f:
+                line = raw.split("//", 1)[0]
+                if "->group(function" in line:
+                    m = ROUTE_PREFIX_RE.search(line)
+                    prefix = m.group(1) if m else ""
+                    stack.append("me" if not any(stack) and prefix.strip("/") == self.me_prefix else prefix)
+                for verb, verbs, uri in ROUTE_DEF_RE.findall(line):
+                    tpl = "/" + "/".join(p.strip("/") for p in ["api", *stack, uri] if p.strip("/"))
+                    rx = re.compile("^" + ROUTE_PARAM_RE.sub(r"(?P<\1>[^/]+)", re.escape(tpl)) + "$")
+                    for method in (re.findall(r"'(\w+)'", verbs) if verb == "match" else [verb]):
+                        self.routes.append((method.upper(), tpl, rx))
+                if line.strip().startswith("});") and stack:
+                    stack.pop()
+        # Najpierw trasy z mniejszą liczbą parametrów (literalne segmenty wygrywają, np. /me/tests przed /me/{...})
+        self.routes.sort(key=lambda r: (r[1].count("{"), -len(r[1])))
+        self._cache: Dict[Tuple[str, str], Optional[Tuple[str, Dict[str, str]]]] = {}
+
+    def match(self, method: str, path: str) -> Optional[Tuple[str, Dict[str, str]]]:
+        """("METHOD /api/... {param}", parametry z URL) albo None; HEAD liczy się jak GET."""
+        method = "GET" if method.upper() == "HEAD" else method.upper()
+        path = urlsplit(path).path.rstrip("/") or "/"
+        own = f"/api/{self.me_prefix}"
+        if self.me_prefix != "me" and (path == own or path.startswith(own + "/")):
+            path = "/api/me" + path[len(own):]
+        key = (method, path)
+        if key not in self._cache:
+            hit = next(((f"{m} {tpl}", rx.match(path).groupdict()) for m, tpl, rx in self.routes
+                        if m == method and rx.match(path)), None)
+            self._cache[key] = hit
+        return self._cache[key]
+
+def _log_time(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)):
+        return float(value) / (1000.0 if value > 1e11 else 1.0) # epoch w ms lub s
+    if not isinstance(value, str): return None
+    for fmt in ("%d/%b/%Y:%H:%M:%S %z", "%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S.%f%z", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(value.replace("Z", "+0000"), fmt).timestamp()
+        except ValueError:
+            continue
+    return None
+
+def parse_access_line(line: str) -> Optional[Dict[str, Any]]:
+    """Linia nginx combined (z opcjonalnym $request_time) albo JSON (np. log middleware Laravela) -> rekord lub None."""
+    line = line.strip()
+    if not line: return None
+    if line.startswith("{"):
+        try:
+            d = json.loads(line)
+        except json.JSONDecodeError:
+            return None
+        uri = d.get("path") or d.get("uri") or d.get("url") or d.get("request_uri")
+        ts = _log_time(d.get("time") or d.get("timestamp") or d.get("@timestamp") or d.get("datetime"))
+        if not (uri and ts and d.get("method")): return None
+        if "duration_ms" in d: ms = float(d["duration_ms"])
+        elif "request_time" in d: ms = float(d["request_time"]) * 1000.0
+        elif "duration" in d: ms = float(d["duration"]) * 1000.0
+        else: ms = None
+        client = d.get("user_id") or d.get("user") or f"{d.get('ip') or d.get('remote_addr')}|{d.get('user_agent') or d.get('ua') or ''}"
+        return {"ts": ts, "method": str(d["method"]).upper(), "path": urlsplit(str(uri)).path, "status": int(d.get("status") or 0),
+                "ms": ms, "client": str(client)}
+    m = NGINX_LOG_RE.match(line)
+    if not m: return None
+    ts = _log_time(m.group("time"))
+    if ts is None: return None
+    rt = LOG_RT_RE.search(m.group("rest") or "")
+    user = m.group("user")
+    return {"ts": ts, "method": m.group("method"), "path": urlsplit(m.group("uri")).path, "status": int(m.group("status")),
+            "ms": float(rt.group(1)) * 1000.0 if rt else None,
+            "client": user if user != "-" else f"{m.group('ip')}|{m.group('ua') or ''}"}
+
+def read_access_logs(paths: List[str], table: RouteTable) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Rekordy dopasowane do tras (posortowane po czasie) i statystyka linii (.gz czytane bezpośrednio)."""
+    records: List[Dict[str, Any]] = []
+    lines = bad = 0
+    unmatched: Dict[str, int] = {}
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                lines += 1
+                rec = parse_access_line(line)
+                if rec is None:
+                    bad += 1; continue
+                hit = table.match(rec["method"], rec["path"])
+                if hit is None:
+                    k = route_key(rec["method"], rec["path"])
+                    unmatched[k] = unmatched.get(k, 0) + 1; continue
+                rec["route"], rec["params"] = hit
+                records.append(rec)
+    records.sort(key=lambda r: r["ts"])
+    top = sorted(unmatched.items(), key=lambda kv: -kv[1])[:20]
+    return records, {"lines": lines, "unparsed": bad, "matched": len(records), "unmatched": sum(unmatched.values()), "unmatched_top": top}
+
+def split_sessions(records: List[Dict[str, Any]], gap_s: float) -> List[List[Dict[str, Any]]]:
+    """Sesje: kolejne żądania jednego klienta bez przerwy dłuższej niż gap_s."""
+    open_: Dict[str, List[Dict[str, Any]]] = {}
+    done: List[List[Dict[str, Any]]] = []
+    for rec in records:
+        cur = open_.get(rec["client"])
+        if cur and rec["ts"] - cur[-1]["ts"] > gap_s:
+            done.append(cur); cur = None
+        if cur is None:
+            cur = open_[rec["client"]] = []
+        cur.append(rec)
+    return done + list(open_.values())
+
+def _quantiles(values: List[float]) -> List[float]:
+    return [round(percentile(values, max(q, 0.001)), 3) for q in MODEL_QUANTILES] if values else []
+
+def _probs(counts: Dict[str, int]) -> Dict[str, float]:
+    total = sum(counts.values()) or 1
+    return {k: round(v / total, 6) for k, v in sorted(counts.items(), key=lambda kv: -kv[1])}
+
+def build_traffic_model(records: List[Dict[str, Any]], gap_s: float) -> Dict[str, Any]:
+    """Udziały i tempo tras, rozkład think time, kształt sesji (długość, czas, wejście, przejścia Markowa)."""
+    span = max(records[-1]["ts"] - records[0]["ts"], 1.0) if records else 1.0
+    routes: Dict[str, Dict[str, Any]] = {}
+    for rec in records:
+        r = routes.setdefault(rec["route"], {"count": 0, "status": {}, "ms": []})
+        r["count"] += 1
+        cls = f"{rec['status'] // 100}xx"
+        r["status"][cls] = r["status"].get(cls, 0) + 1
+        if rec["ms"] is not None: r["ms"].append(rec["ms"])
+    sessions = split_sessions(records, gap_s)
+    entry: Dict[str, int] = {}
+    trans: Dict[str, Dict[str, int]] = {}
+    think: List[float] = []
+    for s in sessions:
+        entry[s[0]["route"]] = entry.get(s[0]["route"], 0) + 1
+        for a, b in zip(s, s[1:] + [None]):
+            nxt = trans.setdefault(a["route"], {})
+            key = b["route"] if b else "__end__"
+            nxt[key] = nxt.get(key, 0) + 1
+            if b: think.append((b["ts"] - a["ts"]) * 1000.0)
+    durations = [s[-1]["ts"] - s[0]["ts"] for s in sessions]
+    return {
+        "span_s": round(span, 1),
+        "requests": len(records),
+        "rps": round(len(records) / span, 3),
+        "routes": {k: {"count": v["count"], "share": round(v["count"] / len(records), 6), "rps": round(v["count"] / span, 4),
+                       "status": v["status"], "simulated": k in MODEL_ACTIONS,
+                       "p50_ms": round(percentile(v["ms"], 50), 1) if v["ms"] else None,
+                       "p95_ms": round(percentile(v["ms"], 95), 1) if v["ms"] else None}
+                   for k, v in sorted(routes.items(), key=lambda kv: -kv[1]["count"])},
+        "think_ms": _quantiles(think),
+        "sessions": {"count": len(sessions), "gap_s": gap_s, "rate_per_s": round(len(sessions) / span, 4),
+                     "length": _quantiles([float(len(s)) for s in sessions]), "duration_s": _quantiles(durations),
+                     # Prawo Little'a: średnia liczba równoległych sesji = suma czasów sesji / okno
+                     "concurrency": round(sum(durations) / span, 2)},
+        "entry": _probs(entry),
+        "transitions": {k: _probs(v) for k, v in trans.items()},
+    }
+
+def sample_quantiles(q: List[float], rng: random.Random) -> float:
+    """Losowanie z rozkładu opisanego kwantylami (interpolacja liniowa dystrybuanty odwrotnej)."""
+    if not q: return 0.0
+    x = rng.random() * (len(q) - 1)
+    i = int(x)
+    return q[i] if i + 1 >= len(q) else q[i] + (q[i + 1] - q[i]) * (x - i)
+
+class SyntheticFixtures:
+    """Zasoby syntetycznego użytkownika tworzone leniwie helperami testera; klucz = ID z logu (None = domyślny).
+
+    `ids` to tabela mapowania (rodzaj, ID z logu) -> ID syntetyczne. Tester jest wiązany per wątek (bind), więc
+    jednego użytkownika mogą obsługiwać równolegle różne wątki repleya, każdy z własną sesją HTTP."""
+
+    def __init__(self, t: Optional[E2ETester] = None):
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self.ids: Dict[Tuple[str, Any], int] = {}
+        self.extra: Dict[str, List[Tuple[int, ...]]] = {"note": [], "course": [], "test": [], "question": [], "file": []}
+        if t is not None: self.bind(t)
+
+    def bind(self, t: E2ETester):
+        self._local.t = t
+
+    @property
+    def t(self) -> Optional[E2ETester]:
+        return getattr(self._local, "t", None)
+
+    @property
+    def h(self) -> Dict[str, str]:
+        return auth_headers(self.t.ctx.tokenOwner)
+
+    def _get(self, kind: str, key: Any, create: Callable[[], int]) -> int:
+        with self._lock: # Dwa równoległe pierwsze odwołania do tego samego ID z logu tworzą jeden zasób
+            if (kind, key) not in self.ids:
+                self.ids[(kind, key)] = create()
+            return self.ids[(kind, key)]
+
+    def note(self, key: Any = None) -> int:
+        return self._get("note", key, lambda: self.t._create_note("MODEL: Fixture note", self.t.ctx.tokenOwner, "Model note"))
+
+    def course(self, key: Any = None) -> int:
+        return self._get("course", key, lambda: self.t._create_course("MODEL: Fixture course", self.t.ctx.tokenOwner, "Model course"))
+
+    def test(self, key: Any = None) -> int:
+        return self._get("test", key, self.new_test)
+
+    def question(self, test_key: Any = None, key: Any = None) -> int:
+        return self._get("question", (test_key, key), lambda: self.new_question(self.test(test_key)))
+
+    def file(self, note_key: Any = None, key: Any = None) -> int:
+        return self._get("file", (note_key, key), lambda: self.new_file(self.note(note_key)))
+
+    def new_test(self) -> int:
+        r = http_post_json(self.t.ctx, "MODEL: Create test", me(self.t.ctx, "/tests"),
+                           {"title": "Model test", "description": "Traffic model test", "status": "private"}, self.h)
+        assert r.status_code == 201, f"Create test: expected 201, got {r.status_code}"
+        body = must_json(r)
+        return int(body.get("test", body)["id"])
+
+    def new_question(self, test_id: int) -> int:
+        r = http_post_json(self.t.ctx, "MODEL: Add question", me(self.t.ctx, f"/tests/{test_id}/questions"), {"question": "Model question?"}, self.h)
+        assert r.status_code == 201, f"Add question: expected 201, got {r.status_code}"
+        body = must_json(r)
+        return int(body.get("question", body)["id"])
+
+    def new_file(self, note_id: int) -> int:
+        r = http_post_multipart(self.t.ctx, "MODEL: Add file", me(self.t.ctx, f"/notes/{note_id}/files"), data={},
+                                files={"file": avatar_file(self.t.ctx, "model_file")}, headers=self.h)
+        assert r.status_code in (200, 201), f"Add file: expected 200/201, got {r.status_code}"
+        return int(must_json(r).get("file", {})["id"])
+
+    def push(self, kind: str, ref: Tuple[int, ...]):
+        """Zapamiętuje zasób z akcji create; nadmiar ponad MODEL_POOL_CAP usuwa (limit 20 pytań, rozrost danych)."""
+        with self._lock:
+            pool = self.extra[kind]
+            pool.append(ref)
+            trim = pool.pop(0) if len(pool) > MODEL_POOL_CAP else None
+        if trim is not None:
+            self.delete(kind, trim, "MODEL: Trim")
+
+    def pop(self, kind: str, make: Callable[[], Tuple[int, ...]]) -> Tuple[int, ...]:
+        """Zasób do usunięcia przez akcję delete: z puli albo świeżo utworzony."""
+        with self._lock:
+            ref = self.extra[kind].pop() if self.extra[kind] else None
+        return ref if ref is not None else make()
+
+    def delete(self, kind: str, ref: Tuple[int, ...], title: str) -> requests.Response:
+        path = {"note": "/notes/{0}", "course": "/courses/{0}", "test": "/tests/{0}",
+                "question": "/tests/{0}/questions/{1}", "file": "/notes/{0}/files/{1}"}[kind].format(*ref)
+        return http_delete(self.t.ctx, f"{title} {kind}", me(self.t.ctx, path), self.h)
+
+def _model_check(r: requests.Response, title: str, ok: Tuple[int, ...] = (200, 201, 204)):
+    assert r.status_code in ok, f"{title}: expected {'/'.join(map(str, ok))}, got {r.status_code} {trim(r.text)}"
+
+def _model_url(ctx: TestContext, path: str) -> str:
+    """URL trasy modelu: ścieżki /api/me/... idą przez me() (--me-prefix), reszta przez build()."""
+    return me(ctx, path[len("/api/me"):]) if path.startswith("/api/me/") else build(ctx, path)
+
+def _model_get(path: Callable[[SyntheticFixtures, Dict[str, str]], str], ok: Tuple[int, ...] = (200,)):
+    def act(t: E2ETester, fx: SyntheticFixtures, p: Dict[str, str], title: str):
+        _model_check(http_get(t.ctx, title, _model_url(t.ctx, path(fx, p)), fx.h), title, ok)
+    return act
+
+def _model_login(t: E2ETester, fx: SyntheticFixtures, p: Dict[str, str], title: str):
+    r = http_post_json(t.ctx, title, build(t.ctx, "/api/login"), {"email": t.ctx.emailOwner, "password": t.ctx.pwdOwner}, {"Accept": "application/json"})
+    _model_check(r, title, (200,))
+    t.ctx.tokenOwner = must_json(r)["token"]
+    if t.ctx.tokens is not None: t.ctx.tokens.store(t.ctx.emailOwner, t.ctx.tokenOwner)
+
+def _model_refresh(t: E2ETester, fx: SyntheticFixtures, p: Dict[str, str], title: str):
+    r = http_post_json(t.ctx, title, build(t.ctx, "/api/refresh"), {}, fx.h)
+    _model_check(r, title, (200,))
+    t.ctx.tokenOwner = must_json(r).get("token") or t.ctx.tokenOwner
+    if t.ctx.tokens is not None: t.ctx.tokens.store(t.ctx.emailOwner, t.ctx.tokenOwner)
+
+def _model_write(method: str, path: Callable[[SyntheticFixtures, Dict[str, str]], str], body: Dict[str, Any]):
+    def act(t: E2ETester, fx: SyntheticFixtures, p: Dict[str, str], title: str):
+        _model_check(http_request(t.ctx, title, method, _model_url(t.ctx, path(fx, p)), fx.h, json_body=body), title)
+    return act
+
+def _model_new(t: E2ETester, fx: SyntheticFixtures, kind: str, p: Dict[str, str], title: str) -> Tuple[int, ...]:
+    if kind == "note": return (t._create_note(title, t.ctx.tokenOwner, "Model note (extra)"),)
+    if kind == "course": return (t._create_course(title, t.ctx.tokenOwner, "Model course (extra)"),)
+    if kind == "test": return (fx.new_test(),)
+    if kind == "question": return (fx.test(p.get("testId")), fx.new_question(fx.test(p.get("testId"))))
+    return (fx.note(p.get("noteId")), fx.new_file(fx.note(p.get("noteId"))))
+
+def _model_create(kind: str):
+    def act(t: E2ETester, fx: SyntheticFixtures, p: Dict[str, str], title: str):
+        fx.push(kind, _model_new(t, fx, kind, p, title))
+    return act
+
+def _model_delete(kind: str):
+    def act(t: E2ETester, fx: SyntheticFixtures, p: Dict[str, str], title: str):
+        ref = fx.pop(kind, lambda: _model_new(t, fx, kind, p, f"MODEL: Create {kind} (for delete)"))
+        _model_check(fx.delete(kind, ref, title), title)
+    return act
+
+# Trasy z routes/api.php, które syntetyczny użytkownik umie odtworzyć (klucz jak w RouteTable.match); reszta jest pomijana
+MODEL_ACTIONS: Dict[str, Callable[[E2ETester, SyntheticFixtures, Dict[str, str], str], None]] = {
+    "POST /api/login": _model_login,
+    "POST /api/refresh": _model_refresh,
+    "GET /api/me/dashboard": _model_get(lambda fx, p: "/api/me/dashboard"),
+    "GET /api/me/profile": _model_get(lambda fx, p: "/api/me/profile"),
+    "GET /api/me/profile/avatar": _model_get(lambda fx, p: "/api/me/profile/avatar", (200, 404)),
+    "PATCH /api/me/profile": _model_write("PATCH", lambda fx, p: "/api/me/profile", {"name": "Model User"}),
+    "GET /api/me/courses": _model_get(lambda fx, p: "/api/me/courses"),
+    "GET /api/me/courses/{id}/avatar": _model_get(lambda fx, p: f"/api/me/courses/{fx.course(p.get('id'))}/avatar", (200, 404)),
+    "POST /api/me/courses": _model_create("course"),
+    "PATCH /api/me/courses/{id}": _model_write("PATCH", lambda fx, p: f"/api/me/courses/{fx.course(p.get('id'))}", {"title": "Model course (edited)"}),
+    "DELETE /api/me/courses/{id}": _model_delete("course"),
+    "GET /api/me/notes": _model_get(lambda fx, p: "/api/me/notes?top=10&skip=0"),
+    "POST /api/me/notes": _model_create("note"),
+    "GET /api/me/notes/{id}": _model_get(lambda fx, p: f"/api/me/notes/{fx.note(p.get('id'))}"),
+    "PATCH /api/me/notes/{id}": _model_write("PATCH", lambda fx, p: f"/api/me/notes/{fx.note(p.get('id'))}", {"title": "Model note (edited)"}),
+    "PUT /api/me/notes/{id}": _model_write("PUT", lambda fx, p: f"/api/me/notes/{fx.note(p.get('id'))}", {"title": "Model note (edited)"}),
+    "DELETE /api/me/notes/{id}": _model_delete("note"),
+    "POST /api/me/notes/{noteId}/files": _model_create("file"),
+    "DELETE /api/me/notes/{noteId}/files/{fileId}": _model_delete("file"),
+    "GET /api/me/notes/{noteId}/files/{fileId}/download": _model_get(
+        lambda fx, p: f"/api/me/notes/{fx.note(p.get('noteId'))}/files/{fx.file(p.get('noteId'), p.get('fileId'))}/download"),
+    "POST /api/me/notes/{noteId}/share/{courseId}": _model_write(
+        "POST", lambda fx, p: f"/api/me/notes/{fx.note(p.get('noteId'))}/share/{fx.course(p.get('courseId'))}", {}),
+    "DELETE /api/me/notes/{noteId}/share/{courseId}": _model_write(
+        "DELETE", lambda fx, p: f"/api/me/notes/{fx.note(p.get('noteId'))}/share/{fx.course(p.get('courseId'))}", {}),
+    "GET /api/me/tests": _model_get(lambda fx, p: "/api/me/tests"),
+    "POST /api/me/tests": _model_create("test"),
+    "GET /api/me/tests/{id}": _model_get(lambda fx, p: f"/api/me/tests/{fx.test(p.get('id'))}"),
+    "PUT /api/me/tests/{id}": _model_write("PUT", lambda fx, p: f"/api/me/tests/{fx.test(p.get('id'))}", {"title": "Model test (edited)"}),
+    "DELETE /api/me/tests/{id}": _model_delete("test"),
+    "GET /api/me/tests/{testId}/questions": _model_get(lambda fx, p: f"/api/me/tests/{fx.test(p.get('testId'))}/questions"),
+    "POST /api/me/tests/{testId}/questions": _model_create("question"),
+    "PUT /api/me/tests/{testId}/questions/{questionId}": _model_write(
+        "PUT", lambda fx, p: f"/api/me/tests/{fx.test(p.get('testId'))}/questions/{fx.question(p.get('testId'), p.get('questionId'))}",
+        {"question": "Model question (edited)?"}),
+    "DELETE /api/me/tests/{testId}/questions/{questionId}": _model_delete("question"),
+    "GET /api/me/tests/{testId}/questions/{questionId}/answers": _model_get(
+        lambda fx, p: f"/api/me/tests/{fx.test(p.get('testId'))}/questions/{fx.question(p.get('testId'), p.get('questionId'))}/answers"),
+    "GET /api/me/invitations-received": _model_get(lambda fx, p: "/api/me/invitations-received"),
+    "GET /api/me/invitations-sent": _model_get(lambda fx, p: "/api/me/invitations-sent"),
+    "GET /api/courses/{courseId}/notes": _model_get(lambda fx, p: f"/api/courses/{fx.course(p.get('courseId'))}/notes"),
+    "GET /api/courses/{courseId}/users": _model_get(lambda fx, p: f"/api/courses/{fx.course(p.get('courseId'))}/users"),
+    "GET /api/courses/{courseId}/tests": _model_get(lambda fx, p: f"/api/courses/{fx.course(p.get('courseId'))}/tests"),
+}
+
+class TrafficModelFlow:
+    """Przepływ load/soak "model": jedna sesja na wywołanie — wejście i przejścia wg łańcucha Markowa z modelu,
+    think time z rozkładu z logów (x think_scale); trasy spoza MODEL_ACTIONS są liczone i pomijane."""
+
+    def __init__(self, model: Dict[str, Any], think_scale: float = 1.0, max_session: int = 100):
+        self.think = model["think_ms"]
+        self.think_scale = think_scale
+        self.max_session = max_session
+        self.entry = (list(model["entry"]), list(itertools.accumulate(model["entry"].values())))
+        self.trans = {k: (list(v), list(itertools.accumulate(v.values()))) for k, v in model["transitions"].items()}
+        self.skipped: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __call__(self, t: E2ETester):
+        fx = getattr(self._local, "fx", None)
+        if fx is None or fx.t is not t:
+            fx = self._local.fx = SyntheticFixtures(t)
+        rng = random.Random()
+        keys, cum = self.entry
+        route = rng.choices(keys, cum_weights=cum)[0]
+        for _ in range(self.max_session):
+            action = MODEL_ACTIONS.get(route)
+            if action is None:
+                with self._lock: self.skipped[route] = self.skipped.get(route, 0) + 1
+            else:
+                action(t, fx, {}, f"MODEL: {route}")
+            nxt = self.trans.get(route)
+            if not nxt: break
+            route = rng.choices(nxt[0], cum_weights=nxt[1])[0]
+            if route == "__end__": break
+            if self.think_scale > 0:
+                time.sleep(sample_quantiles(self.think, rng) * self.think_scale / 1000.0)
+
+def load_traffic_model(path: str, think_scale: float, max_session: int) -> TrafficModelFlow:
+    """Rejestruje przepływ "model" z pliku TrafficModel.json (--traffic-model)."""
+    with open(path, "r", encoding="utf-8") as f:
+        model = json.load(f)
+    flow = TrafficModelFlow(model, think_scale, max_session)
+    LOAD_FLOWS["model"] = flow
+    return flow
+
+def print_traffic_model(model: Dict[str, Any], top: int = 25):
+    print(c(f"\n{BOX}\n{ICON_INFO} TRAFFIC MODEL ({model['requests']} requests over {model['span_s']:.0f}s, {model['rps']:.2f} req/s)\n{BOX}", Fore.YELLOW))
+    rows = [[r, v["count"], f"{v['share'] * 100:.2f}%", f"{v['rps']:.3f}", " ".join(f"{k}:{n}" for k, n in sorted(v["status"].items())),
+             v["p95_ms"] if v["p95_ms"] is not None else "-", "yes" if v["simulated"] else c("no", Fore.YELLOW)]
+            for r, v in list(model["routes"].items())[:top]]
+    print(tabulate(rows, headers=["Route", "Count", "Share", "req/s", "Status", "p95 ms (log)", "Simulated"], tablefmt="grid"))
+    s = model["sessions"]
+    q = lambda vals, i: f"{vals[i]:.1f}" if vals else "-"
+    print(f" {ICON_USER} Sessions:   {s['count']} ({s['rate_per_s']:.3f}/s), length p50 {q(s['length'], 10)} / p95 {q(s['length'], 19)}, "
+          f"duration p50 {q(s['duration_s'], 10)}s, concurrent ≈ {s['concurrency']:.1f}")
+    print(f" {ICON_CLOCK} Think time: p50 {q(model['think_ms'], 10)} ms, p95 {q(model['think_ms'], 19)} ms")
+    print(f" {ICON_INFO} Simulated:  {model['coverage'] * 100:.1f}% of requests map to harness actions")
+    print(c(BOX, Fore.YELLOW))
+
+def run_traffic_model_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb traffic-model: logi dostępowe -> trasy z routes/api.php -> TrafficModel.json dla przepływu "model"."""
+    paths = [p for p in _csv_list(args.access_log or "") if p]
+    if not paths:
+        print(c(f"{ICON_FAIL} Pass --access-log <files> (nginx combined or JSON lines, .gz allowed)", Fore.RED))
+        return 2
+    table = RouteTable(args.routes_file, ctx.me_prefix)
+    records, lines = read_access_logs(paths, table)
+    if not records:
+        print(c(f"{ICON_FAIL} No log lines matched routes from {args.routes_file} ({lines['lines']} lines read)", Fore.RED))
+        return 1
+    model = build_traffic_model(records, args.session_gap)
+    model["coverage"] = round(sum(v["count"] for v in model["routes"].values() if v["simulated"]) / model["requests"], 4)
+    model["source"] = {"logs": paths, "routes_file": args.routes_file, **lines}
+    print_traffic_model(model)
+    if lines["unmatched"]:
+        print(c(f"    {lines['unmatched']} line(s) outside routes/api.php, e.g. {', '.join(k for k, _ in lines['unmatched_top'][:3])}", Fore.YELLOW))
+    path = os.path.join(ctx.output_dir, MODEL_FILE)
+    write_json(path, model)
+    print(c(f"📄 Zapisano model ruchu: {path} (--mode load --traffic-model {path} --workers {max(1, math.ceil(model['sessions']['concurrency']))})", Fore.CYAN))
+    return 0
+
+# ───────────────────────── Replay logu dostępowego (kompresja czasu) ─────────────────────────
+
+REPLAY_FILE = "Replay.json"
+ROUTE_ID_KIND = {"notes": "note", "courses": "course", "tests": "test"} # {id} po segmencie -> rodzaj fixture
+FIXTURE_PARAMS = {"noteId": "note", "courseId": "course", "testId": "test"}
+
+@dataclass
+class ReplayUser:
+    email: str
+    pwd: str
+    token: str
+    fx: SyntheticFixtures = field(default_factory=SyntheticFixtures)
+
+def fixture_refs(route: str, params: Dict[str, str]) -> List[Tuple[str, Tuple[Any, ...]]]:
+    """Fixtures, których dotyka żądanie: ("note", (id z logu,)), ("question", (test, id)), ("file", (notatka, id))."""
+    segs = route.split(" ", 1)[1].strip("/").split("/")
+    refs: List[Tuple[str, Tuple[Any, ...]]] = []
+    for i, seg in enumerate(segs):
+        if not seg.startswith("{"): continue
+        name = seg[1:-1]
+        if name == "questionId": refs.append(("question", (params.get("testId"), params.get(name))))
+        elif name == "fileId": refs.append(("file", (params.get("noteId"), params.get(name))))
+        else:
+            kind = ROUTE_ID_KIND.get(segs[i - 1]) if name == "id" else FIXTURE_PARAMS.get(name)
+            if kind: refs.append((kind, (params.get(name),)))
+    return refs
+
+def _run_threads(ctx: TestContext, workers: int, items: List[Any], fn: Callable[[E2ETester, Any], None]):
+    """Wykonuje fn(tester, item) dla wszystkich elementów w `workers` wątkach (każdy z własnym kontekstem)."""
+    queue: Deque[Any] = deque(items)
+    lock = threading.Lock()
+
+    def _work():
+        t = E2ETester(fork_context(ctx))
+        while True:
+            with lock:
+                if not queue: return
+                item = queue.popleft()
+            fn(t, item)
+
+    threads = [threading.Thread(target=_work, daemon=True) for _ in range(max(1, min(workers, len(items))))]
+    for th in threads: th.start()
+    for th in threads: th.join()
+
+def _parse_when(spec: Optional[str]) -> Optional[float]:
+    if not spec: return None
+    try:
+        return float(spec)
+    except ValueError:
+        ts = _log_time(spec)
+        assert ts is not None, f"Cannot parse time {spec!r} (epoch, ISO 8601 or nginx time)"
+        return ts
+
+def run_replay_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb replay: żądania z logu w oryginalnych odstępach (÷ --speedup) na syntetycznych użytkownikach i fixtures;
+    ID z logu są podmieniane przez tabelę mapowania, opóźnienia porównywane per trasa z czasami z logu."""
+    paths = [p for p in _csv_list(args.access_log or "") if p]
+    if not paths:
+        print(c(f"{ICON_FAIL} Pass --access-log <files> (nginx combined or JSON lines, .gz allowed)", Fore.RED))
+        return 2
+    records, lines = read_access_logs(paths, RouteTable(args.routes_file, ctx.me_prefix))
+    t_from, t_to = _parse_when(args.replay_from), _parse_when(args.replay_to)
+    records = [r for r in records if (t_from is None or r["ts"] >= t_from) and (t_to is None or r["ts"] <= t_to)]
+    if not records:
+        print(c(f"{ICON_FAIL} No matched requests in the selected window ({lines['lines']} lines read)", Fore.RED))
+        return 1
+    skipped: Dict[str, int] = {}
+    for r in records:
+        if r["route"] not in MODEL_ACTIONS: skipped[r["route"]] = skipped.get(r["route"], 0) + 1
+    plan = [r for r in records if r["route"] in MODEL_ACTIONS]
+    clients = list(dict.fromkeys(r["client"] for r in plan))
+    n_users = max(1, min(len(clients), args.replay_users))
+    slot = {cl: i % n_users for i, cl in enumerate(clients)} # Klienci z logu rozłożeni na użytkowników syntetycznych
+    ts0 = records[0]["ts"]
+    span = records[-1]["ts"] - ts0
+    speed = args.speedup
+    print(c(f"\n{ICON_INFO} Replay: {len(plan)} requests ({sum(skipped.values())} not simulated) from {len(clients)} clients "
+            f"on {n_users} synthetic users, log span {span:.0f}s at x{speed:g} -> {span / speed if speed > 0 else 0:.0f}s, "
+            f"{args.workers} workers @ {ctx.base_url}", Fore.WHITE))
+
+    ctx.record_endpoints = False
+    users: List[Optional[ReplayUser]] = [None] * n_users
+    refs: Dict[int, Dict[Tuple[str, Tuple[Any, ...]], None]] = {}
+    for r in plan:
+        refs.setdefault(slot[r["client"]], {}).update(dict.fromkeys(fixture_refs(r["route"], r["params"])))
+
+    def _setup(t: E2ETester, n: int):
+        email, pwd, token = t._setup_register_and_login(f"Replay{n}", f"replay{n}")
+        u = users[n] = ReplayUser(email, pwd, token)
+        t.ctx.emailOwner, t.ctx.pwdOwner, t.ctx.tokenOwner = email, pwd, token
+        u.fx.bind(t)
+        for kind, key in refs.get(n, {}): # Fixtures przed startem zegara — tworzenie nie zaburza osi czasu
+            getattr(u.fx, kind)(*key)
+
+    t_setup = time.time()
+    with muted_console():
+        _run_threads(ctx, args.workers, list(range(n_users)), _setup)
+    assert all(users), "Synthetic user setup failed"
+    print(c(f"    Setup: {n_users} users, {sum(len(u.fx.ids) for u in users)} fixtures mapped in {time.time() - t_setup:.1f}s", Fore.CYAN))
+
+    queue: Deque[Dict[str, Any]] = deque(plan)
+    lock = threading.Lock()
+    stop = threading.Event()
+    results: List[Tuple[str, float, Optional[float], float, bool, Optional[str]]] = []
+    start = time.time() + 0.5
+
+    def _work():
+        t = E2ETester(fork_context(ctx))
+        while not stop.is_set():
+            with lock:
+                if not queue: return
+                rec = queue.popleft()
+            due = start + ((rec["ts"] - ts0) / speed if speed > 0 else 0.0)
+            if stop.wait(max(0.0, due - time.time())): return
+            lag = (time.time() - due) * 1000.0
+            u = users[slot[rec["client"]]]
+            t.ctx.emailOwner, t.ctx.pwdOwner = u.email, u.pwd
+            t.ctx.tokenOwner = t.ctx.tokens.token_for(t.ctx, u.email, u.pwd) if t.ctx.tokens is not None else u.token
+            u.fx.bind(t)
+            t0 = time.time()
+            err = None
+            try:
+                MODEL_ACTIONS[rec["route"]](t, u.fx, rec["params"], f"REPLAY: {rec['route']}")
+            except (AssertionError, KeyError, requests.RequestException) as e:
+                err = f"{type(e).__name__}: {e}"
+            with lock:
+                results.append((rec["route"], (time.time() - t0) * 1000.0, rec["ms"], lag, err is None, err))
+
+    threads = [threading.Thread(target=_work, name=f"replay-{n}", daemon=True) for n in range(max(1, args.workers))]
+    with muted_console():
+        for th in threads: th.start()
+        try:
+            for th in threads:
+                while th.is_alive(): th.join(timeout=0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for th in threads: th.join(timeout=ctx.timeout + 5)
+    wall = time.time() - start
+
+    routes: Dict[str, Dict[str, Any]] = {}
+    for route, ms, orig, lag, ok, err in results:
+        r = routes.setdefault(route, {"ms": [], "orig": [], "errors": 0, "sample_error": None})
+        r["ms"].append(ms)
+        if orig is not None: r["orig"].append(orig)
+        if not ok:
+            r["errors"] += 1; r["sample_error"] = r["sample_error"] or err
+    table = {}
+    for route, r in sorted(routes.items(), key=lambda kv: -len(kv[1]["ms"])):
+        p95, o95 = percentile(r["ms"], 95), percentile(r["orig"], 95) if r["orig"] else None
+        table[route] = {"count": len(r["ms"]), "errors": r["errors"], "p50_ms": round(percentile(r["ms"], 50), 1), "p95_ms": round(p95, 1),
+                        "log_p50_ms": round(percentile(r["orig"], 50), 1) if r["orig"] else None,
+                        "log_p95_ms": round(o95, 1) if o95 is not None else None,
+                        "p95_ratio": round(p95 / o95, 2) if o95 else None, "sample_error": r["sample_error"]}
+    lags = [x[3] for x in results]
+    summary = {"source": {"logs": paths, **lines, "from": t_from, "to": t_to}, "speedup": speed, "workers": args.workers,
+               "synthetic_users": n_users, "clients": len(clients), "scheduled": len(plan), "executed": len(results),
+               "errors": sum(1 for x in results if not x[4]), "not_simulated": skipped,
+               "log_span_s": round(span, 1), "wall_s": round(wall, 1),
+               # Spóźnienie startu względem osi czasu: duże wartości = harness (za mało --workers) nie nadążał
+               "lag_ms": {"p50": round(percentile(lags, 50), 1), "p95": round(percentile(lags, 95), 1), "max": round(max(lags, default=0.0), 1)},
+               "routes": table}
+
+    print(c(f"\n{BOX}\n{ICON_INFO} REPLAY SUMMARY (x{speed:g}: {summary['log_span_s']:.0f}s of log in {summary['wall_s']:.0f}s)\n{BOX}", Fore.YELLOW))
+    rows = [[r, v["count"], v["errors"], v["p50_ms"], v["p95_ms"], v["log_p50_ms"] if v["log_p50_ms"] is not None else "-",
+             v["log_p95_ms"] if v["log_p95_ms"] is not None else "-",
+             c(f"{v['p95_ratio']:.2f}x", Fore.RED if v["p95_ratio"] > 1.5 else Fore.GREEN) if v["p95_ratio"] else "-"]
+            for r, v in table.items()]
+    print(tabulate(rows, headers=["Route", "Count", "Err", "p50 ms", "p95 ms", "log p50", "log p95", "p95 vs log"], tablefmt="grid"))
+    print(f" {ICON_LIST} Executed:  {summary['executed']}/{summary['scheduled']}, errors {summary['errors']}, not simulated {sum(skipped.values())}")
+    print(f" {ICON_CLOCK} Start lag: p50 {summary['lag_ms']['p50']:.0f} ms, p95 {summary['lag_ms']['p95']:.0f} ms, max {summary['lag_ms']['max']:.0f} ms")
+    if summary["lag_ms"]["p95"] > 250:
+        print(c("    Replay fell behind the log timeline — raise --workers or lower --speedup", Fore.YELLOW))
+    print(c(BOX, Fore.YELLOW))
+    path = os.path.join(ctx.output_dir, REPLAY_FILE)
+    write_json(path, summary)
+    print(c(f"📄 Zapisano raport repleya: {path}", Fore.CYAN))
+    return 1 if summary["errors"] else 0
+
+class LoadRunner:
+    """Uruchamia przepływy z LOAD_FLOWS w N wątkach przez zadany czas; metryki trafiają do ctx.stats."""
+
+    def __init__(self, ctx: TestContext, workers: int, duration_s: float, flows: List[str]):
+        assert ctx.stats is not None, "LoadRunner requires ctx.stats"
+        self.ctx = ctx
+        self.workers = max(1, workers)
+        self.duration_s = duration_s
+        self.flows = [(name, LOAD_FLOWS[name]) for name in flows]
+        self.weights = [LOAD_FLOW_WEIGHTS.get(name, 1.0) for name in flows]
+        self.stop_event = threading.Event()
+        self.deadline = 0.0
+
+    def run(self):
+        """Startuje wątki i czeka na ich zakończenie (Ctrl-C zatrzymuje przebieg łagodnie)."""
+        self.deadline = time.time() + self.duration_s
+        threads = [threading.Thread(target=self._worker, args=(n,), name=f"load-{n}", daemon=True)
+                   for n in range(1, self.workers + 1)]
+        for th in threads: th.start()
+        try:
+            for th in threads:
+                while th.is_alive():
+                    th.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            for th in threads: th.join(timeout=self.ctx.timeout + 5)
+
+    def _running(self) -> bool:
+        return not self.stop_event.is_set() and time.time() < self.deadline
+
+    def _worker(self, n: int):
+        name = f"worker-{n:03d}"
+        stats = self.ctx.stats
+        stats.worker(name)
+        t = E2ETester(fork_context(self.ctx))
+        rng = random.Random(n)
+        try:
+            t.ctx.emailOwner, t.ctx.pwdOwner, t.ctx.tokenOwner = t._setup_register_and_login(f"Load{n}", f"load{n}")
+        except Exception as e:
+            stats.worker_update(name, state="failed", ok=False, error=f"setup: {e}")
+            return
+        stats.worker_update(name, state="running")
+        try:
+            while self._running():
+                flow_name, flow = rng.choices(self.flows, self.weights)[0]
+                try:
+                    refresh_actor_tokens(t.ctx)
+                    flow(t)
+                    stats.worker_update(name, ok=True)
+                except Exception as e:
+                    stats.worker_update(name, ok=False, error=f"{flow_name}: {type(e).__name__}: {e}")
+        finally:
+            # Konta robocze usuwamy od razu, aby nie zostawiać śmieci na środowisku
+            for token in (t.ctx.tokenB, t.ctx.tokenOwner):
+                if not token: continue
+                try:
+                    http_delete(t.ctx, "LOAD: Delete worker profile", me(t.ctx, "/profile"), auth_headers(token))
+                except Exception:
+                    pass
+            stats.worker_update(name, state="stopped")
+
+def print_load_summary(snap: Dict[str, Any]):
+    """Drukuje końcowe podsumowanie trybu load (tabela per trasa + stan wątków)."""
+    print(c(f"\n{BOX}\n{ICON_INFO} LOAD SUMMARY\n{BOX}", Fore.YELLOW))
+    rows = [[r, v["count"], v["errors"], f"{v['p50_ms']:.1f}", f"{v['p99_ms']:.1f}"]
+            for r, v in sorted(snap["routes"].items(), key=lambda kv: -kv[1]["count"])]
+    print(tabulate(rows, headers=["Route", "Count", "Err", "p50 ms", "p99 ms"], tablefmt="grid"))
+    iterations = sum(w.iterations for w in snap["workers"])
+    failures = sum(w.failures for w in snap["workers"])
+    print(f" {ICON_CLOCK} Duration:        {snap['elapsed_s']:.1f}s")
+    print(f" {ICON_LIST} Requests:        {snap['total']} ({snap['rps_overall']:.1f} req/s)")
+    print(f" {ICON_FAIL} Errors (5xx/net): {snap['errors']} ({snap['error_rate'] * 100:.2f}%)")
+    print(f" {ICON_USER} Flow iterations: {iterations}, failed: {failures}")
+    if "token_cache" in snap:
+        tc = snap["token_cache"]
+        print(f" {ICON_LOCK} Token cache:     hits {tc['hits']}, logins {tc['logins']}, refreshes {tc['refreshes']} (failed {tc['refresh_failures']})")
+    if "model_skipped" in snap:
+        skipped = snap["model_skipped"]
+        print(f" {ICON_INFO} Model routes not simulated: {sum(skipped.values())} ({', '.join(f'{k} x{v}' for k, v in list(skipped.items())[:3])})")
+    print(c(BOX, Fore.YELLOW))
+
+def parse_flows(spec: str) -> Optional[List[str]]:
+    """Parsuje listę przepływów z CLI; None (z komunikatem) gdy lista pusta lub zawiera nieznane nazwy."""
+    flows = [f.strip() for f in spec.split(",") if f.strip()]
+    unknown = [f for f in flows if f not in LOAD_FLOWS]
+    if unknown or not flows:
+        print(c(f"Unknown load flows: {', '.join(unknown) or '(none)'}; available: {', '.join(LOAD_FLOWS)}", Fore.RED))
+        return None
+    return flows
+
+def run_worker_pool(ctx: TestContext, runner: LoadRunner, args: argparse.Namespace,
+                    title: str, background: Optional[List[Any]] = None) -> Dict[str, Any]:
+    """Uruchamia runner przy wyciszonej konsoli z dashboardem i wątkami tła (start()/stop()); zwraca snapshot."""
+    background = list(background or [])
+    with muted_console() as out:
+        if not args.no_dashboard:
+            background.append(LiveDashboard(ctx.stats, out, args.dashboard_interval, title=title))
+        for b in background: b.start()
+        try:
+            runner.run()
+        finally:
+            for b in reversed(background): b.stop()
+    snap = ctx.stats.snapshot()
+    if ctx.tokens is not None: snap["token_cache"] = ctx.tokens.counters()
+    model = LOAD_FLOWS.get("model")
+    if isinstance(model, TrafficModelFlow) and model.skipped:
+        snap["model_skipped"] = dict(sorted(model.skipped.items(), key=lambda kv: -kv[1]))
+    return snap
+
+def run_load_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb load: wątki robocze + LiveDashboard, bez per-żądaniowego drukowania. Zwraca kod wyjścia."""
+    flows = parse_flows(args.flows or ",".join(DEFAULT_LOAD_FLOWS))
+    if flows is None:
+        return 2
+    ctx.stats = LiveStats()
+    ctx.record_endpoints = False
+    runner = LoadRunner(ctx, args.workers, args.duration, flows)
+    print(c(f"\n{ICON_INFO} Load run: {runner.workers} workers x {args.duration:.0f}s, flows={','.join(flows)} @ {ctx.base_url}", Fore.WHITE))
+
+    snap = run_worker_pool(ctx, runner, args, "LOAD")
+    print_load_summary(snap)
+    write_json(os.path.join(ctx.output_dir, "LoadSummary.json"), snap)
+    print(c(f"📄 Zapisano podsumowanie: {os.path.join(ctx.output_dir, 'LoadSummary.json')}", Fore.CYAN))
+    failures = sum(w.failures for w in snap["workers"])
+    return 1 if snap["errors"] or failures else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Tryb soak (długie przebiegi, wycieki zasobów) ===
+# ──────────────────────────────────────────────────────────────────────
+
+SOAK_CSV_FIELDS = ["bucket", "t_start", "elapsed_s", "requests", "errors", "error_rate", "rps",
+                   "p50_ms", "p95_ms", "p99_ms", "probe_ms", "flow_iterations", "flow_failures",
+                   "rss_kb", "py_heap_kb", "py_heap_peak_kb"]
+
+def harness_rss_kb() -> int:
+    """Bieżące RSS procesu harnessu w KB (/proc na Linuksie; inaczej szczyt z resource.getrusage, 0 na Windows)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # macOS raportuje bajty
+
+def linear_slope(xs: List[float], ys: List[float]) -> float:
+    """Nachylenie prostej najmniejszych kwadratów (0.0 dla < 2 punktów lub stałego x)."""
+    n = len(xs)
+    if n < 2: return 0.0
+    mx, my = sum(xs) / n, sum(ys) / n
+    den = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / den if den else 0.0
+
+class SoakSampler:
+    """Co `bucket_s` sekund zamyka kubełek metryk i dopisuje go do SoakMetrics.jsonl / SoakMetrics.csv.
+
+    Oprócz opóźnień obciążenia mierzy sondę (stałe zapytanie na osobnym koncie, poza LiveStats)
+    oraz własne RSS i — opcjonalnie — stertę Pythona przez tracemalloc."""
+
+    def __init__(self, ctx: TestContext, bucket_s: float, probe: Optional[E2ETester] = None, use_tracemalloc: bool = False):
+        self.ctx = ctx
+        self.bucket_s = max(1.0, bucket_s)
+        self.probe = probe
+        self.use_tracemalloc = use_tracemalloc
+        self.buckets: List[Dict[str, Any]] = []
+        self.jsonl_path = os.path.join(ctx.output_dir, "SoakMetrics.jsonl")
+        self.csv_path = os.path.join(ctx.output_dir, "SoakMetrics.csv")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="soak-sampler", daemon=True)
+        self._prev_iter = (0, 0)
+
+    def start(self):
+        if self.use_tracemalloc:
+            import tracemalloc
+            tracemalloc.start()
+        with open(self.csv_path, "w", encoding="utf-8") as f:
+            f.write(",".join(SOAK_CSV_FIELDS) + "\n")
+        self.ctx.stats.bucketing = True
+        self.ctx.stats.drain_bucket() # Zaczynamy pierwszy kubełek od teraz
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=self.bucket_s + self.ctx.timeout)
+        self.sample() # Domknij ostatni (niepełny) kubełek
+        if self.use_tracemalloc:
+            import tracemalloc
+            tracemalloc.stop()
+
+    def _loop(self):
+        while not self._stop.wait(self.bucket_s):
+            self.sample()
+
+    def _probe_ms(self) -> Optional[float]:
+        if self.probe is None: return None
+        refresh_actor_tokens(self.probe.ctx)
+        t0 = time.time()
+        r = http_get(self.probe.ctx, "SOAK: Probe dashboard stats", me(self.probe.ctx, "/dashboard?include=stats"),
+                     auth_headers(self.probe.ctx.tokenOwner))
+        return (time.time() - t0) * 1000.0 if r.status_code == 200 else None
+
+    def sample(self) -> Dict[str, Any]:
+        stats = self.ctx.stats
+        b_start, b_end, by_route, errors = stats.drain_bucket()
+        all_ms = [ms for lst in by_route.values() for ms in lst]
+        snap_workers = stats.snapshot()["workers"]
+        it = (sum(w.iterations for w in snap_workers), sum(w.failures for w in snap_workers))
+        d_it, d_fail = it[0] - self._prev_iter[0], it[1] - self._prev_iter[1]
+        self._prev_iter = it
+        heap_kb = heap_peak_kb = None
+        if self.use_tracemalloc:
+            import tracemalloc
+            cur, peak = tracemalloc.get_traced_memory()
+            heap_kb, heap_peak_kb = cur // 1024, peak // 1024
+        span = max(b_end - b_start, 1e-6)
+        rec = {
+            "bucket": len(self.buckets) + 1,
+            "t_start": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(b_start)),
+            "elapsed_s": round(b_end - stats.started_at, 1),
+            "requests": len(all_ms),
+            "errors": errors,
+            "error_rate": round(errors / len(all_ms), 5) if all_ms else 0.0,
+            "rps": round(len(all_ms) / span, 2),
+            "p50_ms": round(percentile(all_ms, 50), 1),
+            "p95_ms": round(percentile(all_ms, 95), 1),
+            "p99_ms": round(percentile(all_ms, 99), 1),
+            "probe_ms": None,
+            "flow_iterations": d_it,
+            "flow_failures": d_fail,
+            "rss_kb": harness_rss_kb(),
+            "py_heap_kb": heap_kb,
+            "py_heap_peak_kb": heap_peak_kb,
+            "routes": {r: {"count": len(v), "p50_ms": round(percentile(v, 50), 1), "p99_ms": round(percentile(v, 99), 1)}
+                       for r, v in by_route.items()},
+        }
+        try:
+            ms = self._probe_ms()
+            rec["probe_ms"] = round(ms, 1) if ms is not None else None
+        except Exception:
+            pass # Sonda jest pomocnicza — brak wyniku zapisujemy jako null
+        self.buckets.append(rec)
+        # Dopisywanie na bieżąco: po awarii po kilku godzinach dane nadal są na dysku
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        with open(self.csv_path, "a", encoding="utf-8") as f:
+            f.write(",".join("" if rec[k] is None else str(rec[k]) for k in SOAK_CSV_FIELDS) + "\n")
+        return rec
+
+def analyze_soak(buckets: List[Dict[str, Any]], warmup_buckets: int = 1) -> Dict[str, Any]:
+    """Liczy trendy (na godzinę) z kubełków; pierwszy kubełek (rozgrzewka) jest pomijany, jeśli są kolejne."""
+    usable = [b for b in buckets if b["requests"] > 0]
+    if len(usable) > warmup_buckets + 1:
+        usable = usable[warmup_buckets:]
+    hours = [b["elapsed_s"] / 3600.0 for b in usable]
+
+    def _slope(key: str, scale: float = 1.0) -> Optional[float]:
+        pts = [(h, b[key]) for h, b in zip(hours, usable) if b.get(key) is not None]
+        return linear_slope([p[0] for p in pts], [p[1] * scale for p in pts]) if len(pts) >= 2 else None
+
+    return {
+        "buckets": len(buckets),
+        "buckets_used": len(usable),
+        "p50_slope_ms_per_h": _slope("p50_ms"),
+        "p99_slope_ms_per_h": _slope("p99_ms"),
+        "probe_slope_ms_per_h": _slope("probe_ms"),
+        "error_rate_slope_per_h": _slope("error_rate"),
+        "rss_slope_mb_per_h": _slope("rss_kb", 1 / 1024.0),
+        "py_heap_slope_mb_per_h": _slope("py_heap_kb", 1 / 1024.0),
+        "rss_first_kb": usable[0]["rss_kb"] if usable else None,
+        "rss_last_kb": usable[-1]["rss_kb"] if usable else None,
+    }
+
+def run_soak_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb soak: przepływy NOTE/COURSE w pętli przez --duration, kubełki metryk i trendy opóźnień/RSS."""
+    flows = parse_flows(args.flows or ",".join(DEFAULT_SOAK_FLOWS))
+    if flows is None:
+        return 2
+    ctx.stats = LiveStats()
+    ctx.record_endpoints = False
+    runner = LoadRunner(ctx, args.workers, args.duration, flows)
+    print(c(f"\n{ICON_INFO} Soak run: {runner.workers} workers x {args.duration / 3600.0:.2f}h, bucket={args.soak_bucket:.0f}s, "
+            f"flows={','.join(flows)} @ {ctx.base_url}", Fore.WHITE))
+
+    # Sonda: osobne konto bez metryk LiveStats (stałe dane => dryf opóźnienia to degradacja serwera)
+    probe_ctx = fork_context(ctx)
+    probe_ctx.stats = None
+    probe = E2ETester(probe_ctx)
+    try:
+        with muted_console():
+            probe_ctx.emailOwner, probe_ctx.pwdOwner, probe_ctx.tokenOwner = probe._setup_register_and_login("SoakProbe", "soakprobe")
+    except AssertionError as e:
+        print(c(f"Warning: soak probe account unavailable ({e}); probe_ms will be empty.", Fore.YELLOW))
+        probe = None
+
+    sampler = SoakSampler(ctx, args.soak_bucket, probe=probe, use_tracemalloc=args.tracemalloc)
+    try:
+        snap = run_worker_pool(ctx, runner, args, "SOAK", background=[sampler])
+    finally:
+        if probe is not None:
+            http_delete(probe_ctx, "SOAK: Delete probe profile", me(probe_ctx, "/profile"), auth_headers(probe_ctx.tokenOwner))
+
+    print_load_summary(snap)
+    trend = analyze_soak(sampler.buckets)
+    rows = [[k, "-" if v is None else (f"{v:.3f}" if isinstance(v, float) else v)] for k, v in trend.items()]
+    print(tabulate(rows, headers=["Soak trend", "Value"], tablefmt="grid"))
+
+    violations = []
+    if args.max_latency_slope is not None and (trend["p99_slope_ms_per_h"] or 0.0) > args.max_latency_slope:
+        violations.append(f"p99 latency slope {trend['p99_slope_ms_per_h']:.2f} ms/h > {args.max_latency_slope}")
+    if args.max_rss_slope is not None and (trend["rss_slope_mb_per_h"] or 0.0) > args.max_rss_slope:
+        violations.append(f"harness RSS slope {trend['rss_slope_mb_per_h']:.2f} MB/h > {args.max_rss_slope}")
+    for v in violations:
+        print(c(f"{ICON_FAIL} {v}", Fore.RED))
+
+    write_json(os.path.join(ctx.output_dir, "SoakSummary.json"), {"summary": snap, "trend": trend, "violations": violations})
+    print(c(f"📄 Zapisano metryki soak: {sampler.jsonl_path}, {sampler.csv_path}", Fore.CYAN))
+    failures = sum(w.failures for w in snap["workers"])
+    return 1 if violations or snap["errors"] or failures else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Seeder danych (tryb seed) ===
+# ──────────────────────────────────────────────────────────────────────
+
+# Limity API (TestController): max 20 pytań na test, max 4 odpowiedzi na pytanie
+SEED_MAX_QUESTIONS = 20
+SEED_MAX_ANSWERS = 4
+
+def parse_count_dist(spec: str) -> Tuple[int, int, str]:
+    """Parsuje rozkład liczności z CLI: 'N' | 'lo-hi' (jednostajny) | 'lo-hi:pareto' (długi ogon)."""
+    body, _, kind = spec.partition(":")
+    kind = kind.strip() or "uniform"
+    assert kind in ("uniform", "pareto"), f"Unknown distribution '{kind}' in '{spec}' (use uniform or pareto)"
+    lo_s, _, hi_s = body.partition("-")
+    lo = int(lo_s)
+    hi = int(hi_s) if hi_s else lo
+    assert 0 <= lo <= hi, f"Invalid range in '{spec}'"
+    return lo, hi, kind
+
+def sample_count(rng: random.Random, dist: Tuple[int, int, str]) -> int:
+    """Losuje liczność z rozkładu; 'pareto' daje wielu małych i nielicznych bardzo dużych (jak realni użytkownicy)."""
+    lo, hi, kind = dist
+    if hi == lo: return lo
+    if kind == "pareto":
+        return lo + min(hi - lo, int((rng.paretovariate(1.2) - 1.0) * (hi - lo) / 5.0))
+    return rng.randint(lo, hi)
+
+class FixtureSeeder:
+    """Buduje duży zbiór danych przez publiczne API (tymi samymi helperami co E2E) i zapisuje manifest.
+
+    Fazy: users -> courses -> invitations -> notes (+pliki, udostępnienia) -> tests (+pytania, odpowiedzi).
+    Plan jest losowany z --seed-random przed startem (powtarzalny), fazy wykonują N wątków z osobnymi sesjami."""
+
+    def __init__(self, ctx: TestContext, args: argparse.Namespace):
+        assert ctx.stats is not None, "FixtureSeeder requires ctx.stats"
+        self.ctx = ctx
+        self.workers = max(1, args.workers)
+        self.rng = random.Random(args.seed_random)
+        self.n_users = max(1, args.seed_users)
+        self.dist = {k: parse_count_dist(getattr(args, f"seed_{k}"))
+                     for k in ("courses", "members", "notes", "note_files", "tests", "questions", "answers")}
+        self.share_ratio = args.seed_share
+        self.pending_ratio = args.seed_pending
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.testers = [E2ETester(fork_context(ctx)) for _ in range(self.workers)]
+        self.manifest: Dict[str, Any] = {
+            "kind": "seed",
+            "base_url": ctx.base_url,
+            "me_prefix": ctx.me_prefix,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "random_seed": args.seed_random,
+            "config": {"users": self.n_users, "share_ratio": self.share_ratio, "pending_ratio": self.pending_ratio,
+                       **{k: getattr(args, f"seed_{k}") for k in self.dist}},
+            "users": [], "courses": [], "notes": [], "tests": [],
+            "failures": [],
+        }
+
+    # --- Wykonanie równoległe ---
+    def _parallel(self, phase: str, items: List[Any], fn: Callable[[E2ETester, Any], None]):
+        """Wykonuje fn(tester, item) dla wszystkich elementów w N wątkach; błędy trafiają do manifestu, nie przerywają fazy."""
+        pending: Deque[Any] = deque(items)
+
+        def _work(n: int):
+            name = f"seed-{n + 1:03d}"
+            self.ctx.stats.worker_update(name, state=phase)
+            while not self.stop_event.is_set():
+                with self.lock:
+                    if not pending: break
+                    item = pending.popleft()
+                try:
+                    fn(self.testers[n], item)
+                    self.ctx.stats.worker_update(name, ok=True)
+                except Exception as e:
+                    err = f"{phase}: {type(e).__name__}: {e}"
+                    self.ctx.stats.worker_update(name, ok=False, error=err)
+                    with self.lock:
+                        if len(self.manifest["failures"]) < 500: self.manifest["failures"].append(err)
+            self.ctx.stats.worker_update(name, state="idle")
+
+        threads = [threading.Thread(target=_work, args=(n,), name=f"seed-{n + 1}", daemon=True) for n in range(self.workers)]
+        for th in threads: th.start()
+        for th in threads:
+            while th.is_alive():
+                th.join(timeout=0.5)
+
+    def _append(self, key: str, rec: Dict[str, Any]):
+        with self.lock:
+            self.manifest[key].append(rec)
+
+    # --- Fazy ---
+    def _seed_user(self, t: E2ETester, idx: int):
+        email, pwd, token = t._setup_register_and_login(f"Seed{idx}", "seed")
+        self._append("users", {"idx": idx, "email": email, "password": pwd, "token": token})
+
+    def _seed_course(self, t: E2ETester, item: Tuple[int, int, str]):
+        owner, k, ctype = item
+        cid = self._authed(t, owner, lambda tok: t._create_course("SEED: Create course", tok, f"Seed course {owner}-{k}", ctype))
+        self._append("courses", {"id": cid, "owner": owner, "type": ctype, "members": [], "pending": []})
+
+    def _seed_invite(self, t: E2ETester, item: Tuple[Dict[str, Any], int, bool]):
+        course, member, accept = item
+        u = self._user(member)
+        self._authed(t, course["owner"], lambda tok: t._invite_user("SEED: Invite member", tok, u["email"], "member", course["id"]))
+        if accept:
+            self._authed(t, member, lambda tok: t._accept_invite("SEED: Accept invite", tok, course["id"]))
+        with self.lock:
+            course["members" if accept else "pending"].append(member)
+
+    def _seed_note(self, t: E2ETester, item: Tuple[int, int, int, Optional[int]]):
+        owner, k, extra_files, share_to = item
+        note_id = self._authed(t, owner, lambda tok: t._create_note("SEED: Create note", tok, f"Seed note {owner}-{k}"))
+        rec = {"id": note_id, "owner": owner, "files": 1, "shared_to": None}
+        self._append("notes", rec)
+
+        def _add_file(tok: str, i: int):
+            r = http_post_multipart(t.ctx, "SEED: Add note file", me(t.ctx, f"/notes/{note_id}/files"), data={},
+                                    files={"file": avatar_file(t.ctx, f"seed_{i}")}, headers=auth_headers(tok))
+            assert r.status_code in (200, 201), f"Add note file: expected 200/201, got {r.status_code}"
+
+        for i in range(extra_files):
+            self._authed(t, owner, lambda tok: _add_file(tok, i))
+            rec["files"] += 1
+        if share_to:
+            self._authed(t, owner, lambda tok: t._share_note("SEED: Share note", tok, note_id, share_to))
+            rec["shared_to"] = share_to
+
+    def _seed_test(self, t: E2ETester, item: Tuple[int, int, int, int, Optional[int]]):
+        owner, k, n_questions, n_answers, share_to = item
+
+        def _post(title: str, path: str, payload: Dict[str, Any], expected: int) -> Dict[str, Any]:
+            def _call(tok: str) -> Dict[str, Any]:
+                r = http_post_json(t.ctx, title, me(t.ctx, path), payload, auth_headers(tok))
+                assert r.status_code == expected, f"{title.split(': ', 1)[1]}: expected {expected}, got {r.status_code}"
+                return must_json(r)
+            return self._authed(t, owner, _call)
+
+        body = _post("SEED: Create test", "/tests",
+                     {"title": f"Seed test {owner}-{k}", "description": "Seeded test", "status": "private"}, 201)
+        test_id = body.get("test", body).get("id")
+        assert test_id, f"Test ID not found in response: {trim(body)}"
+        test_id = int(test_id)
+        rec = {"id": test_id, "owner": owner, "questions": 0, "shared_to": None}
+        self._append("tests", rec)
+        for q in range(n_questions):
+            body = _post("SEED: Add question", f"/tests/{test_id}/questions", {"question": f"Seed question {q + 1}?"}, 201)
+            q_id = body.get("question", body).get("id")
+            rec["questions"] += 1
+            for a in range(n_answers):
+                _post("SEED: Add answer", f"/tests/{test_id}/questions/{q_id}/answers",
+                      {"answer": f"Answer {a + 1}", "is_correct": a == 0}, 201)
+        if share_to:
+            _post("SEED: Share test", f"/tests/{test_id}/share", {"course_id": share_to}, 200)
+            rec["shared_to"] = share_to
+
+    # --- Tokeny ---
+    def _token(self, t: E2ETester, idx: int, relogin: bool = False) -> str:
+        """Ważny token użytkownika seeda: przez ctx.tokens (odświeżany przed 'exp'), a z relogin — nowy login."""
+        u = self._user(idx)
+        if relogin:
+            if t.ctx.tokens is not None: t.ctx.tokens.forget(u["email"])
+            u["token"] = manifest_login(t, {**u, "token": None})
+        elif t.ctx.tokens is not None:
+            u["token"] = manifest_login(t, u)
+        return u["token"] # Manifest dostaje najświeższy token
+
+    def _authed(self, t: E2ETester, idx: int, fn: Callable[[str], Any]) -> Any:
+        """Wykonuje pojedyncze żądanie fn(token); po 401 (JWT wygasł w trakcie długiego seeda) loguje ponownie i powtarza raz."""
+        try:
+            return fn(self._token(t, idx))
+        except AssertionError as e:
+            if not re.search(r"\b401\b", str(e)): raise
+        return fn(self._token(t, idx, relogin=True))
+
+    def _user(self, idx: int) -> Dict[str, Any]:
+        return self.users_by_idx[idx]
+
+    def _share_target(self, user_idx: int) -> Optional[int]:
+        """Losowy kurs (własny lub zaakceptowane członkostwo) albo None zgodnie z --seed-share."""
+        options = self.courses_of.get(user_idx) or []
+        if not options or self.rng.random() >= self.share_ratio: return None
+        return self.rng.choice(options)
+
+    def run(self):
+        """Wykonuje fazy po kolei; Ctrl-C kończy bieżącą fazę (manifest zawiera to, co powstało)."""
+        try:
+            self._parallel("users", list(range(self.n_users)), self._seed_user)
+            self.users_by_idx = {u["idx"]: u for u in self.manifest["users"]}
+            alive = sorted(self.users_by_idx)
+
+            plan_courses = [(u, k, self.rng.choice(("private", "public")))
+                            for u in alive for k in range(sample_count(self.rng, self.dist["courses"]))]
+            self._parallel("courses", plan_courses, self._seed_course)
+
+            plan_invites = []
+            for course in self.manifest["courses"]:
+                others = [u for u in alive if u != course["owner"]]
+                k = min(len(others), sample_count(self.rng, self.dist["members"]))
+                plan_invites += [(course, m, self.rng.random() >= self.pending_ratio) for m in self.rng.sample(others, k)]
+            self._parallel("invitations", plan_invites, self._seed_invite)
+
+            self.courses_of: Dict[int, List[int]] = {}
+            for course in self.manifest["courses"]:
+                for u in [course["owner"]] + course["members"]:
+                    self.courses_of.setdefault(u, []).append(course["id"])
+
+            plan_notes = [(u, k, sample_count(self.rng, self.dist["note_files"]), self._share_target(u))
+                          for u in alive for k in range(sample_count(self.rng, self.dist["notes"]))]
+            self._parallel("notes", plan_notes, self._seed_note)
+
+            plan_tests = [(u, k, min(SEED_MAX_QUESTIONS, sample_count(self.rng, self.dist["questions"])),
+                           min(SEED_MAX_ANSWERS, sample_count(self.rng, self.dist["answers"])), self._share_target(u))
+                          for u in alive for k in range(sample_count(self.rng, self.dist["tests"]))]
+            self._parallel("tests", plan_tests, self._seed_test)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+
+    def counts(self) -> Dict[str, int]:
+        m = self.manifest
+        return {
+            "users": len(m["users"]),
+            "courses": len(m["courses"]),
+            "memberships": sum(len(c["members"]) for c in m["courses"]),
+            "pending_invitations": sum(len(c["pending"]) for c in m["courses"]),
+            "notes": len(m["notes"]),
+            "note_files": sum(n["files"] for n in m["notes"]),
+            "shared_notes": sum(1 for n in m["notes"] if n["shared_to"]),
+            "tests": len(m["tests"]),
+            "questions": sum(t["questions"] for t in m["tests"]),
+            "shared_tests": sum(1 for t in m["tests"] if t["shared_to"]),
+            "failures": len(m["failures"]),
+        }
+
+def run_seed_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb seed: buduje dane przez API i zapisuje SeedManifest.json (ID + dane logowania do ponownego użycia)."""
+    ctx.stats = LiveStats()
+    ctx.record_endpoints = False
+    try:
+        seeder = FixtureSeeder(ctx, args)
+    except (AssertionError, ValueError) as e:
+        print(c(f"Invalid seed configuration: {e}", Fore.RED))
+        return 2
+    print(c(f"\n{ICON_INFO} Seeding {seeder.n_users} users with {seeder.workers} workers @ {ctx.base_url} "
+            f"(random seed {args.seed_random})", Fore.WHITE))
+
+    manifest_path = args.seed_manifest or os.path.join(ctx.output_dir, "SeedManifest.json")
+    try:
+        snap = run_worker_pool(ctx, seeder, args, "SEED")
+    finally:
+        counts = seeder.counts()
+        seeder.manifest["counts"] = counts
+        write_json(manifest_path, seeder.manifest) # Również po Ctrl-C: manifest opisuje to, co faktycznie powstało
+
+    print_load_summary(snap)
+    print(tabulate([[k, v] for k, v in counts.items()], headers=["Seeded", "Count"], tablefmt="grid"))
+    for err in seeder.manifest["failures"][:5]:
+        print(c(f"  {ICON_FAIL} {trim(err, 160)}", Fore.RED))
+    print(c(f"📄 Zapisano manifest: {manifest_path}", Fore.CYAN))
+    return 1 if counts["failures"] or snap["errors"] else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Benchmark stronicowania (tryb pagination) ===
+# ──────────────────────────────────────────────────────────────────────
+
+def load_seed_manifest(path: Optional[str]) -> Dict[str, Any]:
+    """Wczytuje SeedManifest.json (tryb seed); AssertionError z podpowiedzią, gdy brak."""
+    assert path, "--manifest is required (create one with --mode seed)"
+    assert os.path.isfile(path), f"Manifest not found: {path}"
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest.get("kind") == "seed" and manifest.get("users"), f"Not a seed manifest or no users: {path}"
+    return manifest
+
+def manifest_login(t: E2ETester, user: Dict[str, Any]) -> str:
+    """Zwraca ważny token użytkownika z manifestu (token z seeda, jeśli nie wygasł; inaczej login)."""
+    if t.ctx.tokens is not None:
+        t.ctx.tokens.store(user["email"], user.get("token"), only_if_missing=True)
+        return t.ctx.tokens.token_for(t.ctx, user["email"], user["password"], "SETUP: Login manifest user")
+    r = http_post_json(t.ctx, "SETUP: Login manifest user", build(t.ctx, "/api/login"),
+                       {"email": user["email"], "password": user["password"]}, {"Accept": "application/json"})
+    assert r.status_code == 200, f"Login {user['email']} failed: {r.status_code}"
+    token = must_json(r).get("token")
+    assert token, f"Token not found for {user['email']}"
+    return token
+
+# Kolekcje: styl stronicowania ('skip' = top/skip, 'page' = per_page/page, None = brak) i klucz listy w odpowiedzi
+PAGED_COLLECTIONS: Dict[str, Dict[str, Optional[str]]] = {
+    "notes":        {"style": "skip", "items": "data"},  # GET /api/me/notes (top <= 100)
+    "course_notes": {"style": "page", "items": "notes"}, # GET /api/courses/{id}/notes
+    "course_users": {"style": "page", "items": "users"}, # GET /api/courses/{id}/users
+    "my_courses":   {"style": None,   "items": None},    # GET /api/me/courses — pełna lista bez stronicowania
+}
+
+def _page_url(url: str, style: Optional[str], size: int, index: int) -> str:
+    sep = "&" if "?" in url else "?"
+    if style == "skip": return f"{url}{sep}top={size}&skip={index * size}"
+    if style == "page": return f"{url}{sep}per_page={size}&page={index + 1}"
+    return url
+
+def _page_total(body: Any) -> Optional[int]:
+    """Łączna liczba elementów zgłaszana przez API (count / pagination.total / course.stats.*_filtered)."""
+    if not isinstance(body, dict): return None
+    if isinstance(body.get("count"), int): return body["count"]
+    pag = body.get("pagination")
+    if isinstance(pag, dict) and isinstance(pag.get("total"), int): return pag["total"]
+    stats = (body.get("course") or {}).get("stats") or {}
+    for k in ("notes_filtered", "users_filtered"):
+        if isinstance(stats.get(k), int): return stats[k]
+    return None
+
+def walk_pages(ctx: TestContext, token: str, name: str, url: str, size: int, max_pages: int) -> Dict[str, Any]:
+    """Przechodzi całą kolekcję strona po stronie; mierzy czas per strona i liczy duplikaty ID między stronami."""
+    spec = PAGED_COLLECTIONS[name]
+    pages: List[Dict[str, Any]] = []
+    seen: set = set()
+    duplicates, total = 0, None
+    for index in range(max_pages):
+        t0 = time.perf_counter()
+        r = http_get(ctx, f"PAGE: {name} #{index + 1}", _page_url(url, spec["style"], size, index), auth_headers(token))
+        ms = (time.perf_counter() - t0) * 1000.0
+        assert r.status_code == 200, f"{name} page {index + 1}: expected 200, got {r.status_code}"
+        body = must_json(r)
+        items = body if spec["items"] is None else body.get(spec["items"], [])
+        assert isinstance(items, list), f"{name}: expected list of items, got {type(items)}"
+        if total is None: total = _page_total(body)
+        ids = [it.get("id") for it in items if isinstance(it, dict)]
+        duplicates += sum(1 for i in ids if i in seen)
+        seen.update(ids)
+        pages.append({"page": index + 1, "offset": index * size, "ms": ms, "items": len(items), "bytes": len(r.content)})
+        if spec["style"] is None or len(items) < size: break
+    return {"pages": pages, "ids": seen, "duplicates": duplicates, "total": total}
+
+def summarize_walks(walks: List[Dict[str, Any]], expected: Optional[int]) -> Dict[str, Any]:
+    """Łączy powtórzone przejścia: mediana czasu per strona, trend ms na 1000 pominiętych wierszy, luki/duplikaty."""
+    by_page: Dict[int, List[float]] = {}
+    for w in walks:
+        for p in w["pages"]:
+            by_page.setdefault(p["offset"], []).append(p["ms"])
+    offsets = sorted(by_page)
+    med = [percentile(by_page[o], 50) for o in offsets]
+    last = walks[-1]
+    unique = len(last["ids"])
+    reference = expected if expected is not None else last["total"]
+    return {
+        "pages": len(offsets),
+        "items": unique,
+        "reported_total": last["total"],
+        "expected": expected,
+        "duplicates": max(w["duplicates"] for w in walks),
+        "missing": (reference - unique) if reference is not None else None,
+        "first_page_ms": med[0] if med else 0.0,
+        "last_page_ms": med[-1] if med else 0.0,
+        "depth_ratio": (med[-1] / med[0]) if med and med[0] > 0 else None,
+        "ms_per_1k_offset": linear_slope([float(o) for o in offsets], med) * 1000.0,
+        "page_ms": dict(zip(offsets, [round(m, 2) for m in med])),
+        "bytes_total": sum(p["bytes"] for p in last["pages"]),
+    }
+
+def run_pagination_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb pagination: pełne skany kolekcji z manifestu seeda w kilku rozmiarach strony."""
+    try:
+        manifest = load_seed_manifest(args.manifest)
+        sizes = [int(s) for s in args.page_sizes.split(",") if s.strip()]
+        assert sizes and all(s > 0 for s in sizes), "--page-sizes must be positive integers"
+    except (AssertionError, ValueError, OSError) as e:
+        print(c(f"{ICON_FAIL} {e}", Fore.RED))
+        return 2
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    users = {u["idx"]: u for u in manifest["users"]}
+
+    # Cele: użytkownicy z największą liczbą notatek i kursy z największą liczbą notatek/członków
+    notes_per_user: Dict[int, int] = {}
+    for n in manifest["notes"]:
+        notes_per_user[n["owner"]] = notes_per_user.get(n["owner"], 0) + 1
+    notes_per_course: Dict[int, int] = {}
+    for n in manifest["notes"]:
+        if n["shared_to"]: notes_per_course[n["shared_to"]] = notes_per_course.get(n["shared_to"], 0) + 1
+    top_users = sorted(users, key=lambda i: -notes_per_user.get(i, 0))[:max(1, args.scan_users)]
+    top_courses = sorted(manifest["courses"], key=lambda c_: -(notes_per_course.get(c_["id"], 0) + len(c_["members"])))[:max(0, args.scan_courses)]
+
+    tokens: Dict[int, str] = {}
+    def _token(idx: int) -> str:
+        if idx not in tokens: tokens[idx] = manifest_login(t, users[idx])
+        return tokens[idx]
+
+    targets: List[Tuple[str, str, int, str, Optional[int]]] = [] # (kolekcja, zakres, aktor, url, oczekiwana liczba)
+    for u in top_users:
+        targets.append(("notes", f"user#{u}", u, me(ctx, "/notes"), notes_per_user.get(u, 0)))
+        owned_or_member = sum(1 for c_ in manifest["courses"] if c_["owner"] == u or u in c_["members"])
+        targets.append(("my_courses", f"user#{u}", u, me(ctx, "/courses"), owned_or_member))
+    for course in top_courses:
+        cid = course["id"]
+        targets.append(("course_notes", f"course#{cid}", course["owner"], build(ctx, f"/api/courses/{cid}/notes"), None))
+        targets.append(("course_users", f"course#{cid}", course["owner"], build(ctx, f"/api/courses/{cid}/users"), None))
+
+    print(c(f"\n{ICON_INFO} Pagination scan: {len(targets)} collections x sizes {sizes} x {args.scan_repeat} walk(s) @ {ctx.base_url}", Fore.WHITE))
+    results: List[Dict[str, Any]] = []
+    csv_rows = ["collection,scope,page_size,walk,page,offset,ms,items,bytes"]
+    for name, scope, actor, url, expected in targets:
+        for size in (sizes if PAGED_COLLECTIONS[name]["style"] else sizes[:1]):
+            try:
+                token = _token(actor)
+                walks = [walk_pages(ctx, token, name, url, size, args.scan_max_pages) for _ in range(max(1, args.scan_repeat))]
+            except AssertionError as e:
+                print(c(f"  {ICON_FAIL} {name} {scope} size={size}: {e}", Fore.RED))
+                results.append({"collection": name, "scope": scope, "page_size": size, "error": str(e)})
+                continue
+            for wi, w in enumerate(walks, 1):
+                csv_rows += [f"{name},{scope},{size},{wi},{p['page']},{p['offset']},{p['ms']:.2f},{p['items']},{p['bytes']}" for p in w["pages"]]
+            s = summarize_walks(walks, expected)
+            s.update({"collection": name, "scope": scope, "page_size": size, "paginated": PAGED_COLLECTIONS[name]["style"] is not None})
+            results.append(s)
+            print(c(f"  {ICON_OK if not s['duplicates'] and not s['missing'] else ICON_FAIL} {name} {scope} size={size}: "
+                    f"{s['pages']} pages, {s['items']} items, p1 {s['first_page_ms']:.1f}ms -> last {s['last_page_ms']:.1f}ms", Fore.WHITE))
+
+    rows = [[r["collection"], r["scope"], r["page_size"], r.get("pages", "-"), r.get("items", "-"),
+             r.get("duplicates", "-"), "-" if r.get("missing") is None else r["missing"],
+             f"{r['first_page_ms']:.1f}" if "first_page_ms" in r else "-", f"{r['last_page_ms']:.1f}" if "last_page_ms" in r else "-",
+             f"{r['ms_per_1k_offset']:.1f}" if "ms_per_1k_offset" in r else "-",
+             ("no paging" if not r.get("paginated", True) else "") + (r.get("error", "") and " ERROR")]
+            for r in results]
+    print(tabulate(rows, headers=["Collection", "Scope", "Size", "Pages", "Items", "Dups", "Missing",
+                                  "p1 ms", "last ms", "ms/1k off", "Note"], tablefmt="grid"))
+
+    write_text(os.path.join(ctx.output_dir, "PaginationPages.csv"), "\n".join(csv_rows) + "\n")
+    write_json(os.path.join(ctx.output_dir, "PaginationSummary.json"), {"manifest": args.manifest, "page_sizes": sizes, "results": results})
+    print(c(f"📄 Zapisano wyniki: {os.path.join(ctx.output_dir, 'PaginationSummary.json')}", Fore.CYAN))
+    broken = [r for r in results if r.get("error") or r.get("duplicates") or r.get("missing")]
+    return 1 if broken else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Benchmark dashboardu (tryb dashboard) ===
+# ──────────────────────────────────────────────────────────────────────
+
+DASHBOARD_WIDGETS = ["stats", "myCourses", "memberCourses", "recentActivities", "invitations"]
+
+def user_volumes(manifest: Dict[str, Any]) -> Dict[int, int]:
+    """Wolumen danych widocznych na dashboardzie użytkownika: notatki + testy + kursy własne i członkostwa."""
+    vol = {u["idx"]: 0 for u in manifest["users"]}
+    for n in manifest["notes"]: vol[n["owner"]] = vol.get(n["owner"], 0) + 1
+    for t_ in manifest["tests"]: vol[t_["owner"]] = vol.get(t_["owner"], 0) + 1
+    for course in manifest["courses"]:
+        for u in [course["owner"]] + course["members"] + course["pending"]:
+            vol[u] = vol.get(u, 0) + 1
+    return vol
+
+def pick_volume_tiers(volumes: Dict[int, int], n: int) -> List[int]:
+    """Wybiera do n użytkowników równomiernie po rozkładzie wolumenu (zawsze najmniejszy i największy)."""
+    ranked = sorted(volumes, key=lambda i: (volumes[i], i))
+    if n >= len(ranked): return ranked
+    if n <= 1: return ranked[-1:]
+    return sorted({ranked[round(k * (len(ranked) - 1) / (n - 1))] for k in range(n)}, key=lambda i: volumes[i])
+
+def measure_get(ctx: TestContext, title: str, url: str, token: str, repeat: int) -> Dict[str, Any]:
+    """Powtarza GET `repeat` razy; zwraca percentyle czasu, rozmiar odpowiedzi i body ostatniej odpowiedzi."""
+    ms: List[float] = []
+    r = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        r = http_get(ctx, title, url, auth_headers(token))
+        ms.append((time.perf_counter() - t0) * 1000.0)
+        assert r.status_code == 200, f"{title}: expected 200, got {r.status_code}"
+    return {"ms": ms, "p50_ms": percentile(ms, 50), "p95_ms": percentile(ms, 95), "max_ms": max(ms),
+            "bytes": len(r.content), "body": must_json(r)}
+
+def dashboard_url(ctx: TestContext, params: Dict[str, Any]) -> str:
+    """Buduje URL /me/dashboard z pominięciem pustych parametrów."""
+    query = "&".join(f"{k}={requests.utils.quote(str(v))}" for k, v in params.items() if v not in (None, ""))
+    return me(ctx, "/dashboard" + (f"?{query}" if query else ""))
+
+def dashboard_item_counts(body: Any) -> Dict[str, int]:
+    data = body.get("data", {}) if isinstance(body, dict) else {}
+    return {w: len(v) for w, v in data.items() if isinstance(v, list)}
+
+def _csv_list(spec: str) -> List[str]:
+    return [s.strip() for s in spec.split(",")]
+
+def run_dashboard_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb dashboard: siatka limit x page x fraza dla użytkowników o różnym wolumenie danych."""
+    try:
+        manifest = load_seed_manifest(args.manifest)
+        limits = [int(x) for x in _csv_list(args.dash_limits) if x]
+        pages = [int(x) for x in _csv_list(args.dash_pages) if x]
+        queries = _csv_list(args.dash_queries) # Pusty element = bez filtra
+        assert limits and pages, "--dash-limits and --dash-pages must not be empty"
+    except (AssertionError, ValueError, OSError) as e:
+        print(c(f"{ICON_FAIL} {e}", Fore.RED))
+        return 2
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    volumes = user_volumes(manifest)
+    users = {u["idx"]: u for u in manifest["users"]}
+    tiers = pick_volume_tiers(volumes, args.dash_users)
+    combos = [(lim, pg, q) for lim in limits for pg in pages for q in queries]
+    print(c(f"\n{ICON_INFO} Dashboard sweep: {len(tiers)} users x {len(combos)} combinations x {args.dash_repeat} @ {ctx.base_url}", Fore.WHITE))
+
+    results: List[Dict[str, Any]] = []
+    failures: List[str] = []
+    for idx in tiers:
+        try:
+            token = manifest_login(t, users[idx])
+            measure_get(ctx, "DASH: Warm-up", dashboard_url(ctx, {}), token, 1) # Rozgrzanie (cache opcodes/połączenie)
+        except AssertionError as e:
+            failures.append(f"user#{idx}: {e}")
+            continue
+        for lim, pg, q in combos:
+            params = {"limit": lim, "page": pg, "activities_q": q, "courses_q": q}
+            try:
+                m = measure_get(ctx, f"DASH: limit={lim} page={pg} q={q!r}", dashboard_url(ctx, params), token, args.dash_repeat)
+            except AssertionError as e:
+                failures.append(f"user#{idx} limit={lim} page={pg} q={q!r}: {e}")
+                continue
+            results.append({"user": idx, "volume": volumes.get(idx, 0), "limit": lim, "page": pg, "q": q,
+                            "p50_ms": m["p50_ms"], "p95_ms": m["p95_ms"], "max_ms": m["max_ms"], "bytes": m["bytes"],
+                            "items": dashboard_item_counts(m["body"])})
+        print(c(f"  {ICON_USER} user#{idx} (volume {volumes.get(idx, 0)}): {sum(1 for r in results if r['user'] == idx)}/{len(combos)} combinations", Fore.WHITE))
+
+    # Krzywe kosztu: średnia p50 i rozmiar odpowiedzi w funkcji każdego parametru osobno
+    def _by(key: str) -> List[List[Any]]:
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for r in results: groups.setdefault(r[key], []).append(r)
+        return [[key, repr(k) if key == "q" else k, len(v), f"{sum(r['p50_ms'] for r in v) / len(v):.1f}",
+                 f"{max(r['p95_ms'] for r in v):.1f}", f"{sum(r['bytes'] for r in v) / len(v) / 1024:.1f}"]
+                for k, v in sorted(groups.items(), key=lambda kv: str(kv[0]) if key == "q" else kv[0])]
+    rows = _by("volume") + _by("limit") + _by("page") + _by("q")
+    print(tabulate(rows, headers=["Param", "Value", "Runs", "avg p50 ms", "max p95 ms", "avg KB"], tablefmt="grid"))
+    slowest = sorted(results, key=lambda r: -r["p50_ms"])[:10]
+    print(tabulate([[r["user"], r["volume"], r["limit"], r["page"], repr(r["q"]), f"{r['p50_ms']:.1f}", f"{r['p95_ms']:.1f}",
+                     f"{r['bytes'] / 1024:.1f}"] for r in slowest],
+                   headers=["User", "Volume", "Limit", "Page", "Query", "p50 ms", "p95 ms", "KB"], tablefmt="grid"))
+    for f in failures[:5]:
+        print(c(f"  {ICON_FAIL} {trim(f, 160)}", Fore.RED))
+
+    csv = ["user,volume,limit,page,q,p50_ms,p95_ms,max_ms,bytes," + ",".join(f"items_{w}" for w in DASHBOARD_WIDGETS)]
+    csv += [f"{r['user']},{r['volume']},{r['limit']},{r['page']},\"{r['q']}\",{r['p50_ms']:.2f},{r['p95_ms']:.2f},{r['max_ms']:.2f},{r['bytes']},"
+            + ",".join(str(r["items"].get(w, "")) for w in DASHBOARD_WIDGETS) for r in results]
+    write_text(os.path.join(ctx.output_dir, "DashboardSweep.csv"), "\n".join(csv) + "\n")
+    write_json(os.path.join(ctx.output_dir, "DashboardSweep.json"), {"manifest": args.manifest, "users": tiers, "results": results, "failures": failures})
+    print(c(f"📄 Zapisano wyniki: {os.path.join(ctx.output_dir, 'DashboardSweep.json')}", Fore.CYAN))
+    return 1 if failures else 0
+
+def run_dashboard_widgets_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb dashboard-widgets: koszt krańcowy widżetów przez include= (pojedynczo i leave-one-out)."""
+    try:
+        manifest = load_seed_manifest(args.manifest)
+    except (AssertionError, OSError, ValueError) as e:
+        print(c(f"{ICON_FAIL} {e}", Fore.RED))
+        return 2
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    volumes = user_volumes(manifest)
+    users = {u["idx"]: u for u in manifest["users"]}
+    # 'none' nie pasuje do żadnego widżetu: mierzy stały koszt (auth, getAllowedCourseIds, serializacja meta)
+    variants: Dict[str, str] = {"none": "none", "all": ",".join(DASHBOARD_WIDGETS)}
+    for w in DASHBOARD_WIDGETS:
+        variants[f"only:{w}"] = w
+        variants[f"without:{w}"] = ",".join(x for x in DASHBOARD_WIDGETS if x != w)
+    rounds = max(3, args.widget_repeat)
+    rng = random.Random(args.seed_random)
+    print(c(f"\n{ICON_INFO} Dashboard widget attribution: {len(variants)} variants x {rounds} rounds "
+            f"x {args.dash_users} user(s) @ {ctx.base_url}", Fore.WHITE))
+
+    report: List[Dict[str, Any]] = []
+    rows: List[List[Any]] = []
+    for idx in pick_volume_tiers(volumes, args.dash_users)[::-1]: # Od najcięższego użytkownika
+        try:
+            token = manifest_login(t, users[idx])
+            samples: Dict[str, List[float]] = {k: [] for k in variants}
+            size: Dict[str, int] = {}
+            for name, inc in variants.items(): # Rozgrzanie każdego wariantu
+                measure_get(ctx, f"WIDGET: warm-up {name}", dashboard_url(ctx, {"include": inc}), token, 1)
+            for _ in range(rounds):
+                order = list(variants.items())
+                rng.shuffle(order) # Przeplot wariantów: dryf serwera rozkłada się równo na wszystkie
+                for name, inc in order:
+                    m = measure_get(ctx, f"WIDGET: {name}", dashboard_url(ctx, {"include": inc}), token, 1)
+                    samples[name].append(m["ms"][0])
+                    size[name] = m["bytes"]
+        except AssertionError as e:
+            print(c(f"  {ICON_FAIL} user#{idx}: {e}", Fore.RED))
+            report.append({"user": idx, "error": str(e)})
+            continue
+
+        med = {k: percentile(v, 50) for k, v in samples.items()}
+        iqr = {k: percentile(v, 75) - percentile(v, 25) for k, v in samples.items()}
+        base, full = med["none"], med["all"]
+        widgets = []
+        for w in DASHBOARD_WIDGETS:
+            alone = med[f"only:{w}"] - base
+            loo = full - med[f"without:{w}"]
+            noise = (iqr[f"only:{w}"] + iqr["none"]) / 2.0 # Różnice poniżej tego progu to szum
+            widgets.append({"widget": w, "alone_ms": alone, "leave_one_out_ms": loo, "noise_ms": noise,
+                            "share_of_full": (loo / (full - base)) if full > base else None,
+                            "bytes": size[f"only:{w}"] - size["none"]})
+            rows.append([f"user#{idx} ({volumes.get(idx, 0)})", w, f"{alone:.1f}", f"{loo:.1f}", f"±{noise:.1f}",
+                         "-" if widgets[-1]["share_of_full"] is None else f"{widgets[-1]['share_of_full'] * 100:.0f}%",
+                         f"{widgets[-1]['bytes'] / 1024:.1f}"])
+        rows.append([f"user#{idx} ({volumes.get(idx, 0)})", "(base / full)", f"{base:.1f}", f"{full:.1f}", "", "", f"{size['all'] / 1024:.1f}"])
+        report.append({"user": idx, "volume": volumes.get(idx, 0), "rounds": rounds, "base_ms": base, "full_ms": full,
+                       "variants": {k: {"p50_ms": med[k], "iqr_ms": iqr[k], "bytes": size[k]} for k in variants},
+                       "widgets": sorted(widgets, key=lambda x: -x["leave_one_out_ms"])})
+
+    print(tabulate(rows, headers=["User (volume)", "Widget", "Alone ms", "Leave-1-out ms", "Noise", "Share", "KB"], tablefmt="grid"))
+    write_json(os.path.join(ctx.output_dir, "DashboardWidgets.json"), {"manifest": args.manifest, "users": report})
+    print(c(f"📄 Zapisano wyniki: {os.path.join(ctx.output_dir, 'DashboardWidgets.json')}", Fore.CYAN))
+    return 1 if any("error" in r for r in report) else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Benchmark cyklu życia tokenów JWT (tryb auth) ===
+# ──────────────────────────────────────────────────────────────────────
+
+def timed(fn: Callable[..., requests.Response], *a: Any, **kw: Any) -> Tuple[float, requests.Response]:
+    """Wywołuje helper HTTP i zwraca (czas w ms, odpowiedź)."""
+    t0 = time.perf_counter()
+    r = fn(*a, **kw)
+    return (time.perf_counter() - t0) * 1000.0, r
+
+def forge_signature(token: str) -> str:
+    """Token o poprawnej strukturze i claimach, ale z podpisem, który nie przejdzie weryfikacji."""
+    head, payload, sig = token.split(".")
+    return f"{head}.{payload}.{sig[::-1] if len(sig) > 1 else 'x'}"
+
+def latency_row(name: str, ms: List[float]) -> List[Any]:
+    return [name, len(ms), f"{percentile(ms, 50):.1f}", f"{percentile(ms, 95):.1f}", f"{percentile(ms, 99):.1f}"]
+
+def run_auth_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb auth: login vs refresh, narzut guardu auth:api, blacklista po logout/refresh, równoległy refresh."""
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    samples = max(5, args.auth_samples)
+    problems: List[str] = []
+    lat: Dict[str, List[float]] = {k: [] for k in ("login", "refresh", "guard_valid", "guard_no_token", "guard_bad_signature", "storm_refresh")}
+    created: List[Tuple[str, str]] = [] # (email, pwd) kont do usunięcia na końcu
+    url_login, url_refresh, url_profile = build(ctx, "/api/login"), build(ctx, "/api/refresh"), me(ctx, "/profile")
+
+    def _login(c_: TestContext, email: str, pwd: str) -> Tuple[float, str]:
+        ms, r = timed(http_post_json, c_, "AUTH: Login", url_login, {"email": email, "password": pwd}, {"Accept": "application/json"})
+        assert r.status_code == 200, f"Login failed: {r.status_code}"
+        return ms, must_json(r).get("token")
+
+    def _refresh(c_: TestContext, token: str) -> Tuple[float, Optional[str], int]:
+        ms, r = timed(http_post_json, c_, "AUTH: Refresh", url_refresh, {}, auth_headers(token))
+        return ms, (must_json(r).get("token") if r.status_code == 200 else None), r.status_code
+
+    def _profile_status(c_: TestContext, token: Optional[str]) -> int:
+        return http_get(c_, "AUTH: Profile probe", url_profile, auth_headers(token) if token else {"Accept": "application/json"}).status_code
+
+    print(c(f"\n{ICON_INFO} Auth benchmark: {samples} samples, refresh storm {args.auth_users} tokens x {args.auth_chain} refreshes @ {ctx.base_url}", Fore.WHITE))
+    try:
+        with muted_console():
+            email, pwd, _ = t._setup_register_and_login("AuthBench", "authbench")
+        created.append((email, pwd))
+
+        # 1. Login (bcrypt) vs refresh (podpis + blacklista) na tym samym koncie
+        token = None
+        for _ in range(samples):
+            ms, token = _login(ctx, email, pwd)
+            lat["login"].append(ms)
+            ms, new_token, status = _refresh(ctx, token)
+            if not new_token:
+                problems.append(f"refresh of a fresh token returned {status}")
+                continue
+            lat["refresh"].append(ms)
+            token = new_token
+
+        # 2. Narzut guardu auth:api: ten sam GET z ważnym tokenem, bez tokenu (401 bez parsowania) i ze sfałszowanym podpisem
+        bad = forge_signature(token)
+        for _ in range(samples):
+            for key, hdr, expect in (("guard_valid", auth_headers(token), 200),
+                                     ("guard_no_token", {"Accept": "application/json"}, 401),
+                                     ("guard_bad_signature", auth_headers(bad), 401)):
+                ms, r = timed(http_get, ctx, f"AUTH: Guard {key}", url_profile, hdr)
+                lat[key].append(ms)
+                if r.status_code != expect and len(problems) < 50:
+                    problems.append(f"{key}: expected {expect}, got {r.status_code}")
+
+        # 3. Blacklista: token po refresh i po logout nie może być przyjęty (ani odświeżony)
+        _, old = _login(ctx, email, pwd)
+        _, rotated, _ = _refresh(ctx, old)
+        if _profile_status(ctx, old) != 401: problems.append("token superseded by refresh still accepted (blacklist)")
+        if _refresh(ctx, old)[2] != 401: problems.append("token superseded by refresh can be refreshed again")
+        r = http_post_json(ctx, "AUTH: Logout", me(ctx, "/logout"), None, auth_headers(rotated))
+        if r.status_code not in (200, 204): problems.append(f"logout returned {r.status_code}")
+        if _profile_status(ctx, rotated) != 401: problems.append("token accepted after logout (blacklist)")
+        if _refresh(ctx, rotated)[2] != 401: problems.append("token refreshed after logout")
+
+        # 4. Refresh storm: N tokenów, każdy odświeżany łańcuchowo w osobnym wątku; stary token musi być odrzucony
+        lock = threading.Lock()
+        storm_errors: List[str] = []
+        stale_accepted = [0]
+
+        def _storm(n: int):
+            c_ = fork_context(ctx)
+            tw = E2ETester(c_)
+            try:
+                e, p, tok = tw._setup_register_and_login(f"AuthStorm{n}", f"authstorm{n}")
+                with lock: created.append((e, p))
+                for _ in range(max(1, args.auth_chain)):
+                    ms, new_tok, status = _refresh(c_, tok)
+                    if not new_tok:
+                        with lock: storm_errors.append(f"storm-{n}: refresh returned {status}")
+                        return
+                    with lock: lat["storm_refresh"].append(ms)
+                    if _profile_status(c_, tok) != 401:
+                        with lock: stale_accepted[0] += 1
+                    tok = new_tok
+            except Exception as ex:
+                with lock: storm_errors.append(f"storm-{n}: {type(ex).__name__}: {ex}")
+
+        t0 = time.time()
+        with muted_console():
+            threads = [threading.Thread(target=_storm, args=(n,), name=f"auth-storm-{n}", daemon=True) for n in range(1, max(1, args.auth_users) + 1)]
+            for th in threads: th.start()
+            for th in threads:
+                while th.is_alive(): th.join(timeout=0.5)
+        storm_s = time.time() - t0
+        problems += storm_errors[:20]
+        if stale_accepted[0]:
+            problems.append(f"{stale_accepted[0]} superseded token(s) still accepted during the refresh storm")
+    except AssertionError as e:
+        problems.append(str(e))
+        storm_s = 0.0
+    finally:
+        for e, p in created: # Sprzątanie kont (świeży login: tokeny mogły zostać unieważnione)
+            try:
+                _, tok = _login(ctx, e, p)
+                http_delete(ctx, "AUTH: Delete bench profile", url_profile, auth_headers(tok))
+            except Exception:
+                pass
+
+    rows = [latency_row(k, v) for k, v in lat.items() if v]
+    print(tabulate(rows, headers=["Metric", "n", "p50 ms", "p95 ms", "p99 ms"], tablefmt="grid"))
+    guard = {k: percentile(lat[k], 50) for k in ("guard_valid", "guard_no_token", "guard_bad_signature") if lat[k]}
+    summary: Dict[str, Any] = {
+        "login_p50_ms": percentile(lat["login"], 50),
+        "refresh_p50_ms": percentile(lat["refresh"], 50),
+        "login_to_refresh_ratio": (percentile(lat["login"], 50) / percentile(lat["refresh"], 50)) if lat["refresh"] else None,
+        # Narzut per żądanie auth:api: parsowanie + weryfikacja JWT + blacklista + załadowanie usera (+ lekki kontroler profilu)
+        "guard_overhead_ms": (guard["guard_valid"] - guard["guard_no_token"]) if len(guard) == 3 else None,
+        "signature_check_ms": (guard["guard_bad_signature"] - guard["guard_no_token"]) if len(guard) == 3 else None,
+        "storm_refresh_per_s": (len(lat["storm_refresh"]) / storm_s) if storm_s else None,
+    }
+    for k, v in summary.items():
+        print(f" {ICON_LOCK} {k}: {'-' if v is None else f'{v:.2f}'}")
+    for p in problems[:10]:
+        print(c(f"  {ICON_FAIL} {p}", Fore.RED))
+    write_json(os.path.join(ctx.output_dir, "AuthBenchmark.json"),
+               {"summary": summary, "latency": {k: {"n": len(v), "p50_ms": percentile(v, 50), "p95_ms": percentile(v, 95), "p99_ms": percentile(v, 99)}
+                                                for k, v in lat.items()}, "problems": problems})
+    print(c(f"📄 Zapisano wyniki: {os.path.join(ctx.output_dir, 'AuthBenchmark.json')}", Fore.CYAN))
+    return 1 if problems else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Benchmark uploadu plików notatek (tryb uploads) ===
+# ──────────────────────────────────────────────────────────────────────
+
+# Minimalny pakiet OOXML: finfo rozpoznaje xlsx po pierwszym wpisie [Content_Types].xml i kolejnym z prefiksem xl/
+XLSX_SKELETON = [
+    ("[Content_Types].xml", '<?xml version="1.0" encoding="UTF-8"?>'
+     '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+     '<Default Extension="xml" ContentType="application/xml"/>'
+     '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/></Types>'),
+    ("xl/workbook.xml", '<?xml version="1.0" encoding="UTF-8"?>'
+     '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheets/></workbook>'),
+    ("_rels/.rels", '<?xml version="1.0" encoding="UTF-8"?>'
+     '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+     '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/></Relationships>'),
+]
+
+def parse_size(spec: str) -> int:
+    """'512', '64K', '10M', '1G' -> bajty."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)B?\s*", spec, re.IGNORECASE)
+    if not m: raise ValueError(f"Invalid size: {spec!r} (expected e.g. 512, 64K, 10M, 1G)")
+    return int(float(m.group(1)) * {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}[m.group(2).upper()])
+
+def fmt_size(n: int) -> str:
+    for unit, k in (("G", 1 << 30), ("M", 1 << 20), ("K", 1 << 10)):
+        if n >= k: return f"{n / k:.4g}{unit}"
+    return str(n)
+
+def _write_random(f: Any, n: int):
+    """Dopisuje n losowych (niekompresowalnych) bajtów blokami po 1 MiB."""
+    while n > 0:
+        k = min(n, MultipartStream.CHUNK)
+        f.write(os.urandom(k))
+        n -= k
+
+def synth_note_file(dir_: str, ext: str, size: int) -> str:
+    """Tworzy plik ~size bajtów z prawdziwą sygnaturą typu (reguła mimes: sprawdza treść przez finfo, nie rozszerzenie)."""
+    path = os.path.join(dir_, f"sweep_{size}.{ext}")
+    if ext == "xlsx":
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as z:
+            for name, body in XLSX_SKELETON: z.writestr(name, body)
+            with z.open("xl/media/padding.bin", "w", force_zip64=size >= 1 << 31) as f:
+                _write_random(f, max(0, size - 1400)) # ~narzut szkieletu i nagłówków ZIP
+        return path
+    head, tail = {"png": (gen_png_bytes(), b""), # Dane po IEND są ignorowane przez dekodery, sygnatura zostaje
+                  "jpg": (b"\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01\x01\x00\x00\x01\x00\x01\x00\x00", b"\xff\xd9"),
+                  "pdf": (b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n", b"\n%%EOF\n")}["jpg" if ext == "jpeg" else ext]
+    with open(path, "wb") as f:
+        f.write(head)
+        _write_random(f, max(0, size - len(head) - len(tail)))
+        f.write(tail)
+    return path
+
+def upload_once(ctx: TestContext, token: str, endpoint: str, note_id: Optional[int],
+                src: UploadSource, count: int) -> Dict[str, Any]:
+    """Jeden upload (create: POST /me/notes z files[] x count, add: POST /me/notes/{id}/files).
+
+    Czas serwera = nagłówki odpowiedzi - oddanie ostatniego bajtu body do gniazda (zawyżony o bufor
+    nadawczy jądra, przy dużych plikach pomijalny). Ujemny = serwer odpowiedział przed końcem body."""
+    if endpoint == "create":
+        url = me(ctx, "/notes")
+        fields = {"title": f"Upload sweep {fmt_size(len(src))} x{count}", "description": "Upload sweep", "is_private": "1"}
+        parts = [("files[]", f"{i}_{src.name}", src, src.mime) for i in range(count)]
+    else:
+        url = me(ctx, f"/notes/{note_id}/files")
+        fields, parts = {}, [("file", src.name, src, src.mime)]
+    stream = MultipartStream(fields, parts)
+    t0 = time.perf_counter()
+    r = http_request(ctx, f"UPLOAD: {endpoint} {fmt_size(len(src))} x{len(parts)}", "POST", url, auth_headers(token), data=stream)
+    total_s = time.perf_counter() - t0
+    send_s = (stream.finished_at - stream.started_at) if stream.finished_at and stream.started_at else None
+    server_ms = None
+    if r.status_code != 599 and stream.finished_at:
+        server_ms = (t0 + r.elapsed.total_seconds() - stream.finished_at) * 1000.0
+    row = {"status": r.status_code, "body_bytes": len(stream), "file_bytes": stream.file_bytes, "total_ms": total_s * 1000.0,
+           "send_ms": None if send_s is None else send_s * 1000.0, "server_ms": server_ms,
+           "send_mbps": (len(stream) / send_s / 1e6) if send_s else None,
+           "effective_mbps": stream.file_bytes / total_s / 1e6 if r.status_code in (200, 201) else None,
+           "early_reject": stream.finished_at is None or (server_ms is not None and server_ms < 0)}
+    if r.status_code in (200, 201): # Sprzątanie poza pomiarem: pliki nie zostają na dysku serwera
+        body = must_json(r)
+        if endpoint == "create":
+            created = (body.get("note", body) or {}).get("id")
+            if created: http_delete(ctx, "UPLOAD: Cleanup note", me(ctx, f"/notes/{created}"), auth_headers(token))
+        else:
+            file_id = (body.get("file") or {}).get("id")
+            if file_id: http_delete(ctx, "UPLOAD: Cleanup file", me(ctx, f"/notes/{note_id}/files/{file_id}"), auth_headers(token))
+    elif r.status_code != 599:
+        row["error"] = trim(r.text, 200)
+    return row
+
+def run_uploads_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb uploads: siatka rozmiar pliku x liczba plików w żądaniu x typ MIME; przepustowość, czas serwera, progi odrzuceń."""
+    try:
+        sizes = sorted({parse_size(x) for x in _csv_list(args.upload_sizes) if x})
+        counts = sorted({int(x) for x in _csv_list(args.upload_counts) if x})
+        types = [x.lower().lstrip(".") for x in _csv_list(args.upload_types) if x]
+        max_body = parse_size(args.upload_max_body)
+        assert sizes and counts and types, "--upload-sizes, --upload-counts and --upload-types must not be empty"
+        unknown = [x for x in types if x not in NOTE_MIME_MAP]
+        assert not unknown, f"Unsupported --upload-types {unknown} (allowed: {', '.join(NOTE_MIME_MAP)})"
+    except (AssertionError, ValueError) as e:
+        print(c(f"{ICON_FAIL} {e}", Fore.RED))
+        return 2
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    # Endpoint dodawania przyjmuje jeden plik na żądanie, więc liczba plików dotyczy tylko create
+    series = [("create", n) for n in counts] + [("add", 1)]
+    repeat = max(1, args.upload_repeat)
+    print(c(f"\n{ICON_INFO} Upload sweep: {len(types)} types x {len(sizes)} sizes x {len(series)} series x {repeat} "
+            f"(body cap {fmt_size(max_body)}) @ {ctx.base_url}", Fore.WHITE))
+
+    rows: List[Dict[str, Any]] = []
+    problems: List[str] = []
+    work_dir = tempfile.mkdtemp(prefix="e2e_uploads_")
+    token = None
+    try:
+        with muted_console():
+            _, _, token = t._setup_register_and_login("UploadBench", "uploadbench")
+            carrier = t._create_note("UPLOAD: Carrier note", token, "Upload sweep carrier")
+        for ext in types:
+            stopped: Dict[Tuple[str, int], int] = {} # Seria -> rozmiar, od którego wszystkie próby kończyły się błędem
+            for size in sizes:
+                todo = [(ep, n) for ep, n in series if (ep, n) not in stopped and size * n <= max_body]
+                if not todo: continue
+                path = synth_note_file(work_dir, ext, size)
+                src = UploadSource.from_path(path, NOTE_MIME_MAP[ext]) # Bez cache: mapowanie znika razem ze źródłem
+                for ep, n in todo:
+                    runs = []
+                    with muted_console():
+                        for _ in range(repeat):
+                            runs.append(upload_once(ctx, token, ep, carrier, src, n))
+                    for rep, r in enumerate(runs):
+                        rows.append({"type": ext, "endpoint": ep, "count": n, "size": len(src), "repeat": rep, **r})
+                    ok = [r for r in runs if r["status"] in (200, 201)]
+                    statuses = sorted({r["status"] for r in runs})
+                    print(c(f"  {ICON_OK if ok else ICON_FAIL} {ext:<4} {ep:<6} {fmt_size(len(src)):>7} x{n}: "
+                            f"{len(ok)}/{repeat} ok, status {statuses}", Fore.WHITE if ok else Fore.YELLOW))
+                    if not ok and not args.upload_keep_going:
+                        stopped[(ep, n)] = len(src)
+                del src
+                with contextlib.suppress(OSError): os.remove(path) # Windows: plik może być jeszcze zmapowany
+    except AssertionError as e:
+        problems.append(str(e))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if token: # Usunięcie profilu kasuje też notatkę-nośnik
+            http_delete(ctx, "UPLOAD: Delete bench profile", me(ctx, "/profile"), auth_headers(token))
+
+    # Agregaty per kombinacja oraz progi: największy udany i najmniejszy odrzucony rozmiar w serii
+    combos: Dict[Tuple[str, str, int, int], List[Dict[str, Any]]] = {}
+    for r in rows: combos.setdefault((r["type"], r["endpoint"], r["count"], r["size"]), []).append(r)
+    summary, table = [], []
+    for (ext, ep, n, size), runs in combos.items():
+        ok = [r for r in runs if r["status"] in (200, 201)]
+        med = lambda rs, k: percentile([r[k] for r in rs if r[k] is not None], 50) if any(r[k] is not None for r in rs) else None
+        # Czasy także dla odrzuceń (jak szybko serwer odmawia), przepustowość tylko z udanych uploadów
+        s = {"type": ext, "endpoint": ep, "count": n, "size": size, "runs": len(runs), "ok": len(ok),
+             "statuses": sorted({r["status"] for r in runs}), "p50_total_ms": med(runs, "total_ms"), "p50_server_ms": med(runs, "server_ms"),
+             "p50_send_mbps": med(ok, "send_mbps"), "p50_effective_mbps": med(ok, "effective_mbps")}
+        summary.append(s)
+        fmt = lambda v, f=".1f": "-" if v is None else format(v, f)
+        table.append([ext, ep, n, fmt_size(size), f"{len(ok)}/{len(runs)}", ",".join(map(str, s["statuses"])), fmt(s["p50_total_ms"]),
+                      fmt(s["p50_server_ms"]), fmt(s["p50_send_mbps"], ".2f"), fmt(s["p50_effective_mbps"], ".2f")])
+    print(tabulate(table, headers=["Type", "Endpoint", "Files", "Size", "OK", "Status", "p50 total ms", "p50 server ms",
+                                   "send MB/s", "effective MB/s"], tablefmt="grid"))
+    thresholds = []
+    for ext in types:
+        for ep, n in series:
+            part = [s for s in summary if (s["type"], s["endpoint"], s["count"]) == (ext, ep, n)]
+            if not part: continue
+            passed = [s["size"] for s in part if s["ok"] == s["runs"]]
+            failed = [s for s in part if s["ok"] == 0]
+            failed_sizes = {s["size"] for s in failed}
+            thresholds.append({"type": ext, "endpoint": ep, "count": n, "max_ok_size": max(passed) if passed else None,
+                               "min_fail_size": min(failed_sizes) if failed_sizes else None,
+                               "fail_statuses": sorted({st for s in failed for st in s["statuses"]}), # np. 422 (walidacja), potem 413 (nginx)
+                               "early_reject": any(r["early_reject"] for r in rows if (r["type"], r["endpoint"], r["count"]) == (ext, ep, n)
+                                                   and r["size"] in failed_sizes)})
+    print(tabulate([[x["type"], x["endpoint"], x["count"], fmt_size(x["max_ok_size"]) if x["max_ok_size"] else "-",
+                     fmt_size(x["min_fail_size"]) if x["min_fail_size"] else "-", ",".join(map(str, x["fail_statuses"])) or "-",
+                     "yes" if x["early_reject"] else ""] for x in thresholds],
+                   headers=["Type", "Endpoint", "Files", "Max OK", "Min fail", "Fail status", "Early reject"], tablefmt="grid"))
+    for p in problems[:5]:
+        print(c(f"  {ICON_FAIL} {trim(p, 160)}", Fore.RED))
+
+    cols = ["type", "endpoint", "count", "size", "repeat", "status", "body_bytes", "file_bytes", "total_ms", "send_ms",
+            "server_ms", "send_mbps", "effective_mbps", "early_reject"]
+    csv = [",".join(cols)] + [",".join("" if r.get(k) is None else (f"{r[k]:.3f}" if isinstance(r[k], float) else str(r[k])) for k in cols) for r in rows]
+    write_text(os.path.join(ctx.output_dir, "UploadSweep.csv"), "\n".join(csv) + "\n")
+    write_json(os.path.join(ctx.output_dir, "UploadSweep.json"), {"sizes": sizes, "counts": counts, "types": types, "repeat": repeat,
+                                                                  "summary": summary, "thresholds": thresholds, "problems": problems})
+    print(c(f"📄 Zapisano wyniki: {os.path.join(ctx.output_dir, 'UploadSweep.json')}", Fore.CYAN))
+    return 1 if problems else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Benchmark żądań Range / wznawiania pobrań (tryb ranges) ===
+# ──────────────────────────────────────────────────────────────────────
+
+CONTENT_RANGE_RE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+def range_cases(size: int, chunk: int) -> List[Tuple[str, str, Optional[Tuple[int, int]]]]:
+    """(nazwa, nagłówek Range, oczekiwany zakres [a, b] włącznie; None dla multi-range i 416)."""
+    chunk = max(1, min(chunk, size))
+    mid = max(0, size // 2 - chunk // 2)
+    return [("first byte", "bytes=0-0", (0, 0)),
+            ("head chunk", f"bytes=0-{chunk - 1}", (0, chunk - 1)),
+            ("middle chunk", f"bytes={mid}-{mid + chunk - 1}", (mid, mid + chunk - 1)),
+            ("open-ended tail", f"bytes={size - chunk}-", (size - chunk, size - 1)),
+            ("suffix", f"bytes=-{chunk}", (size - chunk, size - 1)),
+            ("multi-range", f"bytes=0-99,{mid}-{mid + 99}", None),
+            ("unsatisfiable", f"bytes={size}-", None)]
+
+def check_range(src: UploadSource, name: str, expect: Optional[Tuple[int, int]],
+                r: requests.Response, dl: DownloadStats) -> Tuple[str, Optional[str]]:
+    """Ocenia odpowiedź na Range: (werdykt, błąd lub None). Treść porównywana po SHA-256 wycinka źródła."""
+    size = len(src)
+    if r.status_code == 200:
+        return "ignored (200 full body)", None if dl.matches(src) else "200 body differs from the uploaded file"
+    if name == "unsatisfiable":
+        ok = r.status_code == 416 and r.headers.get("Content-Range", "") in ("", f"bytes */{size}")
+        return str(r.status_code), None if ok else f"expected 416 with 'bytes */{size}', got {r.status_code} {r.headers.get('Content-Range')!r}"
+    if r.status_code != 206:
+        return str(r.status_code), f"expected 206, got {r.status_code}"
+    if expect is None: # multi-range: 206 multipart/byteranges
+        ct = r.headers.get("Content-Type", "")
+        return "206 multipart", None if ct.startswith("multipart/byteranges") else f"multi-range 206 with Content-Type {ct!r}"
+    m = CONTENT_RANGE_RE.fullmatch(r.headers.get("Content-Range", ""))
+    a, b = expect
+    if not m or (int(m.group(1)), int(m.group(2))) != (a, b) or m.group(3) not in (str(size), "*"):
+        return "206", f"Content-Range {r.headers.get('Content-Range')!r}, expected 'bytes {a}-{b}/{size}'"
+    if dl.bytes != b - a + 1 or dl.sha256 != hashlib.sha256(src.view[a:b + 1]).hexdigest():
+        return "206", f"body of {dl.bytes} bytes does not match source bytes {a}-{b}"
+    return "206", None
+
+def run_ranges_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb ranges: Range (pierwszy bajt, środek, sufiks, multi-range, 416) i pobranie wznawiane kawałkami vs pełne."""
+    try:
+        chunk = parse_size(args.range_chunk)
+        size = parse_size(args.range_size)
+        assert chunk > 0 and size > 0, "--range-chunk and --range-size must be positive"
+    except (AssertionError, ValueError) as e:
+        print(c(f"{ICON_FAIL} {e}", Fore.RED))
+        return 2
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    repeat = max(1, args.range_repeat)
+    work_dir = tempfile.mkdtemp(prefix="e2e_ranges_")
+    problems: List[str] = []
+    cases: Dict[str, Dict[str, Any]] = {}
+    full_ms: List[float] = []
+    resumable: List[Dict[str, Any]] = []
+    accept_ranges = None
+    token = None
+    try:
+        with muted_console():
+            _, _, token = t._setup_register_and_login("RangeBench", "rangebench")
+        if args.range_file:
+            ext = os.path.splitext(args.range_file)[1].lower().lstrip(".")
+            src = upload_source(args.range_file, NOTE_MIME_MAP.get(ext, "application/octet-stream"))
+        else:
+            src = UploadSource.from_path(synth_note_file(work_dir, "pdf", size), NOTE_MIME_MAP["pdf"])
+        h = auth_headers(token)
+        r = http_post_multipart(ctx, "RANGE: Create note", me(ctx, "/notes"), data={"title": "Range benchmark", "description": "Range benchmark", "is_private": "1"},
+                                files=[("files[]", (src.name, src, src.mime))], headers=h)
+        assert r.status_code in (200, 201), f"Create note with {len(src)} byte file failed: {r.status_code} {trim(r.text)}"
+        note = must_json(r).get("note", {})
+        url = me(ctx, f"/notes/{note['id']}/files/{note['files'][0]['id']}/download")
+        print(c(f"\n{ICON_INFO} Range benchmark: {len(src)} byte {src.mime} file, chunk {fmt_size(chunk)}, x{repeat} @ {ctx.base_url}", Fore.WHITE))
+
+        for _ in range(repeat): # Pełne pobranie: punkt odniesienia
+            r, dl = http_download(ctx, "RANGE: Full download", url, h)
+            assert r.status_code == 200, f"Full download failed: {r.status_code}"
+            if not dl.matches(src): problems.append("full download differs from the uploaded file")
+            full_ms.append(dl.total_ms)
+            accept_ranges = r.headers.get("Accept-Ranges")
+
+        for _ in range(repeat):
+            for name, header, expect in range_cases(len(src), chunk):
+                r, dl = http_download(ctx, f"RANGE: {name}", url, {**h, "Range": header})
+                verdict, err = check_range(src, name, expect, r, dl)
+                st = cases.setdefault(name, {"range": header, "ms": [], "ttfb_ms": [], "bytes": dl.bytes, "verdicts": set(), "errors": []})
+                st["ms"].append(dl.total_ms)
+                st["ttfb_ms"].append(dl.ttfb_ms)
+                st["verdicts"].add(verdict)
+                if err and err not in st["errors"]: st["errors"].append(err)
+
+        # Wznawianie: cały plik kolejnymi zakresami po `chunk` (jak klient mobilny po zerwaniu połączenia)
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            chunks_ms, ok = [], True
+            for a in range(0, len(src), chunk):
+                b = min(a + chunk, len(src)) - 1
+                r, dl = http_download(ctx, "RANGE: Resume chunk", url, {**h, "Range": f"bytes={a}-{b}"})
+                chunks_ms.append(dl.total_ms)
+                verdict, err = check_range(src, "chunk", (a, b), r, dl)
+                if err or verdict != "206": # 200 z pełnym body to nie wznowienie, tylko ponowne pobranie całości
+                    ok = False
+                    break
+            resumable.append({"total_ms": (time.perf_counter() - t0) * 1000.0, "chunks": len(chunks_ms), "complete": ok,
+                              "p50_chunk_ms": percentile(chunks_ms, 50)})
+            if not ok: problems.append(f"chunked download failed at byte {a}: {r.status_code}")
+    except AssertionError as e:
+        problems.append(str(e))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        if token: http_delete(ctx, "RANGE: Delete bench profile", me(ctx, "/profile"), auth_headers(token))
+
+    rows = [["full download", "-", len(full_ms), f"{percentile(full_ms, 50):.1f}" if full_ms else "-", "-", "200", ""]]
+    for name, st in cases.items():
+        rows.append([name, st["range"], len(st["ms"]), f"{percentile(st['ms'], 50):.1f}", f"{percentile(st['ttfb_ms'], 50):.1f}",
+                     ",".join(sorted(st["verdicts"])), trim("; ".join(st["errors"]), 60)])
+    for i, rr in enumerate(resumable, 1):
+        rows.append([f"resumable #{i}", f"{rr['chunks']} x {fmt_size(chunk)}", rr["chunks"], f"{rr['total_ms']:.1f}",
+                     f"{rr['p50_chunk_ms']:.1f} (chunk p50)", "complete" if rr["complete"] else "FAILED", ""])
+    print(tabulate(rows, headers=["Case", "Range", "n", "p50 ms", "TTFB ms", "Result", "Problems"], tablefmt="grid"))
+
+    single = [st for name, st in cases.items() if name not in ("multi-range", "unsatisfiable")]
+    if single and all(v.startswith("ignored") for st in single for v in st["verdicts"]):
+        support = "ignored"
+        print(c(f" {ICON_FAIL} Server ignores Range: every ranged GET returned 200 with the full body (Accept-Ranges: {accept_ranges!r})", Fore.RED))
+    elif single and all(v == "206" for st in single for v in st["verdicts"]):
+        support = "supported"
+        multi = cases.get("multi-range", {}).get("verdicts", set())
+        print(c(f" {ICON_OK} Single ranges served as 206 (Accept-Ranges: {accept_ranges!r}); multi-range: {', '.join(sorted(multi)) or '-'}", Fore.GREEN))
+    else:
+        support = "partial"
+        print(c(f" {ICON_INFO} Range support is inconsistent across cases (Accept-Ranges: {accept_ranges!r})", Fore.YELLOW))
+    for st in cases.values():
+        problems += st["errors"]
+    if resumable and full_ms:
+        overhead = percentile([rr["total_ms"] for rr in resumable], 50) / percentile(full_ms, 50)
+        print(f" {ICON_DOWN} Chunked download / full download time: x{overhead:.2f}")
+    for p in problems[:10]:
+        print(c(f"  {ICON_FAIL} {trim(p, 160)}", Fore.RED))
+
+    write_json(os.path.join(ctx.output_dir, "RangeBenchmark.json"), {
+        "file_bytes": len(src) if "src" in locals() else None, "chunk": chunk, "repeat": repeat, "accept_ranges": accept_ranges,
+        "range_support": support, "full_download": {"n": len(full_ms), "p50_ms": percentile(full_ms, 50) if full_ms else None},
+        "cases": {k: {"range": v["range"], "n": len(v["ms"]), "p50_ms": percentile(v["ms"], 50), "p50_ttfb_ms": percentile(v["ttfb_ms"], 50),
+                      "bytes": v["bytes"], "results": sorted(v["verdicts"]), "errors": v["errors"]} for k, v in cases.items()},
+        "resumable": resumable, "problems": problems})
+    print(c(f"📄 Zapisano wyniki: {os.path.join(ctx.output_dir, 'RangeBenchmark.json')}", Fore.CYAN))
+    return 1 if problems or support != "supported" else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Benchmark kompresji odpowiedzi (tryb compression) ===
+# ──────────────────────────────────────────────────────────────────────
+
+def run_compression_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb compression: te same listy z Accept-Encoding identity/gzip/deflate/br; czas oraz rozmiar na łączu i po dekompresji."""
+    try:
+        manifest = load_seed_manifest(args.manifest)
+        encodings = [e.lower() for e in _csv_list(args.encodings) if e]
+        assert encodings, "--encodings must not be empty"
+    except (AssertionError, OSError, ValueError) as e:
+        print(c(f"{ICON_FAIL} {e}", Fore.RED))
+        return 2
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    users = {u["idx"]: u for u in manifest["users"]}
+    notes_per_user: Dict[int, int] = {}
+    for n in manifest["notes"]: notes_per_user[n["owner"]] = notes_per_user.get(n["owner"], 0) + 1
+    heavy = max(users, key=lambda i: (notes_per_user.get(i, 0), i)) # Największe listy = najwięcej do skompresowania
+    course = max(manifest["courses"], key=lambda c_: len(c_["members"]), default=None)
+    routes = [("GET /api/me/notes", heavy, me(ctx, "/notes?top=100")),
+              ("GET /api/me/dashboard", heavy, dashboard_url(ctx, {"limit": 50}))]
+    if course:
+        routes.append(("GET /api/courses/{id}/users", course["owner"], build(ctx, f"/api/courses/{course['id']}/users?status=all&per_page=100")))
+    rounds = max(3, args.compression_repeat)
+    print(c(f"\n{ICON_INFO} Compression benchmark: {len(routes)} routes x {len(encodings)} encodings x {rounds} rounds @ {ctx.base_url}", Fore.WHITE))
+    if any(e not in CLIENT_DECODABLE_ENCODINGS for e in encodings):
+        print(c(f"    Client decodes only: {', '.join(sorted(CLIENT_DECODABLE_ENCODINGS - {''}))} — decoded size of other encodings is taken from identity", Fore.YELLOW))
+
+    samples: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    problems: List[str] = []
+    try:
+        tokens = {idx: manifest_login(t, users[idx]) for idx in {u for _, u, _ in routes}}
+        pairs = [(name, user, url, enc) for name, user, url in routes for enc in encodings]
+        rng = random.Random(args.seed_random)
+        for rnd in range(rounds + 1): # Runda 0 = rozgrzanie, nie liczona
+            rng.shuffle(pairs) # Przeplot: dryf serwera rozkłada się równo na wszystkie kodowania
+            for name, user, url, enc in pairs:
+                r, dl = http_download(ctx, f"COMPRESSION: {name} [{enc}]", url, {**auth_headers(tokens[user]), "Accept-Encoding": enc})
+                if r.status_code != 200:
+                    problems.append(f"{name} [{enc}]: {r.status_code}")
+                    continue
+                if rnd == 0: continue
+                wire, decoded, served = body_sizes(r, dl)
+                st = samples.setdefault((name, enc), {"ms": [], "ttfb_ms": [], "wire": [], "decoded": [], "served": set()})
+                st["ms"].append(dl.total_ms)
+                st["ttfb_ms"].append(dl.ttfb_ms)
+                if wire is not None: st["wire"].append(wire)
+                if decoded is not None: st["decoded"].append(decoded)
+                st["served"].add(served or "identity")
+    except AssertionError as e:
+        problems.append(str(e))
+
+    results, rows = [], []
+    for name, _, _ in routes:
+        ident = samples.get((name, "identity"))
+        ident_ms = percentile(ident["ms"], 50) if ident else None
+        ident_bytes = percentile(ident["decoded"], 50) if ident and ident["decoded"] else None
+        for enc in encodings:
+            st = samples.get((name, enc))
+            if not st: continue
+            wire = percentile(st["wire"], 50) if st["wire"] else None
+            decoded = percentile(st["decoded"], 50) if st["decoded"] else ident_bytes
+            p50 = percentile(st["ms"], 50)
+            res = {"route": name, "requested": enc, "served": sorted(st["served"]), "n": len(st["ms"]), "p50_ms": p50,
+                   "p50_ttfb_ms": percentile(st["ttfb_ms"], 50), "wire_bytes": wire, "decoded_bytes": decoded,
+                   "ratio": (decoded / wire) if wire and decoded else None,
+                   "delta_ms_vs_identity": (p50 - ident_ms) if ident_ms is not None else None,
+                   "ignored": enc != "identity" and st["served"] == {"identity"}}
+            results.append(res)
+            rows.append([name, enc, ",".join(res["served"]) + (" (ignored)" if res["ignored"] else ""), res["n"], f"{p50:.1f}",
+                         f"{res['p50_ttfb_ms']:.1f}", "-" if wire is None else f"{wire / 1024:.1f}",
+                         "-" if decoded is None else f"{decoded / 1024:.1f}", "-" if res["ratio"] is None else f"x{res['ratio']:.1f}",
+                         "-" if res["delta_ms_vs_identity"] is None else f"{res['delta_ms_vs_identity']:+.1f}"])
+    print(tabulate(rows, headers=["Route", "Requested", "Served", "n", "p50 ms", "TTFB ms", "Wire KB", "Decoded KB", "Ratio", "Δ ms vs identity"],
+                   tablefmt="grid"))
+    ignored = [f"{r['route']} [{r['requested']}]" for r in results if r["ignored"]]
+    if ignored: # Kodowanie wyłączone w nginx/PHP albo odpowiedź poniżej gzip_min_length
+        print(c(f" {ICON_INFO} Server sent identity despite Accept-Encoding: {', '.join(ignored)}", Fore.YELLOW))
+    for p in problems[:10]:
+        print(c(f"  {ICON_FAIL} {trim(p, 160)}", Fore.RED))
+    write_json(os.path.join(ctx.output_dir, "CompressionBenchmark.json"), {"manifest": args.manifest, "rounds": rounds,
+                                                                           "results": results, "problems": problems})
+    print(c(f"📄 Zapisano wyniki: {os.path.join(ctx.output_dir, 'CompressionBenchmark.json')}", Fore.CYAN))
+    return 1 if problems else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Analiza payloadów JSON / over-fetching (tryb payload, --analyze-payloads) ===
+# ──────────────────────────────────────────────────────────────────────
+
+def _jlen(v: Any) -> int:
+    return len(json.dumps(v, ensure_ascii=False).encode("utf-8"))
+
+def json_profile(body: Any) -> Dict[str, Any]:
+    """Rozkłada body JSON (zapis kompaktowy) na wkład bajtowy ścieżek pól (indeksy list zwinięte do [])
+    i wykrywa obiekty powtarzające się w jednej odpowiedzi (ten sam obiekt zagnieżdżony wiele razy)."""
+    fields: Dict[str, int] = {}
+    seen: Dict[str, List[Any]] = {} # kanoniczny JSON obiektu -> [ścieżka, rozmiar, liczba, id]
+    lists: List[Tuple[int, int]] = [] # (bajty, elementy) każdej listy
+
+    def walk(node: Any, path: str) -> int:
+        if isinstance(node, dict):
+            size = 2 + max(0, len(node) - 1)
+            for k, v in node.items():
+                p = f"{path}.{k}" if path else k
+                part = _jlen(k) + 1 + walk(v, p) # Nazwa klucza też jest payloadem (powtarzana w każdym elemencie listy)
+                fields[p] = fields.get(p, 0) + part
+                size += part
+            if path and len(node) > 1:
+                key = json.dumps(node, sort_keys=True, ensure_ascii=False)
+                entry = seen.setdefault(key, [path, size, 0, node.get("id")])
+                entry[2] += 1
+            return size
+        if isinstance(node, list):
+            size = 2 + max(0, len(node) - 1) + sum(walk(x, f"{path}[]") for x in node)
+            lists.append((size, len(node)))
+            return size
+        return _jlen(node)
+
+    total = walk(body, "")
+    repeated = [{"path": p, "bytes": s, "count": n, "id": i, "wasted_bytes": (n - 1) * s}
+                for p, s, n, i in seen.values() if n > 1]
+    return {"bytes": total, "fields": fields, "repeated": repeated,
+            "items": max(lists)[1] if lists else 0} # Liczność kolekcji = najcięższa lista w odpowiedzi
+
+class PayloadAnalyzer:
+    """Agreguje profile JSON odpowiedzi per trasa (na żywo z http_request albo offline z Endpoints.jsonl)."""
+
+    def __init__(self):
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, route: str, body: Any, wire_bytes: Optional[int] = None):
+        prof = json_profile(body)
+        with self._lock:
+            st = self._routes.setdefault(route, {"bytes": [], "wire": [], "items": [], "fields": {}, "repeated": {}})
+            st["bytes"].append(prof["bytes"])
+            st["items"].append(prof["items"])
+            if wire_bytes is not None: st["wire"].append(wire_bytes)
+            for p, b in prof["fields"].items():
+                st["fields"][p] = st["fields"].get(p, 0) + b
+            for r in prof["repeated"]:
+                agg = st["repeated"].setdefault(r["path"], {"path": r["path"], "responses": 0, "occurrences": 0, "wasted_bytes": 0, "sample_id": r["id"]})
+                agg["responses"] += 1
+                agg["occurrences"] += r["count"]
+                agg["wasted_bytes"] += r["wasted_bytes"]
+
+    def report(self, top_fields: int = 5) -> Dict[str, Any]:
+        with self._lock:
+            routes = {k: {**v, "fields": dict(v["fields"]), "repeated": dict(v["repeated"])} for k, v in self._routes.items()}
+        out: Dict[str, Any] = {}
+        for route, st in routes.items():
+            total = sum(st["bytes"]) or 1
+            xs, ys = st["items"], st["bytes"]
+            slope = linear_slope(xs, ys)
+            base = (sum(ys) / len(ys)) - slope * (sum(xs) / len(xs))
+            # Pomija opakowania (np. 'data' = prawie całe body); zostają zagnieżdżone kolekcje i ich pola
+            fields = {p: b for p, b in st["fields"].items() if b / total < 0.9}
+            out[route] = {
+                "responses": len(ys), "p50_bytes": percentile(ys, 50), "p95_bytes": percentile(ys, 95), "max_bytes": max(ys),
+                "p50_wire_bytes": percentile(st["wire"], 50) if st["wire"] else None,
+                "p50_items": percentile(xs, 50), "bytes_per_item": slope if len(set(xs)) > 1 else None,
+                "base_bytes": base if len(set(xs)) > 1 else None,
+                "top_fields": [{"path": p, "bytes": b, "share": b / total}
+                               for p, b in sorted(fields.items(), key=lambda kv: -kv[1])[:top_fields]],
+                "repeated": sorted(st["repeated"].values(), key=lambda r: -r["wasted_bytes"])[:top_fields],
+            }
+        return out
+
+def print_payload_report(report: Dict[str, Any]):
+    """Drukuje rozkład rozmiarów per trasa, najcięższe pola, powtarzane obiekty i wzrost z licznością kolekcji."""
+    print(c(f"\n{BOX}\n{ICON_INFO} JSON PAYLOADS (over-fetching)\n{BOX}", Fore.YELLOW))
+    kb = lambda v: "-" if v is None else f"{v / 1024:.1f}"
+    ranked = sorted(report.items(), key=lambda kv: -kv[1]["p95_bytes"])
+    print(tabulate([[r, v["responses"], kb(v["p50_bytes"]), kb(v["p95_bytes"]), kb(v["max_bytes"]), kb(v["p50_wire_bytes"]),
+                     f"{v['p50_items']:.0f}", "-" if v["bytes_per_item"] is None else f"{v['bytes_per_item']:.0f}",
+                     kb(v["base_bytes"])] for r, v in ranked[:25]],
+                   headers=["Route", "n", "p50 KB", "p95 KB", "max KB", "wire p50 KB", "items p50", "B/item", "base KB"], tablefmt="grid"))
+    rows = [[r, f["path"], f"{f['share'] * 100:.0f}%", kb(f["bytes"] / v["responses"])]
+            for r, v in ranked[:10] for f in v["top_fields"][:3] if f["share"] >= 0.05]
+    if rows:
+        print(tabulate(rows, headers=["Route", "Field", "Share of bytes", "KB / response"], tablefmt="grid"))
+    rows = [[r, x["path"], x["sample_id"], x["occurrences"], x["responses"], kb(x["wasted_bytes"] / x["responses"])]
+            for r, v in ranked for x in v["repeated"][:3]]
+    if rows:
+        print(tabulate(rows, headers=["Route", "Repeated object", "e.g. id", "Occurrences", "Responses", "Dup KB / response"], tablefmt="grid"))
+
+def endpoint_json_body(el: EndpointLog) -> Any:
+    """Body JSON z EndpointLog (zmaskowane) albo None dla odpowiedzi nie-JSON / obciętych."""
+    if not el.resp_bytes or "application/json" not in (el.resp_content_type or "").lower():
+        return None
+    try:
+        return mask_json_sensitive(json.loads(el.resp_bytes))
+    except ValueError:
+        return None
+
+def write_endpoints_jsonl(ctx: TestContext) -> str:
+    """Zapisuje przebieg (EndpointLog + zmaskowane body JSON) do Endpoints.jsonl — wejście dla --mode payload."""
+    path = os.path.join(ctx.output_dir, "Endpoints.jsonl")
+    with open(path, "w", encoding="utf-8") as f:
+        for el in ctx.endpoints:
+            f.write(json.dumps({"title": el.title, "method": el.method, "url": el.url, "route": route_key(el.method, el.url),
+                                "status": el.resp_status, "content_type": el.resp_content_type, "duration_ms": round(el.duration_ms, 2),
+                                "wire_bytes": el.resp_wire_bytes, "decoded_bytes": el.resp_decoded_bytes,
+                                "content_encoding": el.resp_content_encoding, "body": endpoint_json_body(el)}, ensure_ascii=False) + "\n")
+    return path
+
+def report_payloads(ctx: TestContext):
+    report = ctx.payloads.report()
+    print_payload_report(report)
+    write_json(os.path.join(ctx.output_dir, "PayloadReport.json"), report)
+    print(c(f"📄 Zapisano analizę payloadów: {os.path.join(ctx.output_dir, 'PayloadReport.json')}", Fore.CYAN))
+
+def run_payload_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb payload (offline): analiza Endpoints.jsonl z wcześniejszego przebiegu e2e, bez żądań do API."""
+    path = args.from_run or ""
+    if os.path.isdir(path): path = os.path.join(path, "Endpoints.jsonl")
+    if not os.path.isfile(path):
+        print(c(f"{ICON_FAIL} --from-run must point to a results directory or Endpoints.jsonl (got {args.from_run!r})", Fore.RED))
+        return 2
+    ctx.payloads = PayloadAnalyzer()
+    used = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            if rec.get("body") is not None and rec.get("status") == 200:
+                ctx.payloads.add(rec["route"], rec["body"], rec.get("wire_bytes"))
+                used += 1
+    print(c(f"\n{ICON_INFO} Payload analysis of {used} JSON responses from {path}", Fore.WHITE))
+    report_payloads(ctx)
+    ctx.payloads = None # Raport już zapisany (main nie powtarza go po trybie)
+    return 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Wyścigi współbieżne na limitach i operacjach idempotentnych (tryb races) ===
+# ──────────────────────────────────────────────────────────────────────
+
+RACE_SCENARIOS = ("questions", "answers", "reject", "invite_block", "share", "unshare")
+QUESTION_LIMIT, ANSWER_LIMIT, REJECTION_LIMIT = 20, 4, 3
+
+def race_burst(ctx: TestContext, n: int, title: str, method: str, url: str, headers: Dict[str, str],
+               body_fn: Optional[Callable[[int], Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Wysyła n żądań jednocześnie: każdy wątek rozgrzewa własne połączenie, a potem czeka na wspólnej barierze.
+
+    Zwraca [{status, ms, start_ms}] — start_ms względem pierwszego startu (rozrzut startów = jakość synchronizacji)."""
+    barrier = threading.Barrier(n)
+    out: List[Optional[Dict[str, Any]]] = [None] * n
+
+    def _fire(i: int):
+        c_ = fork_context(ctx)
+        c_.record_endpoints = False
+        try:
+            http_get(c_, "RACE: Warm-up", me(c_, "/profile"), headers)
+        except Exception:
+            pass
+        try:
+            barrier.wait(timeout=c_.timeout)
+        except threading.BrokenBarrierError:
+            pass
+        t0 = time.perf_counter()
+        try:
+            r = http_request(c_, title, method, url, headers=headers, json_body=body_fn(i) if body_fn else None)
+            out[i] = {"status": r.status_code, "ms": (time.perf_counter() - t0) * 1000.0, "t0": t0}
+        except Exception as ex:
+            out[i] = {"status": None, "ms": (time.perf_counter() - t0) * 1000.0, "t0": t0, "error": f"{type(ex).__name__}: {ex}"}
+
+    threads = [threading.Thread(target=_fire, args=(i,), name=f"race-{i}", daemon=True) for i in range(n)]
+    for th in threads: th.start()
+    for th in threads:
+        while th.is_alive(): th.join(timeout=0.5)
+    first = min(o["t0"] for o in out if o)
+    for o in out:
+        if o: o["start_ms"] = (o.pop("t0") - first) * 1000.0
+    return [o for o in out if o]
+
+def race_outcome(name: str, shots: List[Dict[str, Any]], expected_ok: int, slipped: int,
+                 invariant: bool, detail: str, solo_ms: List[float]) -> Dict[str, Any]:
+    statuses = [s["status"] for s in shots]
+    return {
+        "scenario": name, "burst": len(shots), "expected_ok": expected_ok,
+        "ok": sum(1 for s in statuses if s and 200 <= s < 300),
+        "rejected": sum(1 for s in statuses if s and 400 <= s < 500),
+        "errors": sum(1 for s in statuses if is_error_status(s) and not (s and 400 <= s < 500)),
+        "statuses": {str(k): statuses.count(k) for k in sorted(set(statuses), key=str)},
+        "slipped": slipped, "invariant": invariant, "detail": detail,
+        "burst_ms": [s["ms"] for s in shots], "solo_ms": solo_ms,
+        "start_spread_ms": max((s["start_ms"] for s in shots), default=0.0),
+    }
+
+def _items_of(body: Any, key: str) -> List[Any]:
+    items = body if isinstance(body, list) else (body or {}).get(key, [])
+    return items if isinstance(items, list) else []
+
+def race_quiz_limits(t: E2ETester, token: str, n: int, headroom: int, wanted: List[str]) -> List[Dict[str, Any]]:
+    """Limity quizu: burst odpowiedzi na pytanie z 1 odpowiedzią i burst pytań na teście z (20 - headroom) pytaniami."""
+    ctx, hdr, results = t.ctx, auth_headers(token), []
+    r = http_post_json(ctx, "RACE: Create test", me(ctx, "/tests"), {"title": "Race Test", "description": "race", "status": "private"}, hdr)
+    assert r.status_code == 201, f"Create test failed: {r.status_code} {trim(r.text)}"
+    test_id = must_json(r).get("test", {}).get("id") or must_json(r).get("id")
+    url_q = me(ctx, f"/tests/{test_id}/questions")
+    try:
+        prefill = QUESTION_LIMIT - max(0, min(headroom, QUESTION_LIMIT - 1))
+        solo_q: List[float] = []
+        q1 = None
+        for i in range(1, prefill + 1):
+            ms, r = timed(http_post_json, ctx, "RACE: Prefill question", url_q, {"question": f"Prefill {i}?"}, hdr)
+            assert r.status_code == 201, f"Prefill question {i} failed: {r.status_code} {trim(r.text)}"
+            solo_q.append(ms)
+            q1 = q1 or must_json(r).get("question", {}).get("id")
+
+        if "answers" in wanted:
+            url_a = me(ctx, f"/tests/{test_id}/questions/{q1}/answers")
+            ms, r = timed(http_post_json, ctx, "RACE: First correct answer", url_a, {"answer": "A0", "is_correct": True}, hdr)
+            assert r.status_code == 201, f"First answer failed: {r.status_code} {trim(r.text)}"
+            shots = race_burst(ctx, n, "RACE: Answer burst", "POST", url_a, hdr, lambda i: {"answer": f"A{i + 1}", "is_correct": False})
+            count = len(_items_of(must_json(http_get(ctx, "RACE: Count answers", url_a, hdr)), "answers"))
+            room = ANSWER_LIMIT - 1
+            ok = sum(1 for s in shots if s["status"] == 201)
+            results.append(race_outcome("answers", shots, min(n, room), max(0, count - ANSWER_LIMIT),
+                                        count <= ANSWER_LIMIT and ok == count - 1,
+                                        f"{count} answers stored (limit {ANSWER_LIMIT}), {ok} accepted", [ms]))
+
+        if "questions" in wanted:
+            room = QUESTION_LIMIT - prefill
+            shots = race_burst(ctx, n, "RACE: Question burst", "POST", url_q, hdr, lambda i: {"question": f"Race {i}?"})
+            count = len(_items_of(must_json(http_get(ctx, "RACE: Count questions", url_q, hdr)), "questions"))
+            ok = sum(1 for s in shots if s["status"] == 201)
+            results.append(race_outcome("questions", shots, min(n, room), max(0, count - QUESTION_LIMIT),
+                                        count <= QUESTION_LIMIT and ok == count - prefill,
+                                        f"{count} questions stored (limit {QUESTION_LIMIT}), {ok} accepted", solo_q))
+    finally:
+        http_delete(ctx, "RACE: Delete test", me(ctx, f"/tests/{test_id}"), hdr)
+    return results
+
+def race_invitations(t: E2ETester, owner: str, invitee: Tuple[str, str], n: int, wanted: List[str]) -> List[Dict[str, Any]]:
+    """Blokada po 3 odrzuceniach: burst odrzuceń tego samego zaproszenia (3.), potem burst zaproszeń (wszystkie 422)."""
+    ctx, results = t.ctx, []
+    email, token_c = invitee
+    course_id = t._create_course("RACE: Create course (invites)", owner, "Race Invites")
+    url_invite = build(ctx, f"/api/courses/{course_id}/invite-user")
+    try:
+        for _ in range(REJECTION_LIMIT - 1):
+            t._invite_user("RACE: Invite", owner, email, "member", course_id)
+            t._reject_invite("RACE: Reject", token_c, course_id)
+        t._invite_user("RACE: Invite", owner, email, "member", course_id)
+        inv_token = t._find_pending_invite_token("RACE: Find invite", token_c, course_id)
+        url_reject = build(ctx, f"/api/invitations/{inv_token}/reject")
+
+        shots = race_burst(ctx, n, "RACE: Reject burst", "POST", url_reject, auth_headers(token_c), lambda i: {})
+        invites = _items_of(must_json(http_get(ctx, "RACE: Received invites", me(ctx, "/invitations-received"), auth_headers(token_c))), "invitations")
+        rejected = sum(1 for i in invites if i.get("course_id") == course_id and i.get("status") == "rejected")
+        ok = sum(1 for s in shots if s["status"] == 200)
+        solo = [timed(http_post_json, ctx, "RACE: Reject again", url_reject, {}, auth_headers(token_c))[0] for _ in range(3)]
+        if "reject" in wanted:
+            results.append(race_outcome("reject", shots, 1, max(0, ok - 1), ok == 1 and rejected == REJECTION_LIMIT,
+                                        f"{ok} rejects accepted for one invitation, {rejected} rejected invitations", solo))
+
+        if "invite_block" in wanted:
+            payload = {"email": email, "role": "member"}
+            shots = race_burst(ctx, n, "RACE: Invite burst (blocked)", "POST", url_invite, auth_headers(owner), lambda i: payload)
+            invites = _items_of(must_json(http_get(ctx, "RACE: Received invites", me(ctx, "/invitations-received"), auth_headers(token_c))), "invitations")
+            pending = sum(1 for i in invites if i.get("course_id") == course_id and i.get("status") == "pending")
+            ok = sum(1 for s in shots if s["status"] and 200 <= s["status"] < 300)
+            solo = [timed(http_post_json, ctx, "RACE: Invite (blocked)", url_invite, payload, auth_headers(owner))[0] for _ in range(3)]
+            results.append(race_outcome("invite_block", shots, 0, ok, ok == 0 and pending == 0,
+                                        f"{ok} invitations created after {REJECTION_LIMIT} rejections, {pending} pending", solo))
+    finally:
+        t._delete_course("RACE: Delete course (invites)", owner, course_id)
+    return results
+
+def race_sharing(t: E2ETester, owner: str, n: int, wanted: List[str]) -> List[Dict[str, Any]]:
+    """Idempotentne share/unshare notatki: burst tych samych żądań ma dać 200 i dokładnie jedno (lub zero) powiązań."""
+    ctx, hdr, results = t.ctx, auth_headers(owner), []
+    course_id = t._create_course("RACE: Create course (share)", owner, "Race Share")
+    note_id = t._create_note("RACE: Create note", owner, "Race Note")
+    url_share = me(ctx, f"/notes/{note_id}/share/{course_id}")
+    url_note = me(ctx, f"/notes/{note_id}")
+
+    def _note_state() -> Tuple[List[Any], Any]:
+        note = must_json(http_get(ctx, "RACE: Note state", url_note, hdr))
+        note = note.get("note", note)
+        return [x.get("id") for x in (note.get("courses") or []) if isinstance(x, dict)], note.get("is_private")
+
+    try:
+        shots = race_burst(ctx, n, "RACE: Share burst", "POST", url_share, hdr, lambda i: {})
+        courses, _ = _note_state()
+        solo = [timed(http_post_json, ctx, "RACE: Share again", url_share, {}, hdr)[0] for _ in range(3)]
+        if "share" in wanted:
+            non_ok = sum(1 for s in shots if s["status"] != 200)
+            results.append(race_outcome("share", shots, n, non_ok + max(0, len(courses) - 1), non_ok == 0 and courses == [course_id],
+                                        f"note linked {courses.count(course_id)}x to the course, {non_ok} non-200", solo))
+
+        if "unshare" in wanted:
+            shots = race_burst(ctx, n, "RACE: Unshare burst", "DELETE", url_share, hdr)
+            courses, is_private = _note_state()
+            solo = [timed(http_delete, ctx, "RACE: Unshare again", url_share, hdr)[0] for _ in range(3)]
+            non_ok = sum(1 for s in shots if s["status"] != 200)
+            results.append(race_outcome("unshare", shots, n, non_ok + len(courses), non_ok == 0 and not courses and is_private in (True, 1),
+                                        f"{len(courses)} links left, is_private={is_private}, {non_ok} non-200", solo))
+    finally:
+        http_delete(ctx, "RACE: Delete note", url_note, hdr)
+        t._delete_course("RACE: Delete course (share)", owner, course_id)
+    return results
+
+def summarize_races(outcomes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Agreguje rundy per scenariusz; wait_ms ≈ p50 w burście − p50 tego samego żądania wysłanego sekwencyjnie."""
+    out = []
+    for name in RACE_SCENARIOS:
+        runs = [o for o in outcomes if o["scenario"] == name]
+        if not runs: continue
+        burst = [ms for o in runs for ms in o["burst_ms"]]
+        solo = [ms for o in runs for ms in o["solo_ms"]]
+        out.append({
+            "scenario": name, "rounds": len(runs), "burst": runs[0]["burst"],
+            "expected_ok": runs[0]["expected_ok"], "ok": [o["ok"] for o in runs],
+            "rejected": sum(o["rejected"] for o in runs), "errors": sum(o["errors"] for o in runs),
+            "slipped": sum(o["slipped"] for o in runs), "violations": sum(1 for o in runs if not o["invariant"]),
+            "solo_p50_ms": percentile(solo, 50), "burst_p50_ms": percentile(burst, 50),
+            "burst_p95_ms": percentile(burst, 95), "burst_max_ms": max(burst, default=0.0),
+            "wait_ms": percentile(burst, 50) - percentile(solo, 50) if solo else None,
+            "start_spread_ms": max(o["start_spread_ms"] for o in runs),
+            "details": [o["detail"] for o in runs if not o["invariant"]][:5],
+        })
+    return out
+
+def run_races_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb races: limity i operacje idempotentne pod jednoczesnym burstem żądań (check-then-insert)."""
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    n = max(2, args.race_burst)
+    wanted = [s for s in _csv_list(args.race_scenarios) if s in RACE_SCENARIOS] or list(RACE_SCENARIOS)
+    outcomes: List[Dict[str, Any]] = []
+    problems: List[str] = []
+    created: List[Tuple[str, str]] = []
+    print(c(f"\n{ICON_INFO} Race scenarios: {', '.join(wanted)}; burst {n} x {args.race_rounds} rounds @ {ctx.base_url}", Fore.WHITE))
+    try:
+        with muted_console():
+            email_a, pwd_a, owner = t._setup_register_and_login("RaceOwner", "raceowner")
+            created.append((email_a, pwd_a))
+            invitee: Optional[Tuple[str, str]] = None
+            if {"reject", "invite_block"} & set(wanted):
+                email_c, pwd_c, token_c = t._setup_register_and_login("RaceInvitee", "raceinvitee")
+                created.append((email_c, pwd_c))
+                invitee = (email_c, token_c)
+        for rnd in range(1, max(1, args.race_rounds) + 1):
+            for group, fn in (({"questions", "answers"}, lambda: race_quiz_limits(t, owner, n, args.race_headroom, wanted)),
+                              ({"reject", "invite_block"}, lambda: race_invitations(t, owner, invitee, n, wanted)),
+                              ({"share", "unshare"}, lambda: race_sharing(t, owner, n, wanted))):
+                if not group & set(wanted): continue
+                try:
+                    with muted_console():
+                        got = fn()
+                except AssertionError as e:
+                    problems.append(f"round {rnd} {'/'.join(sorted(group))}: setup failed: {e}")
+                    continue
+                outcomes += got
+                for o in got:
+                    mark = c(ICON_OK, Fore.GREEN) if o["invariant"] else c(ICON_FAIL, Fore.RED)
+                    print(f" {mark} round {rnd} {o['scenario']}: {o['detail']} {trim(o['statuses'], 80)}")
+    except AssertionError as e:
+        problems.append(f"setup failed: {e}")
+    finally:
+        for e, p in created:
+            try:
+                with muted_console():
+                    tok = t._login_user("RACE: Login for cleanup", e, p, "tokenOwner")["token"]
+                http_delete(ctx, "RACE: Delete profile", me(ctx, "/profile"), auth_headers(tok))
+            except Exception:
+                pass
+
+    summary = summarize_races(outcomes)
+    rows = [[s["scenario"], s["rounds"], s["burst"], f"{'/'.join(map(str, s['ok']))} ({s['expected_ok']})", s["rejected"], s["errors"],
+             c(str(s["slipped"]), Fore.RED) if s["slipped"] else "0", c(str(s["violations"]), Fore.RED) if s["violations"] else "0",
+             f"{s['solo_p50_ms']:.1f}", f"{s['burst_p50_ms']:.1f}", f"{s['burst_p95_ms']:.1f}",
+             "-" if s["wait_ms"] is None else f"{s['wait_ms']:.1f}", f"{s['start_spread_ms']:.1f}"] for s in summary]
+    print(tabulate(rows, headers=["Scenario", "Rounds", "Burst", "OK (exp)", "4xx", "5xx/err", "Slipped", "Violations",
+                                  "Solo p50", "Burst p50", "Burst p95", "Wait ≈", "Start spread"], tablefmt="grid"))
+    for s in summary:
+        for d in s["details"]:
+            problems.append(f"{s['scenario']}: {d}")
+        if s["errors"]:
+            problems.append(f"{s['scenario']}: {s['errors']} server errors under concurrency")
+    for p in problems[:10]:
+        print(c(f"  {ICON_FAIL} {p}", Fore.RED))
+    path = os.path.join(ctx.output_dir, "RaceScenarios.json")
+    write_json(path, {"burst": n, "rounds": args.race_rounds, "summary": summary, "runs": outcomes, "problems": problems})
+    print(c(f"📄 Zapisano wyniki: {path}", Fore.CYAN))
+    return 1 if problems else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Rywalizacja o jeden popularny kurs (tryb contention) ===
+# ──────────────────────────────────────────────────────────────────────
+
+CONTENTION_OPS = ("share", "role", "notes", "leave")
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """'share=3,role=1,notes=4,leave=1' -> wagi operacji (nieznane i zerowe pomijane)."""
+    mix: Dict[str, float] = {}
+    for part in _csv_list(spec):
+        name, _, w = part.partition("=")
+        if name in CONTENTION_OPS and float(w or 1) > 0:
+            mix[name] = float(w or 1)
+    return mix or {op: 1.0 for op in CONTENTION_OPS}
+
+class ContentionMember:
+    """Członek kursu obsługiwany wyłącznie przez jeden wątek na danym poziomie współbieżności."""
+    def __init__(self, email: str, pwd: str, token: str, note_id: int):
+        self.email, self.pwd, self.token, self.note_id = email, pwd, token, note_id
+        self.user_id: Optional[int] = None
+        self.shared = False
+        self.role = "member"
+
+def contention_join(t: E2ETester, owner: str, m: ContentionMember, course_id: int):
+    t._invite_user("CONTENTION: Invite member", owner, m.email, "member", course_id)
+    t._accept_invite("CONTENTION: Accept invite", m.token, course_id)
+    m.shared, m.role = False, "member"
+
+def contention_op(t: E2ETester, op: str, owner: str, m: ContentionMember, course_id: int) -> List[Tuple[str, float, bool]]:
+    """Wykonuje jedną operację na kursie; zwraca próbki [(etykieta, ms, ok)]. share przełącza share/unshare notatki członka."""
+    ctx = t.ctx
+    if op == "share":
+        url = me(ctx, f"/notes/{m.note_id}/share/{course_id}")
+        if m.shared:
+            ms, r = timed(http_delete, ctx, "CONTENTION: Unshare note", url, auth_headers(m.token))
+            op = "unshare"
+        else:
+            ms, r = timed(http_post_json, ctx, "CONTENTION: Share note", url, {}, auth_headers(m.token))
+        ok = r.status_code == 200
+        if ok: m.shared = not m.shared
+        return [(op, ms, ok)]
+    if op == "role":
+        role = "moderator" if m.role == "member" else "member"
+        url = build(ctx, f"/api/courses/{course_id}/users/{m.user_id}/role")
+        ms, r = timed(http_patch_json, ctx, "CONTENTION: Change role", url, {"role": role}, auth_headers(owner))
+        if r.status_code == 200: m.role = role
+        return [(op, ms, r.status_code == 200)]
+    if op == "notes":
+        ms, r = timed(http_get, ctx, "CONTENTION: Course notes", build(ctx, f"/api/courses/{course_id}/notes"), auth_headers(m.token))
+        return [(op, ms, r.status_code == 200)]
+    ms, r = timed(http_delete, ctx, "CONTENTION: Leave course", build(ctx, f"/api/courses/{course_id}/leave"), auth_headers(m.token))
+    if r.status_code != 200:
+        return [(op, ms, False)]
+    t0 = time.perf_counter()
+    contention_join(t, owner, m, course_id) # Powrót do kursu (mierzony osobno jako rejoin)
+    return [(op, ms, True), ("rejoin", (time.perf_counter() - t0) * 1000.0, True)]
+
+def run_contention_level(ctx: TestContext, owner: str, members: List[ContentionMember], course_id: int,
+                         level: int, duration_s: float, mix: Dict[str, float], seed: int) -> Dict[str, Any]:
+    """level wątków przez duration_s sekund; wątek w obsługuje członków members[w::level]."""
+    lock = threading.Lock()
+    lat: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    failures: List[str] = []
+    ops, weights = list(mix), list(mix.values())
+    deadline = time.time() + duration_s
+
+    def _worker(w: int):
+        c_ = fork_context(ctx)
+        c_.record_endpoints = False
+        tw = E2ETester(c_)
+        rng = random.Random(seed * 1000 + w)
+        own = members[w::level]
+        while time.time() < deadline:
+            m = rng.choice(own)
+            op = rng.choices(ops, weights)[0]
+            try:
+                samples = contention_op(tw, op, owner, m, course_id)
+            except AssertionError as e:
+                label = "rejoin" if op == "leave" else op # Przy leave asercja pochodzi z ponownego dołączenia
+                with lock:
+                    errors[label] = errors.get(label, 0) + 1
+                    if len(failures) < 20: failures.append(str(e))
+                continue
+            with lock:
+                for label, ms, ok in samples:
+                    lat.setdefault(label, []).append(ms)
+                    if not ok: errors[label] = errors.get(label, 0) + 1
+
+    t0 = time.time()
+    with muted_console():
+        threads = [threading.Thread(target=_worker, args=(w,), name=f"contention-{w}", daemon=True) for w in range(level)]
+        for th in threads: th.start()
+        for th in threads:
+            while th.is_alive(): th.join(timeout=0.5)
+    elapsed = time.time() - t0
+    per_op = {op: {"n": len(v), "errors": errors.get(op, 0), "per_s": len(v) / elapsed,
+                   "p50_ms": percentile(v, 50), "p95_ms": percentile(v, 95), "p99_ms": percentile(v, 99)}
+              for op, v in sorted(lat.items())}
+    total = sum(len(v) for v in lat.values())
+    return {"level": level, "elapsed_s": elapsed, "ops": total, "ops_per_s": total / elapsed if elapsed else 0.0,
+            "errors": sum(errors.values()), "per_op": per_op, "failures": failures}
+
+def run_contention_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb contention: wielu członków jednego kursu równolegle udostępnia notatki, zmienia role, listuje i opuszcza kurs."""
+    ctx.record_endpoints = False
+    t = E2ETester(ctx)
+    levels = sorted({max(1, int(x)) for x in _csv_list(args.contention_levels)}) or [1]
+    mix = parse_mix(args.contention_mix)
+    n_members = max(args.contention_members, levels[-1])
+    members: List[ContentionMember] = []
+    created: List[Tuple[str, str]] = []
+    course_id: Optional[int] = None
+    results: List[Dict[str, Any]] = []
+    problems: List[str] = []
+    print(c(f"\n{ICON_INFO} Contention on one course: {n_members} members, levels {levels}, "
+            f"{args.contention_duration:.0f}s each, mix {mix} @ {ctx.base_url}", Fore.WHITE))
+    try:
+        with muted_console():
+            email_o, pwd_o, owner = t._setup_register_and_login("ContentionOwner", "contentionowner")
+            created.append((email_o, pwd_o))
+            course_id = t._create_course("CONTENTION: Create hot course", owner, "Hot Course")
+            for i in range(1, n_members + 1):
+                e, p, tok = t._setup_register_and_login(f"ContentionMember{i}", f"contentionmember{i}")
+                created.append((e, p))
+                m = ContentionMember(e, p, tok, t._create_note("CONTENTION: Create member note", tok, f"Contention Note {i}"))
+                contention_join(t, owner, m, course_id)
+                m.user_id = t._course_get_id_by_email(e, course_id, owner)
+                members.append(m)
+        for level in levels:
+            res = run_contention_level(ctx, owner, members, course_id, level, args.contention_duration, mix, args.seed_random)
+            results.append(res)
+            print(f" {ICON_CLOCK} {level:>3} workers: {res['ops_per_s']:.1f} ops/s, {res['errors']} errors")
+            problems += [f"level {level}: {f}" for f in res["failures"][:3]]
+    except AssertionError as e:
+        problems.append(f"setup failed: {e}")
+    finally:
+        with muted_console():
+            if course_id and created:
+                try: t._delete_course("CONTENTION: Delete hot course", t._login_user("CONTENTION: Login owner", created[0][0], created[0][1], "tokenOwner")["token"], course_id)
+                except Exception: pass
+            for e, p in created:
+                try:
+                    tok = t._login_user("CONTENTION: Login for cleanup", e, p, "tokenOwner")["token"]
+                    http_delete(ctx, "CONTENTION: Delete profile", me(ctx, "/profile"), auth_headers(tok))
+                except Exception:
+                    pass
+
+    if results:
+        base = results[0]
+        rows = []
+        for res in results:
+            speedup = res["ops_per_s"] / base["ops_per_s"] if base["ops_per_s"] else 0.0
+            res["speedup"] = speedup
+            res["efficiency"] = speedup / (res["level"] / base["level"])
+            rows.append([res["level"], f"{res['ops_per_s']:.1f}", f"{speedup:.2f}x", f"{res['efficiency'] * 100:.0f}%", res["errors"]]
+                        + [f"{res['per_op'][op]['p50_ms']:.0f}/{res['per_op'][op]['p95_ms']:.0f}" if op in res["per_op"] else "-"
+                           for op in ("share", "unshare", "role", "notes", "leave", "rejoin")])
+        print(tabulate(rows, headers=["Workers", "ops/s", "Speedup", "Efficiency", "Errors", "share p50/p95", "unshare",
+                                      "role", "notes", "leave", "rejoin"], tablefmt="grid"))
+        # Punkt zapalny: operacja, której p95 rośnie najszybciej od najniższego do najwyższego poziomu
+        growth = {op: results[-1]["per_op"][op]["p95_ms"] / base["per_op"][op]["p95_ms"]
+                  for op in results[-1]["per_op"] if op in base["per_op"] and base["per_op"][op]["p95_ms"]}
+        for op, g in sorted(growth.items(), key=lambda kv: -kv[1])[:3]:
+            print(f" {ICON_LOCK} p95 growth {op}: x{g:.1f} ({base['level']} -> {results[-1]['level']} workers)")
+    else:
+        growth = {}
+    for p in problems[:10]:
+        print(c(f"  {ICON_FAIL} {p}", Fore.RED))
+    path = os.path.join(ctx.output_dir, "ContentionBenchmark.json")
+    write_json(path, {"members": n_members, "mix": mix, "levels": results, "p95_growth": growth, "problems": problems})
+    print(c(f"📄 Zapisano wyniki: {path}", Fore.CYAN))
+    return 1 if problems or any(r["errors"] for r in results) else 0
+
+# ──────────────────────────────────────────────────────────────────────
+# === Sprzątanie pozostałości po wcześniejszych przebiegach (tryb sweep) ===
+# ──────────────────────────────────────────────────────────────────────
+
+HARNESS_EMAIL_RE = re.compile(r"^[a-z0-9_]+\.[a-z0-9]{8}@example\.com$", re.IGNORECASE) # rnd_email()
+
+def collect_run_accounts(paths: List[str]) -> Tuple[Dict[str, str], List[str]]:
+    """Konta z Resources.jsonl i SeedManifest.json w podanych plikach/katalogach (rekurencyjnie): email -> hasło."""
+    files: List[str] = []
+    for p in paths:
+        if os.path.isfile(p):
+            files.append(p)
+        for root, _, names in os.walk(p):
+            files += [os.path.join(root, n) for n in names if n in (RESOURCE_JOURNAL, "SeedManifest.json")]
+    accounts: Dict[str, str] = {}
+    for f in sorted(set(files), key=os.path.getmtime): # Późniejsze wpisy (zmiana hasła/emaila) wygrywają
+        try:
+            if f.endswith(".jsonl"):
+                with open(f, "r", encoding="utf-8") as fh:
+                    for line in fh:
+                        rec = json.loads(line)
+                        accounts.pop(rec.get("renamed_from") or "", None)
+                        accounts[rec["email"]] = rec.get("password", "")
+            else:
+                with open(f, "r", encoding="utf-8") as fh:
+                    for u in json.load(fh).get("users", []):
+                        accounts[u["email"]] = u.get("password", "")
+        except (OSError, ValueError, KeyError) as e:
+            print(c(f"  {ICON_FAIL} Skipping {f}: {e}", Fore.YELLOW))
+    return accounts, files
+
+def enumerate_account(ctx: TestContext, reg: ResourceRegistry, email: str, pwd: str, storage: bool) -> Dict[str, Any]:
+    """Loguje konto i wpisuje do rejestru jego notatki, testy, posiadane kursy i profil; liczy wiersze i bajty plików."""
+    r = http_post_json(ctx, "SWEEP: Login", build(ctx, "/api/login"), {"email": email, "password": pwd}, {"Accept": "application/json"})
+    if r.status_code != 200:
+        return {"email": email, "status": "gone" if r.status_code in (401, 404, 422) else f"login {r.status_code}"}
+    token = must_json(r).get("token")
+    h = auth_headers(token)
+    rows = {"notes": 0, "note_files": 0, "tests": 0, "questions": 0, "courses": 0}
+    file_bytes = 0
+    prof = must_json(http_get(ctx, "SWEEP: Profile", me(ctx, "/profile"), h))
+    my_id = (prof.get("user") or prof).get("id")
+    for page in range(10000):
+        body = must_json(http_get(ctx, "SWEEP: Notes page", _page_url(me(ctx, "/notes"), "skip", 100, page), h))
+        notes = body.get("data", []) if isinstance(body, dict) else []
+        for n in notes:
+            reg.add("note", n["id"], email)
+            rows["notes"] += 1
+            for f in n.get("files") or []:
+                rows["note_files"] += 1
+                if storage:
+                    rh = http_request(ctx, "SWEEP: File size", "HEAD", me(ctx, f"/notes/{n['id']}/files/{f['id']}/download"), h)
+                    file_bytes += int(rh.headers.get("Content-Length") or 0) if rh.status_code == 200 else 0
+        if len(notes) < 100: break
+    for t in _items_of(must_json(http_get(ctx, "SWEEP: Tests", me(ctx, "/tests"), h)), "tests"):
+        reg.add("test", t["id"], email)
+        rows["tests"] += 1
+        rows["questions"] += int(t.get("questions_count") or len(t.get("questions") or []))
+    for co in _items_of(must_json(http_get(ctx, "SWEEP: Courses", me(ctx, "/courses"), h)), "courses"):
+        if co.get("user_id") in (None, my_id): # Tylko własne kursy (lista obejmuje też członkostwa)
+            reg.add("course", co["id"], email)
+            rows["courses"] += 1
+    reg.add("user", email, email)
+    return {"email": email, "status": "found", "rows": rows, "file_bytes": file_bytes}
+
+def run_sweep_mode(ctx: TestContext, args: argparse.Namespace) -> int:
+    """Tryb sweep: konta z zapisanych przebiegów (Resources.jsonl, SeedManifest.json) są usuwane razem z ich danymi."""
+    ctx.record_endpoints = False
+    accounts, files = collect_run_accounts(_csv_list(args.sweep_from))
+    skipped = sorted(e for e in accounts if not (args.sweep_any or HARNESS_EMAIL_RE.match(e)))
+    todo = sorted((e, p) for e, p in accounts.items() if e not in skipped)
+    print(c(f"\n{ICON_TRASH} Sweep: {len(todo)} harness accounts from {len(files)} run files "
+            f"({len(skipped)} skipped: not rnd_email addresses) @ {ctx.base_url}", Fore.WHITE))
+    reg = ResourceRegistry(ctx.me_prefix)
+    reg.creds.update(accounts)
+    found: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    queue: Deque[Tuple[str, str]] = deque(todo)
+    t0 = time.time()
+
+    def _work():
+        c_ = fork_context(ctx)
+        c_.resources = None
+        while True:
+            with lock:
+                if not queue: return
+                email, pwd = queue.popleft()
+            try:
+                res = enumerate_account(c_, reg, email, pwd, not args.sweep_no_storage)
+            except Exception as e:
+                res = {"email": email, "status": f"error: {type(e).__name__}: {e}"}
+            with lock: found.append(res)
+
+    with muted_console():
+        threads = [threading.Thread(target=_work, name=f"sweep-{n}", daemon=True) for n in range(max(1, min(args.workers, len(todo))))]
+        for th in threads: th.start()
+        for th in threads:
+            while th.is_alive(): th.join(timeout=0.5)
+    scan_s = time.time() - t0
+    live = [f for f in found if f["status"] == "found"]
+    rows = {k: sum(f["rows"][k] for f in live) for k in ("notes", "note_files", "tests", "questions", "courses")}
+    rows["users"] = len(live)
+    storage = sum(f["file_bytes"] for f in live)
+    errors = [f for f in found if f["status"] not in ("found", "gone")]
+    print(tabulate([[k, v] for k, v in rows.items()] + [["file storage", "-" if args.sweep_no_storage else fmt_size(storage)]],
+                   headers=["Rows", "Count"], tablefmt="grid"))
+    print(f" {ICON_INFO} scanned {len(found)} accounts in {scan_s:.1f}s: {len(live)} live, "
+          f"{sum(1 for f in found if f['status'] == 'gone')} already gone, {len(errors)} errors")
+
+    summary: Dict[str, Any] = {}
+    if not args.sweep_dry_run and live:
+        saved, ctx.resources = ctx.resources, reg
+        try:
+            summary = teardown_resources(ctx, args.workers)
+        finally:
+            ctx.resources = saved
+        print(f" {ICON_OK} deleted {summary['deleted']}, already gone {summary['gone']}, failed {len(summary['failed'])} in {summary['duration_s']:.1f}s")
+    elif args.sweep_dry_run:
+        print(c(f" {ICON_INFO} Dry run: nothing deleted", Fore.YELLOW))
+    for e in errors[:10]:
+        print(c(f"  {ICON_FAIL} {e['email']}: {e['status']}", Fore.RED))
+    path = os.path.join(ctx.output_dir, "Sweep.json")
+    write_json(path, {"sources": files, "skipped": skipped, "reclaimed_rows": rows,
+                      "reclaimed_file_bytes": None if args.sweep_no_storage else storage,
+                      "dry_run": args.sweep_dry_run, "accounts": found, "teardown": summary})
+    print(c(f"📄 Zapisano wyniki: {path}", Fore.CYAN))
+    return 1 if errors or summary.get("failed") else 0
+
 # ──────────────────────────────────────────────────────────────────────
 # === FUNKCJE POZA KLASĄ (Raport HTML, main) ===
 # ──────────────────────────────────────────────────────────────────────
@@ -3238,6 +7843,7 @@ def write_html_report(ctx: TestContext, results: List[TestRecord], endpoints: Li
             </div>
             <div class="meta-right">
                 <span class="dur">{ep.duration_ms:.1f} ms</span>
+                {f"<span class='dur'>{_e(fmt_body_sizes(ep.resp_wire_bytes, ep.resp_decoded_bytes, ep.resp_content_encoding))}</span>" if ep.resp_wire_bytes is not None or ep.resp_decoded_bytes is not None else ""}
                 <span class="st http {httpc}">{ep.resp_status if ep.resp_status is not None else 'ERR'}</span>
                 <a href="#top" class="back-link">Return to Top ↑</a>
             </div>
@@ -3409,36 +8015,77 @@ def write_html_report(ctx: TestContext, results: List[TestRecord], endpoints: Li
 def main():
     """Główna funkcja uruchamiająca testy."""
     args = parse_args()
-    colorama_init(autoreset=True) # Autoreset kolorów po każdym princie
+    # Load/soak: bez autoreset — wydruki per żądanie są tam wyciszone, a dashboard zamyka kolory sam przez c()
+    colorama_init(autoreset=args.mode not in ("load", "soak")) # Pozostałe tryby: autoreset kolorów po każdym princie
 
     # Inicjalizacja sesji HTTP
     ses = requests.Session()
     ses.headers.update({"User-Agent": "NoteSync-E2E-NM/1.1"}) # Zaktualizowano User-Agent
 
     # Wczytaj awatar lub wygeneruj domyślny
-    avatar_bytes = None
+    avatar_source = None
     if args.avatar and os.path.isfile(args.avatar):
         try:
-            with open(args.avatar, "rb") as f: avatar_bytes = f.read()
+            ext = os.path.splitext(args.avatar)[1].lower().lstrip(".")
+            avatar_source = upload_source(args.avatar, NOTE_MIME_MAP.get(ext, "application/octet-stream")) # Typ wg rozszerzenia (domyślnie test.jpg)
         except Exception as e:
             print(c(f"Warning: Could not load avatar file '{args.avatar}': {e}. Using default.", Fore.YELLOW))
-    if not avatar_bytes:
-        avatar_bytes = gen_avatar_bytes()
+    if not avatar_source:
+        avatar_source = UploadSource.from_bytes(gen_avatar_bytes(), "avatar.png", "image/png")
 
     # Przygotuj katalog wyjściowy
     out_dir = build_output_dir()
 
     # Stwórz kontekst testowy
     ctx = TestContext(
-        base_url=args.base_url.rstrip("/"),
+        base_url=(args.base_url or "").rstrip("/"),
         me_prefix=args.me_prefix,
         ses=ses,
         timeout=args.timeout,
         note_file_path=args.note_file,
-        avatar_bytes=avatar_bytes,
-        output_dir=out_dir
+        avatar_source=avatar_source,
+        output_dir=out_dir,
+        tokens=None if args.no_token_cache else TokenCache(),
+        http_cache=HttpCache() if args.http_cache else None,
+        payloads=PayloadAnalyzer() if args.analyze_payloads else None,
+        resources=None if args.mode in ("payload", "sweep", "traffic-model") else ResourceRegistry(args.me_prefix, os.path.join(out_dir, RESOURCE_JOURNAL)),
     )
 
+    args.scenario_flows = []
+    if args.scenarios and args.mode in ("load", "soak", "scenario"):
+        try:
+            plans = load_scenarios(ctx, args.scenarios)
+        except ValueError as e:
+            print(c(f"{ICON_FAIL} Scenario compile error: {e}", Fore.RED))
+            sys.exit(2)
+        args.scenario_flows = register_scenarios(plans)
+        print(c(f"{ICON_INFO} Compiled {len(plans)} scenario(s), {sum(len(p.steps) for p in plans)} steps: {', '.join(args.scenario_flows)}", Fore.CYAN))
+        if args.flows is None and args.scenario_flows:
+            args.flows = ",".join(args.scenario_flows)
+
+    if args.traffic_model and args.mode in ("load", "soak"):
+        load_traffic_model(args.traffic_model, args.think_scale, args.model_max_session)
+        if args.flows is None:
+            args.flows = "model"
+
+    if args.mode != "e2e":
+        print(c(f"    Summary will be saved to: {out_dir}", Fore.CYAN))
+        runners = {"load": run_load_mode, "soak": run_soak_mode, "seed": run_seed_mode, "pagination": run_pagination_mode,
+                   "dashboard": run_dashboard_mode, "dashboard-widgets": run_dashboard_widgets_mode,
+                   "auth": run_auth_mode, "uploads": run_uploads_mode, "ranges": run_ranges_mode,
+                   "compression": run_compression_mode, "payload": run_payload_mode, "races": run_races_mode,
+                   "contention": run_contention_mode, "sweep": run_sweep_mode, "scenario": run_scenario_mode,
+                   "traffic-model": run_traffic_model_mode, "replay": run_replay_mode}
+        code = 130
+        try:
+            code = runners[args.mode](ctx, args)
+        finally: # Także po wyjątku i Ctrl-C
+            if ctx.resources is not None and not (args.keep_resources or args.mode == "seed"):
+                report_teardown(ctx, args.teardown_workers)
+        if ctx.http_cache is not None: report_http_cache(ctx)
+        if ctx.payloads is not None: report_payloads(ctx)
+        sys.exit(code)
+
     print(c(f"\n{ICON_INFO} Starting Integrated E2E Tests (N:M Refactored) @ {ctx.base_url}", Fore.WHITE))
     print(c(f"    Report will be saved to: {out_dir}", Fore.CYAN))
     if not os.path.isfile(ctx.note_file_path):
@@ -3450,10 +8097,26 @@ def main():
     # Utwórz instancję testera
     tester = E2ETester(ctx)
     exit_code = 0 # Domyślnie sukces
+    resume: Optional[Dict[str, Any]] = None
+    checkpointing = bool(args.checkpoint or args.resume_from or args.rerun_failed)
+    if args.resume_from or args.rerun_failed:
+        run_dir = find_checkpoint_run(args.resume_run)
+        if not run_dir:
+            print(c(f"{ICON_FAIL} No {CHECKPOINT_FILE} found (run with --checkpoint first or pass --resume-run)", Fore.RED))
+            sys.exit(2)
+        resume = {"run": run_dir, "from": args.resume_from, "failed": args.rerun_failed, "checkpoints": load_checkpoints(run_dir)}
+    if checkpointing:
+        tester.checkpoint_path = os.path.join(out_dir, CHECKPOINT_FILE)
+    if args.profile:
+        tester.profiler = StepProfiler(out_dir, args.profile_sample_ms)
+    if args.only or args.skip or args.tag:
+        tester.selection = {"only": [x for x in _csv_list(args.only) if x], "skip": [x for x in _csv_list(args.skip) if x],
+                            "tags": [x for x in _csv_list(args.tag) if x],
+                            "closure": not args.no_prerequisites}
 
     try:
         # Uruchom główną logikę testów (definiuje i wykonuje self.steps)
-        tester.run()
+        tester.run(resume)
     except Exception as main_exec_error:
          # Złap nieoczekiwane błędy podczas wykonywania run()
          print(c(f"\n\nCRITICAL ERROR during test execution: {main_exec_error}", Fore.RED))
@@ -3468,6 +8131,7 @@ def main():
          # Zawsze generuj raport HTML i podsumowanie konsolowe
          try:
              write_html_report(ctx, tester.results, ctx.endpoints)
+             write_endpoints_jsonl(ctx) # Nagranie przebiegu dla analizy offline (--mode payload --from-run)
          except Exception as report_error:
              print(c(f"\nCRITICAL ERROR during HTML report generation: {report_error}", Fore.RED))
              exit_code = 3 # Inny kod błędu dla problemów z raportem
@@ -3478,6 +8142,14 @@ def main():
 
          # Wygeneruj podsumowanie konsolowe (bez sys.exit wewnątrz _summary)
          tester._summary_console_only() # Zmieniona nazwa, aby uniknąć sys.exit
+         if tester.profiler: tester.profiler.report()
+         if ctx.resources is not None and not args.keep_resources:
+             if checkpointing and exit_code != 0: # Stan z checkpointów wskazuje na te encje — zostają do wznowienia
+                 print(c(f"\n{ICON_INFO} Teardown deferred: resources kept for --rerun-failed (or clean up with --mode sweep)", Fore.YELLOW))
+             else:
+                 report_teardown(ctx, args.teardown_workers)
+         if ctx.http_cache is not None: report_http_cache(ctx)
+         if ctx.payloads is not None: report_payloads(ctx)
 
          # Zakończ skrypt z odpowiednim kodem wyjścia
          sys.exit(exit_code)